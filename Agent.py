@@ -36,6 +36,15 @@ class Agent:
         if Agent.plans is None:
             self.load_paths(filename)
 
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Discards the plans and id allocation shared by all agents, so a new
+        execution policy can number its agents from 0.
+        """
+        cls.plans = None
+        cls.num_agents = 0
+
     def load_paths(self, filename: str) -> None:
         """
         Loads the plans of all agents from a file.
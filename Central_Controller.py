@@ -1,23 +1,82 @@
 from enum import Enum
 import json
+import math
+import queue
+import sys
+import threading
+import time
 from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Tuple
 from urllib.parse import parse_qs, urlparse
 
+from Congestion_Map import METRICS as CONGESTION_METRICS
+from Dispatch_Latency import DispatchLatencyTracker
+from Distance_Tables import UNREACHABLE, DistanceTables
+from Event_Log import EventLog
 from Execution_Policy import ExecutionPolicy, OnlineExecutionPolicy
+from Heartbeat_Monitor import HeartbeatMonitor
+from Map_Tiles import TilePyramid
+from Metrics import Labels, Metrics, schedule_gauges
 from Unit_Execution_Policy import UnitExecutionPolicy
 from Fully_Synchronised_Policy import FSP, OnlineFSP  # noqa: F401
 from Minimum_Communication_Policy import MCP, OnlineMCP  # noqa: F401
+from Plan_Ingest import MalformedBody, PlanReader, body_chunks, split_lines
 from Position import Position
+from Request_Profiler import RequestProfiler, StackProfiler
+from Status import Status
+from Status_Stream import StatusStream
+from Telemetry import TelemetryListener
+from Rolling_Horizon_Planner import PlannerWorker
+import Tracing
+from Tracing import Tracer
+from Transforms import GridFrame
+import WebSocket
+
+trace = Tracer("controller")
 
 
 class GetRequest(Enum):
     GET_NEXT_POSITION = "/"
     GET_LOCATIONS = "/get_locations"
     GET_STATUS = "/get_status"
+    GET_NEXT_POSITIONS = "/get_next_positions"
+    GET_METRICS = "/metrics"
+    GET_PROFILE = "/profile"
+    GET_DISPATCH_LATENCY = "/dispatch_latency"
+    GET_CONGESTION = "/congestion"
+    GET_DISTANCE = "/distance"
+    GET_TILES = "/tiles"
+    GET_EVENTS = "/events"
+    GET_WEBSOCKET = "/ws"
+    GET_TELEMETRY = "/telemetry"
 
 class PostRequest(Enum):
     POST_ROBOT_STATUS = "/"
     POST_EXTEND_PATH = "/extend_path"
+    POST_TRACE = "/trace"
+    POST_PROFILE = "/profile"
+    POST_INGEST_PLANS = "/ingest_plans"
+
+# Type and help text of every metric exposed on /metrics
+METRIC_DESCRIPTIONS = {
+    "controller_requests_total": ("counter", "Requests handled, by method, route and response code"),
+    "controller_request_seconds": ("histogram", "Time from parsing a request to sending its response"),
+    "policy_call_seconds": ("histogram", "Time spent in execution policy calls"),
+    "dispatch_wait_seconds": ("histogram", "Time from a report to the next motion window, by cause"),
+    "agents": ("gauge", "Agents by status"),
+    "schedule_cells": ("gauge", "Locations in the schedule table"),
+    "schedule_constraints": ("gauge", "Outstanding constraints in the schedule table"),
+    "schedule_queue_depth_max": ("gauge", "Most constraints queued on a single location"),
+    "schedule_queues_waiting": ("gauge", "Locations with more than one constraint queued"),
+    "telemetry_datagrams_total": ("counter", "UDP pose reports received, by whether they were accepted"),
+}
+
+# Seconds between comments keeping idle status streams open through proxies
+STREAM_KEEPALIVE: float = 15.0
+
+# Routes are only used as labels when known, to bound the number of series
+ROUTES = {request.value for request in GetRequest} | {request.value for request in PostRequest}
+
 
 class CentralController(BaseHTTPRequestHandler):
     """
@@ -26,10 +85,357 @@ class CentralController(BaseHTTPRequestHandler):
     Attributes:
     - execution_policy (ExecutionPolicy): An execution policy object
     that determines the next position of an agent.
+    - planner (PlannerWorker | None): An optional in-process planner
+    extending the plans of the execution policy.
+    - heartbeats (HeartbeatMonitor | None): An optional monitor aborting
+    agents that stop sending requests.
+    - metrics (Metrics): Request and policy timings, served on /metrics.
+    - profiler (RequestProfiler): Profiles a fraction of requests when enabled,
+    served as folded stacks on /profile.
+    - dispatch_latency (DispatchLatencyTracker): Time agents wait between
+    reporting and being dispatched, served on /dispatch_latency.
+    - event_log (EventLog | None): An optional log of every status update
+    and plan extension, for replaying incidents.
+    - frame (GridFrame | None): The world frame of the map the plans are on,
+    for exchanging poses in metres with ?frame=world.
+    - distances (DistanceTables | None): Precomputed distances over the
+    planning grid, served on /distance for heuristics and ETAs.
+    - tiles (Dict[str, TilePyramid]): PNG tiles of the maps by name, served
+    on /tiles for viewers to draw the fleet over.
+    - status_stream (StatusStream): Pushes agent and plan changes to viewers
+    of /events as Server-Sent Events, and wakes robots connected on /ws.
+    - telemetry (TelemetryListener | None): An optional UDP listener holding
+    the latest pose of each agent, served on /telemetry.
+    - policy_lock (RLock): Held by every change to the execution policy, by
+    handlers, the planner and checkpoints alike, so a checkpoint never sees
+    a change half applied.
     """
     request_version = "HTTP/1.1"
 
     execution_policy: ExecutionPolicy | OnlineExecutionPolicy = UnitExecutionPolicy(1)
+    planner: PlannerWorker | None = None
+    heartbeats: HeartbeatMonitor | None = None
+    metrics: Metrics = Metrics(METRIC_DESCRIPTIONS)
+    profiler: RequestProfiler = RequestProfiler()
+    dispatch_latency: DispatchLatencyTracker = DispatchLatencyTracker(metrics)
+    event_log: EventLog | None = None
+    frame: GridFrame | None = None
+    distances: DistanceTables | None = None
+    tiles: Dict[str, TilePyramid] = {}
+    status_stream: StatusStream = StatusStream()
+    telemetry: TelemetryListener | None = None
+    policy_lock = threading.RLock()
+
+    def parse_request(self) -> bool:
+        # Start timing once the request line has arrived, not while idling on a kept-alive connection
+        self.started: float | None = time.perf_counter()
+        self.response_code: int = 0
+        parsed = super().parse_request()
+        if parsed:
+            self.sampled: StackProfiler | None = CentralController.profiler.sample()
+        return parsed
+
+    def send_response(self, code, message=None) -> None:
+        self.response_code = code
+        super().send_response(code, message)
+
+    def handle_one_request(self) -> None:
+        """
+        Handles a request, recording its latency and response code.
+        """
+        self.started = None
+        self.sampled = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.started is not None and self.command:
+                path = urlparse(self.path).path
+                route = path if path in ROUTES else "other"
+                if self.sampled is not None:
+                    CentralController.profiler.finish(self.sampled, f"{self.command} {route}")
+                labels: Labels = (("method", self.command), ("route", route))
+                CentralController.metrics.observe(
+                    "controller_request_seconds", labels, time.perf_counter() - self.started
+                )
+                CentralController.metrics.increment(
+                    "controller_requests_total", labels + (("code", str(self.response_code)),)
+                )
+
+    def log_message(self, format, *args) -> None:
+        # The access log is written for every request, so only at debug level
+        trace.debug("%s - %s", self.address_string(), format % args)
+
+    def log_error(self, format, *args) -> None:
+        trace.warning("%s - %s", self.address_string(), format % args)
+
+    def next_window(self, agent_id: int) -> Dict:
+        """
+        Fetches the next motion window of an agent, as sent to its robot.
+        """
+        message: Dict = {}
+        message["agent_id"] = agent_id
+
+        # Fullfill agents request for position data
+        with CentralController.policy_lock, CentralController.metrics.time(
+                "policy_call_seconds", self.policy_call("get_next_position")):
+            (
+                positions,
+                (start_timestep, end_timestep),
+            ) = CentralController.execution_policy.get_next_position(agent_id)
+        message["start_timestep"], message["end_timestep"] = (
+            start_timestep,
+            end_timestep,
+        )
+        CentralController.dispatch_latency.polled(agent_id, start_timestep, end_timestep)
+
+        if isinstance(positions, list):
+            message["positions"] = [pos.to_tuple() for pos in positions]
+        elif isinstance(positions, Position):
+            trace.warning("This is deprecated, moved to List[Position] for get_next_position()")
+            message["position"] = positions.to_tuple()
+        else:
+            raise TypeError(f"Position {positions} as type {type(positions)}")
+        return message
+
+    @classmethod
+    def report_status(cls, data: Dict) -> None:
+        """
+        Updates the execution policy with a status report from a robot.
+        """
+        cls.beat(data.get("agent_id"))
+        agents = CentralController.execution_policy.agents
+        known = isinstance(data.get("agent_id"), int) and 0 <= data["agent_id"] < len(agents)
+        with CentralController.policy_lock:
+            # Taken before the update moves the agent on, and its waiters with it
+            waiters = cls.waiters(data["agent_id"]) if known else []
+            if CentralController.event_log is not None:
+                CentralController.event_log.update(data)
+            with CentralController.metrics.time("policy_call_seconds", cls.policy_call("update")):
+                CentralController.execution_policy.update(data)
+            # Registered before any robot is woken, so no poll is timed before its report.
+            # Statuses are matched case insensitively, as the policies do
+            status = data.get("status")
+            succeeded = isinstance(status, str) and Status.from_string(status) == Status.SUCCEEDED
+            if succeeded and "agent_id" in data:
+                CentralController.dispatch_latency.reported(data["agent_id"],
+                                                            int(data.get("timestep", 0)))
+        if known:
+            CentralController.status_stream.agents_changed([agents[data["agent_id"]]])
+            CentralController.status_stream.notify(waiters)
+        if CentralController.planner is not None:
+            CentralController.planner.notify()
+
+    @classmethod
+    def beat(cls, agent_id: Any) -> None:
+        """
+        Restarts the heartbeat timeout of an agent, if agents are monitored and the policy has it.
+        """
+        if CentralController.heartbeats is not None and isinstance(agent_id, int) \
+                and 0 <= agent_id < len(CentralController.execution_policy.agents):
+            CentralController.heartbeats.beat(agent_id)
+
+    @classmethod
+    def waiters(cls, agent_id: int) -> List[int] | None:
+        """
+        Returns the agents queued behind an agent, whose windows may grow once it
+        moves, or None if the policy cannot tell and every robot should be woken.
+        """
+        if isinstance(CentralController.execution_policy, OnlineMCP):
+            return CentralController.execution_policy.schedule_table.wait_for.waiters(agent_id)
+        return None
+
+    def ingest_plans(self) -> None:
+        """
+        Appends whole plans streamed as NDJSON or result.path lines, applying each batch as it arrives.
+
+        e.g. /ingest_plans?frame=world&lookahead=20, where the body may be sent
+        chunked and is never held in memory whole. Plans are committed whole,
+        unless a lookahead is given for a policy that takes one. A body found
+        malformed part way is answered with a 400 and the counts applied so far.
+        """
+        policy = CentralController.execution_policy
+        if not isinstance(policy, OnlineExecutionPolicy):
+            assert(False), "Unsupported request for the ExeuctionPolicy"
+        params = parse_qs(urlparse(self.path).query)
+        frame = None
+        if params.get("frame", [""])[0] == "world":
+            if CentralController.frame is None:
+                # The body is left unread, so the connection cannot carry another request
+                self.close_connection = True
+                self.bad_request("Plans in the world frame need the controller to be given a map")
+                return
+            frame = CentralController.frame
+        lookahead: int | None = None
+        # Only OnlineMCP takes a lookahead
+        if isinstance(policy, OnlineMCP):
+            lookahead = int(params["lookahead"][0]) if "lookahead" in params else sys.maxsize
+
+        chunked = "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        chunks = body_chunks(self.rfile, chunked, int(self.headers.get("Content-Length", 0)))
+        reader = PlanReader(frame)
+        started = time.perf_counter()
+        try:
+            for extensions in reader.batches(split_lines(chunks)):
+                with CentralController.policy_lock:
+                    if CentralController.event_log is not None:
+                        CentralController.event_log.extend_plans(extensions, lookahead)
+                    with CentralController.metrics.time("policy_call_seconds",
+                                                        self.policy_call("extend_plans")):
+                        if isinstance(policy, OnlineMCP) and lookahead is not None:
+                            policy.extend_plans(extensions, lookahead=lookahead)
+                        else:
+                            policy.extend_plans(extensions)
+                CentralController.status_stream.plans_extended(
+                    policy, [agent_id for agent_id, _ in extensions]
+                )
+        except MalformedBody as error:
+            # The rest of the body cannot be found, so neither can the next request
+            self.close_connection = True
+            trace.warning("Plan body malformed after %d lines: %s", reader.lines, error)
+            self.bad_request(str(error), **reader.summary())
+            return
+        finally:
+            if CentralController.planner is not None:
+                CentralController.planner.notify()
+        trace.info("Ingested %d positions of %d agents in %.1f ms", reader.positions, len(reader.agents),
+                   1000 * (time.perf_counter() - started))
+
+        body = bytes(json.dumps(reader.summary()), "utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+
+        self.wfile.write(body)
+
+    def bad_request(self, message: str, **details: Any) -> None:
+        """
+        Rejects a request with a 400 and a JSON body explaining why, along with any details.
+        """
+        body = bytes(json.dumps({"error": message, **details}), "utf-8")
+        self.send_response(400)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", f"{len(body)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, data: bytes) -> None:
+        """
+        Writes one chunk of a chunked response, the empty chunk ending it.
+        """
+        self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def stream_events(self) -> None:
+        """
+        Streams agent and plan changes as Server-Sent Events until the viewer disconnects.
+        """
+        stream = CentralController.status_stream
+        subscriber, snapshot = stream.subscribe(CentralController.execution_policy.agents)
+        # Chunked encoding needs HTTP/1.1, and the stream holds the connection until it closes
+        self.protocol_version = "HTTP/1.1"
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self.write_chunk(snapshot or b": connected\n\n")
+            while not (subscriber.dropped.is_set() and subscriber.events.empty()):
+                try:
+                    messages = [subscriber.events.get(timeout=STREAM_KEEPALIVE)]
+                except queue.Empty:
+                    messages = [b": keepalive\n\n"]
+                # Send whatever else queued meanwhile in the same chunk
+                while len(messages) < 64 and not subscriber.events.empty():
+                    messages.append(subscriber.events.get_nowait())
+                self.write_chunk(b"".join(messages))
+            self.write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            trace.debug("Status stream viewer %s disconnected", self.address_string())
+        finally:
+            stream.unsubscribe(subscriber)
+
+    def serve_websocket(self, agent_id: int) -> None:
+        """
+        Keeps a WebSocket open with a robot until either side closes it.
+
+        The robot sends its status updates as text messages, with the same
+        JSON as POST /, and is sent its next motion window, as GET / returns
+        it, whenever one becomes dispatchable, instead of polling for it.
+        """
+        self.protocol_version = "HTTP/1.1"
+        self.close_connection = True
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", WebSocket.accept_key(self.headers["Sec-WebSocket-Key"]))
+        self.end_headers()
+        self.wfile.flush()
+
+        write_lock = threading.Lock()
+        closed = threading.Event()
+        # The last window pushed, cleared by every report so the robot is sent what follows it
+        pushed: Dict[str, Tuple | None] = {"window": None}
+
+        def send(opcode: int, payload: bytes) -> None:
+            with write_lock:
+                self.wfile.write(WebSocket.encode_frame(opcode, payload))
+                self.wfile.flush()
+
+        def push() -> None:
+            stream = CentralController.status_stream
+            generation = -1
+            # The first window is always sent, for the robot to learn where it starts
+            first = True
+            try:
+                while not closed.is_set():
+                    message = self.next_window(agent_id)
+                    window = (message["start_timestep"], message["end_timestep"])
+                    if first or (window[1] > window[0] and window != pushed["window"]):
+                        first = False
+                        pushed["window"] = window
+                        send(WebSocket.TEXT, bytes(json.dumps(message), "utf-8"))
+                    generation = stream.wait(agent_id, generation, STREAM_KEEPALIVE)
+            except (BrokenPipeError, ConnectionResetError, ValueError):
+                closed.set()
+
+        pusher = threading.Thread(target=push, name=f"ws-push-{agent_id}", daemon=True)
+        pusher.start()
+        messages = WebSocket.MessageReader(self.rfile)
+        try:
+            while not closed.is_set():
+                opcode, payload = messages.read()
+                self.beat(agent_id)
+                match opcode:
+                    case WebSocket.TEXT:
+                        data = json.loads(payload)
+                        data.setdefault("agent_id", agent_id)
+                        self.report_status(data)
+                        pushed["window"] = None
+                    case WebSocket.PING:
+                        send(WebSocket.PONG, payload)
+                    case WebSocket.CLOSE:
+                        send(WebSocket.CLOSE, payload[:2])
+                        break
+                    case _:
+                        send(WebSocket.CLOSE, WebSocket.close_payload(WebSocket.UNSUPPORTED_DATA,
+                                                                      "Status updates are sent as text"))
+                        break
+        except WebSocket.ProtocolError as error:
+            trace.warning("Robot %d broke the WebSocket protocol: %s", agent_id, error)
+            send(WebSocket.CLOSE, WebSocket.close_payload(error.code, str(error)))
+        except (WebSocket.ConnectionClosed, BrokenPipeError, ConnectionResetError) as error:
+            trace.debug("Robot %d WebSocket closed: %s", agent_id, error)
+        finally:
+            closed.set()
+            # Wake the pusher so it notices the close
+            CentralController.status_stream.notify([agent_id])
+
+    @classmethod
+    def policy_call(cls, method: str) -> Labels:
+        return (("policy", type(CentralController.execution_policy).__name__), ("method", method))
 
     def do_GET(self):
         """
@@ -53,41 +459,21 @@ class CentralController(BaseHTTPRequestHandler):
                 if not agent_id:
                     agent_id = str(data.get('agent_id', None))
                     if agent_id is None:
-                        print("No agent id provided, cannot give next position")
+                        trace.warning("No agent id provided, cannot give next position")
                         return
 
                 if not agent_id[0].isdigit():
-                    print("Agent id provided is malformed, cannot convert to int")
+                    trace.warning("Agent id provided is malformed, cannot convert to int")
                     return
 
                 agent_id = int(agent_id[0])
+                self.beat(agent_id)
 
                 self.send_response(200)
                 self.send_header("Content-Type", "application/json")
                 self.end_headers()
 
-                message = {}
-                message["agent_id"] = agent_id
-
-                # Fullfill agents request for position data
-                (
-                    positions,
-                    (start_timestep, end_timestep),
-                ) = CentralController.execution_policy.get_next_position(agent_id)
-                message["start_timestep"], message["end_timestep"] = (
-                    start_timestep,
-                    end_timestep,
-                )
-
-                if isinstance(positions, list):
-                    message["positions"] = [pos.to_tuple() for pos in positions]
-                elif isinstance(positions, Position):
-                    print(
-                        "Warning: This is deprecated, moved to List[Position] for get_next_position()"
-                    )
-                    message["position"] = positions.to_tuple()
-                else:
-                    raise TypeError(f"Position {positions} as type {type(positions)}")
+                message = self.next_window(agent_id)
 
                 self.wfile.write(bytes(json.dumps(message), "utf-8"))
             case GetRequest.GET_LOCATIONS:
@@ -116,6 +502,12 @@ class CentralController(BaseHTTPRequestHandler):
                     }
                     for (location, agent_id) in locations
                 ]
+                if parse_qs(url.query).get("frame") == ["world"] and CentralController.frame is not None:
+                    poses = CentralController.frame.to_world(
+                        [location.to_tuple() for location, _ in locations]
+                    ).tolist()
+                    for entry, (x, y, theta) in zip(message["locations"], poses):
+                        entry.update({"x": x, "y": y, "theta": theta})
 
                 self.send_response(200)
                 self.send_header("Content-Type", "application/json")
@@ -155,14 +547,236 @@ class CentralController(BaseHTTPRequestHandler):
                         "agent_id": agent_id,
                     }
                     for (agent_id, status) in statuses]
+                if isinstance(CentralController.execution_policy, OnlineMCP):
+                    with CentralController.policy_lock:
+                        cycles = CentralController.execution_policy.schedule_table.wait_for.cycles()
+                    message["deadlocks"] = [list(cycle) for cycle in cycles]
                 self.send_response(200)
                 self.send_header("Content-Type", "application/json")
                 self.send_header("Content-Length", f"{len(json.dumps(message))}")
                 self.end_headers()
 
                 self.wfile.write(bytes(json.dumps(message), "utf-8"))
+            case GetRequest.GET_NEXT_POSITIONS:
+                if not isinstance(self.execution_policy, (MCP, OnlineMCP)):
+                    assert(False), "Unsupported API request for ExecutionPolicy"
+                # Dispatching reads the schedule and syncs plans, which handlers on other threads change
+                with CentralController.policy_lock:
+                    windows = CentralController.execution_policy.get_next_positions()
+
+                message = {}
+                message["windows"] = [
+                    {
+                        "agent_id": agent_id,
+                        "start_timestep": start_timestep,
+                        "end_timestep": end_timestep,
+                        "positions": [pos.to_tuple() for pos in positions],
+                    }
+                    for agent_id, (positions, (start_timestep, end_timestep)) in windows.items()
+                ]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", f"{len(json.dumps(message))}")
+                self.end_headers()
+
+                self.wfile.write(bytes(json.dumps(message), "utf-8"))
+            case GetRequest.GET_METRICS:
+                policy = CentralController.execution_policy
+                gauges: Dict[str, List[Tuple[Labels, float]]] = {}
+                # The gauges iterate the schedule, which must not change size meanwhile
+                with CentralController.policy_lock:
+                    if isinstance(policy, (MCP, OnlineMCP)):
+                        gauges = schedule_gauges(policy.schedule_table)
+                    if hasattr(policy, "get_status"):
+                        counts: Dict[str, int] = {}
+                        for _, status in policy.get_status():
+                            counts[status.name] = counts.get(status.name, 0) + 1
+                        gauges["agents"] = [((("status", name),), count) for name, count in counts.items()]
+                body = bytes(CentralController.metrics.render(gauges), "utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+
+                self.wfile.write(body)
+            case GetRequest.GET_DISPATCH_LATENCY:
+                body = bytes(json.dumps(CentralController.dispatch_latency.summary()), "utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+
+                self.wfile.write(body)
+            case GetRequest.GET_CONGESTION:
+                if not isinstance(self.execution_policy, (MCP, OnlineMCP)):
+                    assert(False), "Unsupported API request for ExecutionPolicy"
+                params = parse_qs(url.query)
+                top = params.get("top", ["10"])[0]
+                metric = params.get("metric", ["wait_s"])[0]
+                if not top.isdigit() or metric not in CONGESTION_METRICS:
+                    self.bad_request(f"top must be a count and metric one of "
+                                     f"{', '.join(CONGESTION_METRICS)}")
+                    return
+                congestion = CentralController.execution_policy.schedule_table.congestion
+
+                # Line the heatmap up with the planning grid, and so the map, when there is one
+                width = height = None
+                if CentralController.planner is not None:
+                    width = CentralController.planner.planner.grid.width
+                    height = CentralController.planner.planner.grid.height
+
+                message = {
+                    "bottlenecks": congestion.bottlenecks(int(top), metric),
+                    "heatmap": congestion.heatmap(metric, width, height),
+                }
+                body = bytes(json.dumps(message), "utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+
+                self.wfile.write(body)
+            case GetRequest.GET_DISTANCE:
+                # e.g. /distance?from=0,-3&to=5,0, or ?agent_id=2 for the steps left to its last goal
+                distances = CentralController.distances
+                if distances is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                params = parse_qs(url.query)
+                if "agent_id" in params:
+                    if not params["agent_id"][0].isdigit():
+                        self.bad_request("agent_id must be a non-negative integer")
+                        return
+                    agent_id = int(params["agent_id"][0])
+                    if agent_id >= len(CentralController.execution_policy.agents):
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                    agent = CentralController.execution_policy.agents[agent_id]
+                    plan = agent.get_plan()
+                    goals = []
+                    if CentralController.planner is not None:
+                        goals = list(CentralController.planner.planner.goals.get(agent_id, []))
+                    legs = [plan[-1].location(), *goals] if plan else []
+                    committed = max(0, len(plan) - 1 - agent.timestep)
+                    message = {
+                        "agent_id": agent_id,
+                        "goals": [list(goal) for goal in goals],
+                        "committed_steps": committed,
+                        "remaining_steps": committed + sum(
+                            distances.distance(start, goal) for start, goal in zip(legs, legs[1:])
+                        ),
+                    }
+                else:
+                    try:
+                        start_x, start_y = (int(value) for value in params["from"][0].split(","))
+                        goal_x, goal_y = (int(value) for value in params["to"][0].split(","))
+                    except (KeyError, ValueError):
+                        self.bad_request("Pass agent_id, or from and to as cells, e.g. from=0,-3&to=5,0")
+                        return
+                    start, goal = (start_x, start_y), (goal_x, goal_y)
+                    exact = distances.exact(start, goal)
+                    message = {
+                        "from": list(start),
+                        "to": list(goal),
+                        "distance": None if exact is not None and exact >= UNREACHABLE
+                        else distances.distance(start, goal),
+                        "exact": exact is not None,
+                    }
+                body = bytes(json.dumps(message), "utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+
+                self.wfile.write(body)
+            case GetRequest.GET_TILES:
+                # /tiles lists the maps, /tiles?map=office_map describes one and
+                # /tiles?map=office_map&z=0&x=0&y=0 is a PNG tile
+                params = parse_qs(url.query)
+                pyramid = CentralController.tiles.get(params.get("map", [""])[0])
+                if "map" in params and pyramid is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if pyramid is None or not all(key in params for key in ("z", "x", "y")):
+                    maps = [pyramid] if pyramid is not None else CentralController.tiles.values()
+                    body = bytes(json.dumps({"maps": [each.metadata for each in maps]}), "utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", f"{len(body)}")
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                try:
+                    z, x, y = (int(params[key][0]) for key in ("z", "x", "y"))
+                except ValueError:
+                    self.bad_request("z, x and y must be integers")
+                    return
+                tile = pyramid.tile(z, x, y)
+                if tile is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                png, etag = tile
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", f"{len(png)}")
+                # Maps are static while the controller runs, and tiles are named by content
+                self.send_header("Cache-Control", "public, max-age=86400")
+                self.send_header("ETag", etag)
+                self.end_headers()
+
+                self.wfile.write(png)
+            case GetRequest.GET_EVENTS:
+                self.stream_events()
+            case GetRequest.GET_WEBSOCKET:
+                agent_id = parse_qs(url.query).get("agent_id", [""])[0]
+                if not agent_id.isdigit() or self.headers.get("Upgrade", "").lower() != "websocket" \
+                        or "Sec-WebSocket-Key" not in self.headers:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                if int(agent_id) >= len(CentralController.execution_policy.agents):
+                    self.bad_request(f"No agent {agent_id}, there are "
+                                     f"{len(CentralController.execution_policy.agents)}")
+                    return
+                self.serve_websocket(int(agent_id))
+            case GetRequest.GET_TELEMETRY:
+                if CentralController.telemetry is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = bytes(json.dumps({"agents": CentralController.telemetry.latest()}), "utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+
+                self.wfile.write(body)
+            case GetRequest.GET_PROFILE:
+                body = bytes(CentralController.profiler.folded(), "utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", f"{len(body)}")
+                self.end_headers()
+
+                self.wfile.write(body)
             case _:
-                print(f"Unexpected path {url.path}")
+                trace.warning("Unexpected path %s", url.path)
 
     def do_POST(self):
         """
@@ -171,16 +785,31 @@ class CentralController(BaseHTTPRequestHandler):
         Returns:
         - None
         """
+        # Plans are read as they stream in, not as a whole body
+        if urlparse(self.path).path == PostRequest.POST_INGEST_PLANS.value:
+            self.ingest_plans()
+            return
         content_length = int(self.headers["Content-Length"])
         post_data = self.rfile.read(content_length)
         data = json.loads(post_data)
         match PostRequest(urlparse(self.path).path):
             case PostRequest.POST_ROBOT_STATUS:
-                CentralController.execution_policy.update(data)
+                self.report_status(data)
             case PostRequest.POST_EXTEND_PATH:
                 if not isinstance(self.execution_policy, OnlineExecutionPolicy):
                     assert(False), "Unsupported request for the ExeuctionPolicy"
 
+                if data.get("frame") == "world":
+                    if CentralController.frame is None:
+                        self.bad_request("Plans in the world frame need the controller to be given a map")
+                        return
+                    # Convert the poses of the whole fleet at once, to grid cells and cardinal headings
+                    cells = CentralController.frame.to_grid(
+                        [(state["x"], state["y"], state["theta"]) for state in data["plans"]]
+                    ).tolist()
+                    for state, (x, y, theta) in zip(data["plans"], cells):
+                        state.update({"x": x, "y": y, "theta": theta})
+
                 extensions = []
                 for state in data["plans"]:  # The index is the agent_id
                     extensions.append(
@@ -188,16 +817,46 @@ class CentralController(BaseHTTPRequestHandler):
                             state["agent_id"],
                             [
                                 Position(
-                                    int(0.5 + state["x"]),
-                                    int(0.5 + state["y"]),
-                                    int(0.5 + state["theta"]),
+                                    math.floor(0.5 + state["x"]),
+                                    math.floor(0.5 + state["y"]),
+                                    math.floor(0.5 + state["theta"]),
                                 ),
                             ],
                         )
                     )
-                CentralController.execution_policy.extend_plans(extensions)
+                with CentralController.policy_lock:
+                    if CentralController.event_log is not None:
+                        CentralController.event_log.extend_plans(extensions)
+                    with CentralController.metrics.time("policy_call_seconds",
+                                                        self.policy_call("extend_plans")):
+                        CentralController.execution_policy.extend_plans(extensions)
+                CentralController.status_stream.plans_extended(
+                    CentralController.execution_policy, [agent_id for agent_id, _ in extensions]
+                )
+            case PostRequest.POST_TRACE:
+                # e.g. {"level": "INFO", "subsystems": {"schedule": "DEBUG"}, "agents": [3]}
+                subsystems = data.get("subsystems", {})
+                levels = [data["level"]] if "level" in data else []
+                levels += subsystems.values()
+                if any(str(level).upper() not in Tracing.LEVELS for level in levels) \
+                        or any(subsystem not in Tracing.SUBSYSTEMS for subsystem in subsystems):
+                    self.bad_request(f"Levels must be one of {', '.join(Tracing.LEVELS)} and subsystems "
+                                     f"one of {', '.join(Tracing.SUBSYSTEMS)}")
+                    return
+                if "level" in data:
+                    Tracing.set_level(data["level"])
+                for subsystem, level in data.get("subsystems", {}).items():
+                    Tracing.set_level(level, subsystem)
+                if "agents" in data or "cells" in data:
+                    Tracing.set_focus(data.get("agents"), data.get("cells"))
+            case PostRequest.POST_PROFILE:
+                # e.g. {"fraction": 0.05, "reset": true}, a fraction of 0 stops profiling
+                if data.get("reset"):
+                    CentralController.profiler.reset()
+                if "fraction" in data:
+                    CentralController.profiler.fraction = float(data["fraction"])
             case _:
-                print("Unexpected path {self.path}")
+                trace.warning("Unexpected path %s", self.path)
         # Update execution policy with incoming agent data.
         self.send_response(200)
         self.send_header("Content-Type", "application/json")
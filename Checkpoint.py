@@ -0,0 +1,138 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Tuple
+
+from Agent import Agent
+from Tracing import Tracer
+
+trace = Tracer("controller")
+
+# Bumped whenever the pickled policy classes change incompatibly
+VERSION: int = 1
+
+
+def snapshot(policy: Any, goals: Dict | None = None) -> bytes:
+    """
+    Serialises the full state of a policy: its agents, schedule table and the plans shared by all agents.
+
+    The policy must not change while it is pickled, or the snapshot may mix
+    states or fail, so call this under the lock every change to the policy
+    holds, or while nothing changes it.
+
+    Parameters:
+    -----------
+    policy : Any
+        The execution policy to snapshot.
+    goals : Dict | None
+        The outstanding goals of an in-process planner, if there is one.
+    """
+    state = {
+        "version": VERSION,
+        "time": time.time(),
+        "policy": policy,
+        "plans": Agent.plans,
+        "num_agents": Agent.num_agents,
+        "goals": goals,
+    }
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def save_checkpoint(path: str, policy: Any, goals: Dict | None = None,
+                    lock: ContextManager | None = None) -> int:
+    """
+    Atomically replaces the checkpoint at path with a snapshot of a policy.
+
+    The snapshot is taken under lock, if given, and written to disk after it is released.
+
+    Returns:
+    --------
+    int
+        The size of the checkpoint in bytes.
+    """
+    with lock if lock is not None else nullcontext():
+        data = snapshot(policy, goals)
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+    try:
+        with os.fdopen(descriptor, "wb") as fout:
+            fout.write(data)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return len(data)
+
+
+def load_checkpoint(path: str) -> Tuple[Any, Dict | None, float]:
+    """
+    Restores a policy from a checkpoint, along with the plans shared by all agents.
+
+    Returns:
+    --------
+    Tuple[Any, Dict | None, float]
+        The policy, the outstanding goals of the planner if there was one,
+        and the wall clock time the checkpoint was taken at.
+    """
+    with open(path, "rb") as fin:
+        state = pickle.load(fin)
+    if state.get("version") != VERSION:
+        raise ValueError(f"Checkpoint {path} has version {state.get('version')}, expected {VERSION}")
+    Agent.plans = state["plans"]
+    Agent.num_agents = state["num_agents"]
+    return state["policy"], state["goals"], state["time"]
+
+
+class CheckpointWorker(threading.Thread):
+    """
+    Background worker periodically checkpointing an execution policy, off the request path.
+
+    Attributes:
+    -----------
+    path : str
+        The checkpoint file, replaced atomically on every checkpoint.
+    interval : float
+        Seconds between checkpoints.
+    get_state : Callable[[], Tuple[Any, Dict | None]]
+        Returns the policy, and the planner goals if any, to checkpoint.
+    lock : ContextManager | None
+        Held by every change to the policy and its goals, and by each snapshot.
+    """
+
+    def __init__(
+        self, path: str, get_state: Callable[[], Tuple[Any, Dict | None]], interval: float = 5.0,
+        lock: ContextManager | None = None,
+    ) -> None:
+        super().__init__(name="CheckpointWorker", daemon=True)
+        self.path: str = path
+        self.interval: float = interval
+        self.get_state: Callable[[], Tuple[Any, Dict | None]] = get_state
+        self.lock: ContextManager | None = lock
+        self._stopped = threading.Event()
+
+    def checkpoint(self) -> None:
+        started = time.perf_counter()
+        policy, goals = self.get_state()
+        size = save_checkpoint(self.path, policy, goals, self.lock)
+        trace.debug("Checkpointed %d bytes to %s in %.1f ms", size, self.path,
+                    1000 * (time.perf_counter() - started))
+
+    def stop(self) -> None:
+        """
+        Stops the worker and takes a final checkpoint.
+        """
+        self._stopped.set()
+        self.join()
+        self.checkpoint()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception as error:
+                trace.error("Checkpoint to %s failed: %s", self.path, error)
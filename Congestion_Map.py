@@ -0,0 +1,151 @@
+import time
+from typing import Callable, Dict, List, Tuple
+
+Location = Tuple[int, int]
+
+# What a heatmap or ranking can be built from
+METRICS: Tuple[str, ...] = ("wait_s", "contention", "queued")
+
+
+class CellCongestion:
+    """
+    Congestion counters of a single location.
+
+    Attributes:
+    -----------
+    queued : int
+        Constraints currently queued on the location.
+    contention : int
+        The number of times an agent found another agent ahead of it in the queue.
+    wait_s : float
+        Seconds agents have spent blocked on the location, not counting ongoing waits.
+    blocked_since : Dict[int, float]
+        When each agent currently blocked on the location was first refused it.
+    """
+
+    __slots__ = ("queued", "contention", "wait_s", "blocked_since")
+
+    def __init__(self) -> None:
+        self.queued: int = 0
+        self.contention: int = 0
+        self.wait_s: float = 0.0
+        self.blocked_since: Dict[int, float] = {}
+
+
+class CongestionMap:
+    """
+    Per location queue lengths, contention counts and wait times of a schedule table.
+
+    The schedule table reports every constraint it queues and removes, and
+    every check of whether an agent may enter a location; each report is a
+    dict lookup, so the map can be kept on in production.
+
+    Attributes:
+    -----------
+    cells : Dict[Location, CellCongestion]
+        The counters of every location seen.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock: Callable[[], float] = clock
+        self.cells: Dict[Location, CellCongestion] = {}
+
+    def _cell(self, location: Location) -> CellCongestion:
+        cell = self.cells.get(location)
+        if cell is None:
+            cell = self.cells[location] = CellCongestion()
+        return cell
+
+    def queued(self, location: Location, count: int = 1) -> None:
+        """
+        Records constraints added to (or, for a negative count, removed from) a location.
+        """
+        self._cell(location).queued += count
+
+    def dequeued(self, location: Location, agent_id: int) -> None:
+        """
+        Records a constraint of an agent leaving a location, ending any wait of the agent on it.
+        """
+        cell = self._cell(location)
+        cell.queued -= 1
+        self.admitted(location, agent_id)
+
+    def blocked(self, location: Location, agent_id: int) -> None:
+        """
+        Records that an agent was refused a location because another agent is ahead of it.
+        """
+        cell = self._cell(location)
+        if agent_id not in cell.blocked_since:
+            cell.blocked_since[agent_id] = self.clock()
+            cell.contention += 1
+
+    def admitted(self, location: Location, agent_id: int) -> None:
+        """
+        Records that an agent may enter a location, ending its wait on it if it was blocked.
+        """
+        cell = self.cells.get(location)
+        if cell is not None and cell.blocked_since:
+            since = cell.blocked_since.pop(agent_id, None)
+            if since is not None:
+                cell.wait_s += self.clock() - since
+
+    def statistics(self, location: Location) -> Dict[str, float]:
+        """
+        Returns the counters of a location, including the time of ongoing waits.
+        """
+        cell = self.cells.get(location) or CellCongestion()
+        now = self.clock()
+        return {
+            "queued": cell.queued,
+            "contention": cell.contention,
+            "wait_s": cell.wait_s + sum(now - since for since in list(cell.blocked_since.values())),
+            "blocked": len(cell.blocked_since),
+        }
+
+    def bottlenecks(self, top: int = 10, metric: str = "wait_s") -> List[Dict]:
+        """
+        Returns the top locations by a metric, most congested first.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown congestion metric {metric}, expected one of {METRICS}")
+        ranked = [
+            {"x": location[0], "y": location[1], **self.statistics(location)}
+            for location in list(self.cells)
+        ]
+        ranked.sort(key=lambda cell: cell[metric], reverse=True)
+        return ranked[:top]
+
+    def heatmap(self, metric: str = "wait_s", width: int | None = None, height: int | None = None) -> Dict:
+        """
+        Rasterises a metric in the layout of a PlanningGrid: row -y, column x.
+
+        Parameters:
+        -----------
+        metric : str
+            One of wait_s, contention or queued.
+        width, height : int | None
+            The size of the planning grid, so the heatmap lines up with the map
+            it was rasterised from; by default the bounding box of the locations seen.
+
+        Returns:
+        --------
+        Dict
+            The metric, the row and column of the first cell, and the rows of values.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown congestion metric {metric}, expected one of {METRICS}")
+        locations = list(self.cells)
+        if width is None or height is None:
+            columns = [x for x, _ in locations] or [0]
+            rows = [-y for _, y in locations] or [0]
+            first_row, first_column = min(rows), min(columns)
+            height, width = max(rows) - first_row + 1, max(columns) - first_column + 1
+        else:
+            first_row, first_column = 0, 0
+
+        values = [[0.0] * width for _ in range(height)]
+        for location in locations:
+            row, column = -location[1] - first_row, location[0] - first_column
+            if 0 <= row < height and 0 <= column < width:
+                values[row][column] = self.statistics(location)[metric]
+        return {"metric": metric, "row": first_row, "column": first_column, "values": values}
@@ -0,0 +1,245 @@
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Set, Tuple
+
+from Position import Position
+from Tracing import Tracer
+
+trace = Tracer("deadlock")
+
+Location = Tuple[int, int]
+
+
+class WaitForGraph:
+    """
+    An incrementally maintained wait-for graph over an OnlineSchedule.
+
+    An agent waits for another when the next location in its outstanding path
+    that it is not scheduled at is headed by the other agent's constraint.
+    Each agent waits for at most one other, so a cycle is found by following
+    the single outgoing edge of each agent from the one that was just added.
+
+    Pending locations are numbered from when they were appended, and indexed
+    by agent and location, so each change costs O(1) amortised rather than a
+    scan of the agent's path.
+
+    Attributes:
+    -----------
+    path_table : PathReservation
+        The queues of the schedule being watched.
+    pending : Dict[int, Dict[int, Location]]
+        The outstanding locations of each agent by index, its current location first.
+    head : Dict[int, int]
+        The index of the current location of each agent.
+    tail : Dict[int, int]
+        The index the next location appended to each agent's path gets.
+    indices : Dict[Tuple[int, Location], Deque[int]]
+        The indices, in order, at which an agent has a location pending.
+    verified : Dict[int, int]
+        The index of the last pending location at which each agent is known to
+        be at the head of the queue; the locations up to it stay at the head
+        until the agent leaves them, so they never need checking again.
+    waits_for : Dict[int, int]
+        Maps a blocked agent to the agent at the head of the queue it waits on.
+    waited_on : Dict[int, Set[int]]
+        Maps an agent to the agents blocked on queues it is at the head of.
+    blocked_at : Dict[int, Location]
+        Maps a blocked agent to the location it waits to enter.
+    waiting_at : Dict[Location, Set[int]]
+        Maps a location to the agents blocked on its queue.
+    deadlocks : Dict[int, Tuple[int, ...]]
+        Maps each agent in a cyclic wait to the agents forming the cycle.
+    on_deadlock : Callable[[Tuple[int, ...]], None] | None
+        Called with the agents of each cycle as it forms, e.g. to request a replan.
+        Not checkpointed, whoever restores the graph attaches it again.
+    """
+
+    def __init__(self, path_table) -> None:
+        """
+        Initializes a new instance of the WaitForGraph class.
+
+        Parameters:
+        -----------
+        path_table : PathReservation
+            The queues of the schedule being watched.
+        """
+        self.path_table = path_table
+        self.pending: Dict[int, Dict[int, Location]] = {}
+        self.head: Dict[int, int] = {}
+        self.tail: Dict[int, int] = {}
+        self.indices: Dict[Tuple[int, Location], Deque[int]] = {}
+        self.verified: Dict[int, int] = {}
+        self.waits_for: Dict[int, int] = {}
+        self.waited_on: Dict[int, Set[int]] = {}
+        self.blocked_at: Dict[int, Location] = {}
+        self.waiting_at: Dict[Location, Set[int]] = {}
+        self.deadlocks: Dict[int, Tuple[int, ...]] = {}
+        self.on_deadlock: Callable[[Tuple[int, ...]], None] | None = None
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state["on_deadlock"] = None
+        return state
+
+    def extended(self, agent_id: int, positions: Iterable[Position]) -> None:
+        """
+        Records locations appended to the path of an agent.
+        """
+        pending = self.pending.setdefault(agent_id, {})
+        index = self.tail.get(agent_id, 0)
+        for position in positions:
+            location = position.location()
+            pending[index] = location
+            self.indices.setdefault((agent_id, location), deque()).append(index)
+            index += 1
+        self.tail[agent_id] = index
+        if agent_id not in self.waits_for:
+            self._advance(agent_id)
+
+    def deleted(self, agent_id: int, position: Position) -> None:
+        """
+        Records that an agent has left a location, popping it from the head of its queue.
+        """
+        location = position.location()
+        indices = self.indices.get((agent_id, location))
+        if indices:
+            index = indices.popleft()
+            if not indices:
+                del self.indices[(agent_id, location)]
+            pending = self.pending[agent_id]
+            del pending[index]
+            head = self.head.get(agent_id, 0)
+            if index == head:
+                # Skip over any locations already removed out of order
+                head += 1
+                while head < self.tail[agent_id] and head not in pending:
+                    head += 1
+                self.head[agent_id] = head
+                self.verified[agent_id] = max(head, self.verified.get(agent_id, 0))
+            else:
+                self.verified[agent_id] = head
+
+        # The queue has a new head, anyone waiting on it may move again. Clear every
+        # stale edge before looking for cycles, so none is reported through one
+        self._refresh([agent_id, *self.waiting_at.pop(location, set())])
+
+    def locations(self, agent_id: int) -> List[Location]:
+        """
+        Returns the outstanding locations of an agent, its current location first.
+        """
+        return list(self.pending.get(agent_id, {}).values())
+
+    def waiters(self, agent_id: int) -> List[int]:
+        """
+        Returns the agents blocked behind an agent, which may move once it does.
+        """
+        return list(self.waited_on.get(agent_id, ()))
+
+    def cycles(self) -> List[Tuple[int, ...]]:
+        """
+        Returns every cyclic wait currently in the schedule.
+        """
+        return sorted(set(self.deadlocks.values()))
+
+    def _refresh(self, agent_ids: List[int]) -> None:
+        for agent_id in agent_ids:
+            self._clear(agent_id)
+        for agent_id in agent_ids:
+            self._advance(agent_id)
+
+    def _clear(self, agent_id: int) -> None:
+        head = self.waits_for.pop(agent_id, None)
+        if head is not None:
+            self.waited_on[head].discard(agent_id)
+        location = self.blocked_at.pop(agent_id, None)
+        if location is not None:
+            self.waiting_at.get(location, set()).discard(agent_id)
+        cycle = self.deadlocks.get(agent_id)
+        if cycle is not None:
+            for member in cycle:
+                self.deadlocks.pop(member, None)
+
+    def _advance(self, agent_id: int) -> None:
+        """
+        Finds the first location an agent is not scheduled at and records who it waits on.
+        """
+        self._clear(agent_id)
+        pending = self.pending.get(agent_id, {})
+        tail = self.tail.get(agent_id, 0)
+        # The last pending index the agent is known to be at the head of the queue of
+        reached = max(self.verified.get(agent_id, 0), self.head.get(agent_id, 0))
+        index = reached + 1
+        while index < tail:
+            location = pending.get(index)
+            if location is None:
+                index += 1
+                continue
+            queue = self.path_table.get(location)
+            if not queue:
+                break
+            head = queue[0].agent_id
+            if head != agent_id:
+                self.waits_for[agent_id] = head
+                self.waited_on.setdefault(head, set()).add(agent_id)
+                self.blocked_at[agent_id] = location
+                self.waiting_at.setdefault(location, set()).add(agent_id)
+                break
+            reached = index
+            index += 1
+        self.verified[agent_id] = reached
+        if agent_id in self.waits_for:
+            self._detect(agent_id)
+
+    def _holds(self, agent_id: int, location: Location) -> bool:
+        """
+        Checks if an agent cannot leave the head of the queue of a location without waiting.
+        """
+        # The agent moves freely up to the location before the one it is blocked at
+        indices = self.indices.get((agent_id, location))
+        last_reachable = max(self.verified.get(agent_id, 0), self.head.get(agent_id, 0))
+        return not indices or indices[0] >= last_reachable
+
+    def _detect(self, agent_id: int) -> None:
+        """
+        Follows the wait-for edges from a newly blocked agent, recording a cycle back to it.
+        """
+        cycle = [agent_id]
+        current = self.waits_for.get(agent_id)
+        while current is not None and current != agent_id and len(cycle) <= len(self.waits_for):
+            cycle.append(current)
+            current = self.waits_for.get(current)
+        if current != agent_id:
+            return
+        # A wait only lasts if the agent waited on is itself stuck holding that location
+        if not all(self._holds(self.waits_for[member], self.blocked_at[member]) for member in cycle):
+            return
+
+        # Rotate so the same cycle is reported identically whichever agent closed it
+        smallest = cycle.index(min(cycle))
+        members = tuple(cycle[smallest:] + cycle[:smallest])
+        for member in members:
+            self.deadlocks[member] = members
+        trace.warning("Deadlock detected between agents %s", members)
+        if self.on_deadlock is not None:
+            self.on_deadlock(members)
+
+    def released(self, agent_id: int, kept: int, locations: Iterable[Location]) -> None:
+        """
+        Records that all but the first `kept` pending locations of an agent were
+        dropped from their queues.
+        """
+        pending = self.pending.get(agent_id, {})
+        # Indices are appended in order, so the last item is always the latest location
+        while len(pending) > kept:
+            _, location = pending.popitem()
+            indices = self.indices[(agent_id, location)]
+            indices.pop()
+            if not indices:
+                del self.indices[(agent_id, location)]
+        last = next(reversed(pending), self.head.get(agent_id, 0))
+        self.tail[agent_id] = last + 1
+        self.verified[agent_id] = min(self.verified.get(agent_id, 0), last)
+
+        woken = [agent_id]
+        for location in locations:
+            woken.extend(self.waiting_at.pop(location, set()))
+        self._refresh(woken)
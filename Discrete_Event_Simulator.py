@@ -0,0 +1,358 @@
+import argparse
+import heapq
+import random
+import time
+from typing import Dict, List, Set, Tuple
+
+from Agent import Agent
+from Execution_Policy import ExecutionPolicy, OnlineExecutionPolicy
+from File_Handler import load_paths
+from Fully_Synchronised_Policy import FSP, OnlineFSP
+from Minimum_Communication_Policy import MCP, OnlineMCP
+from Planning_Grid import PlanningGrid
+from Position import Position
+from Rolling_Horizon_Planner import PlannerWorker, PrioritisedPlanner, load_goals
+from Status import Status
+from Unit_Execution_Policy import UnitExecutionPolicy
+import Tracing
+
+POLL = 0
+ARRIVE = 1
+
+
+class DelayModel:
+    """
+    Stochastic time a robot takes to drive a number of plan steps.
+
+    Attributes:
+    -----------
+    step_time : float
+        Nominal seconds per plan step.
+    jitter : float
+        Relative spread of each step, drawn uniformly from [-jitter, jitter].
+    delay_probability : float
+        Probability that a step is held up, e.g. by a person in the way.
+    delay_mean : float
+        Mean seconds of a hold up, exponentially distributed.
+    """
+
+    def __init__(
+        self, step_time: float = 1.0, jitter: float = 0.1, delay_probability: float = 0.0,
+        delay_mean: float = 5.0
+    ) -> None:
+        self.step_time: float = step_time
+        self.jitter: float = jitter
+        self.delay_probability: float = delay_probability
+        self.delay_mean: float = delay_mean
+
+    def sample(self, rng: random.Random, steps: int) -> float:
+        duration = 0.0
+        for _ in range(steps):
+            duration += self.step_time * (1 + rng.uniform(-self.jitter, self.jitter))
+            if self.delay_probability and rng.random() < self.delay_probability:
+                duration += rng.expovariate(1 / self.delay_mean)
+        return duration
+
+
+class PlanFeeder:
+    """
+    Extends the plans of an online policy from complete plans, as a planner would.
+
+    Attributes:
+    -----------
+    plans : Dict[int, List[Position]]
+        The complete plan of each agent.
+    fed : Dict[int, int]
+        The number of steps of each plan passed to the policy so far.
+    lookahead : int
+        The number of steps OnlineMCP commits ahead of each agent.
+    """
+
+    def __init__(self, plans: Dict[int, List[Position]], lookahead: int = 10) -> None:
+        self.plans: Dict[int, List[Position]] = plans
+        self.fed: Dict[int, int] = {agent_id: 0 for agent_id in plans}
+        self.lookahead: int = lookahead
+
+    def _take(self, agent_id: int, steps: int) -> List[Position]:
+        start = self.fed[agent_id]
+        extension = self.plans[agent_id][start:start + max(0, steps)]
+        self.fed[agent_id] = start + len(extension)
+        return extension
+
+    def feed(self, policy: OnlineExecutionPolicy) -> None:
+        extensions: List[Tuple[int, List[Position]]] = []
+        if isinstance(policy, OnlineMCP):
+            # Queues are ordered by insertion, so feed one timestep of every agent at a time
+            budgets = {
+                agent_id: min(len(self.plans[agent_id]) - self.fed[agent_id],
+                              self.lookahead - (len(agent.get_plan()) - agent.timestep))
+                for agent_id, agent in enumerate(policy.agents)
+            }
+            while any(budget > 0 for budget in budgets.values()):
+                timestep = min(self.fed[agent_id] for agent_id, budget in budgets.items() if budget > 0)
+                extensions = [(agent_id, self._take(agent_id, 1)) for agent_id, budget in budgets.items()
+                              if budget > 0 and self.fed[agent_id] == timestep]
+                for agent_id, _ in extensions:
+                    budgets[agent_id] -= 1
+                policy.extend_plans(extensions, lookahead=self.lookahead)
+        elif isinstance(policy, UnitExecutionPolicy):
+            # The next step is released once every agent has finished the current one
+            first = all(fed == 0 for fed in self.fed.values())
+            if first or all(status == Status.SUCCEEDED for _, status in policy.get_status()):
+                extensions = [(agent_id, self._take(agent_id, 1)) for agent_id in self.plans]
+                if all(extension for _, extension in extensions):
+                    policy.extend_plans(extensions)
+        else:
+            # Policies that do not truncate extensions take whole plans at once
+            extensions = [(agent_id, self._take(agent_id, len(plan))) for agent_id, plan in
+                          self.plans.items()]
+            if any(extension for _, extension in extensions):
+                policy.extend_plans(extensions)
+
+
+class DiscreteEventSimulator:
+    """
+    Drives an execution policy with simulated robots in simulated time.
+
+    Each robot asks the policy for its next window, drives it for a time drawn
+    from its DelayModel and reports SUCCEEDED on arrival. A robot whose window
+    does not move it waits until another robot reports, since only reports can
+    release it. A robot parks once it completes its plan, and the run ends when
+    every robot is parked or waiting and nothing is moving.
+
+    Attributes:
+    -----------
+    policy : ExecutionPolicy | OnlineExecutionPolicy
+        The policy under test.
+    feeder : PlanFeeder | PlannerWorker | None
+        Supplies plan extensions to an online policy after every report.
+    delays : DelayModel
+        The delay model of every robot.
+    list_positions : bool
+        Whether the policy takes positions as [x, y, theta] rather than a dict.
+    """
+
+    def __init__(
+        self,
+        policy: ExecutionPolicy | OnlineExecutionPolicy,
+        num_agents: int,
+        delays: DelayModel,
+        feeder: PlanFeeder | PlannerWorker | None = None,
+        seed: int = 0,
+    ) -> None:
+        self.policy = policy
+        self.num_agents: int = num_agents
+        self.delays: DelayModel = delays
+        self.feeder: PlanFeeder | PlannerWorker | None = feeder
+        self.list_positions: bool = isinstance(policy, (FSP, OnlineFSP))
+        self.rngs: List[random.Random] = [
+            random.Random(seed * 100003 + agent_id) for agent_id in range(num_agents)
+        ]
+
+        self.events: List[Tuple[float, int, int, int]] = []
+        self.sequence: int = 0
+        self.now: float = 0.0
+        self.poses: List[Position | None] = [None] * num_agents
+        self.windows: Dict[int, Tuple[List[Position], Tuple[int, int]]] = {}
+        self.completed: Dict[int, Tuple[int, int, Tuple[int, int], float]] = {}
+        self.waiting: Set[int] = set()
+        self.waiting_since: Dict[int, float] = {}
+        self.finished: Set[int] = set()
+
+        # Complete plans tell when a robot is done, lifelong planning has no end
+        self.plans: Dict[int, List[Position]] | None = None
+        if isinstance(feeder, PlanFeeder):
+            self.plans = feeder.plans
+        elif isinstance(policy, (FSP, MCP)):
+            self.plans = Agent.plans
+
+        self.makespan: float = 0.0
+        self.waiting_time: float = 0.0
+        self.policy_time: float = 0.0
+        self.policy_calls: int = 0
+        self.moves: int = 0
+
+    def _push(self, when: float, kind: int, agent_id: int) -> None:
+        self.sequence += 1
+        heapq.heappush(self.events, (when, self.sequence, kind, agent_id))
+
+    def _timed(self, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        self.policy_time += time.perf_counter() - start
+        self.policy_calls += 1
+        return result
+
+    def _feed(self) -> None:
+        if isinstance(self.feeder, PlannerWorker):
+            self._timed(self.feeder.step)
+        elif self.feeder is not None and isinstance(self.policy, OnlineExecutionPolicy):
+            self._timed(self.feeder.feed, self.policy)
+
+    def _poll(self, agent_id: int) -> None:
+        positions, (start, end) = self._timed(self.policy.get_next_position, agent_id)
+        target = positions[-1]
+        pose = self.poses[agent_id]
+        window = (start, end, target.location(), target.theta)
+        if pose is None:
+            moves = True
+        elif isinstance(self.policy, UnitExecutionPolicy):
+            # Every window looks alike, only a new step sets the agent EXECUTING
+            moves = self.policy.status[agent_id] == Status.EXECUTING
+        else:
+            moves = window != self.completed.get(agent_id) and (
+                end > start or target.location() != pose.location() or target.theta != pose.theta
+            )
+        if not moves:
+            self.waiting.add(agent_id)
+            self.waiting_since.setdefault(agent_id, self.now)
+            return
+
+        if agent_id in self.waiting_since:
+            self.waiting_time += self.now - self.waiting_since.pop(agent_id)
+        self.windows[agent_id] = (positions, (start, end))
+        self.completed[agent_id] = window
+        steps = 0 if pose is None else max(1, end - start)
+        self.moves += 1
+        self._push(self.now + self.delays.sample(self.rngs[agent_id], steps), ARRIVE, agent_id)
+
+    def _arrive(self, agent_id: int) -> None:
+        positions, (_, end) = self.windows.pop(agent_id)
+        target = positions[-1]
+        self.poses[agent_id] = target
+        position = [target.x, target.y, target.theta]
+        data = {
+            "agent_id": agent_id,
+            "timestep": end,
+            "status": "SUCCEEDED",
+            "position": position if self.list_positions else dict(zip(["x", "y", "theta"], position)),
+        }
+        self._timed(self.policy.update, data)
+        self.makespan = self.now
+        self._feed()
+
+        # A report is the only thing that can release a waiting robot
+        for waiting in self.waiting:
+            self._push(self.now, POLL, waiting)
+        self.waiting.clear()
+        if self._finished(agent_id, end):
+            self.finished.add(agent_id)
+        else:
+            self._push(self.now, POLL, agent_id)
+
+    def _finished(self, agent_id: int, end: int) -> bool:
+        """
+        Checks if a robot has completed its whole plan and can park.
+        """
+        if self.plans is None:
+            return False
+        plan = self.plans[agent_id]
+        if isinstance(self.policy, UnitExecutionPolicy) and isinstance(self.feeder, PlanFeeder):
+            # Unit windows carry no plan timestep, count the steps handed out instead
+            return self.feeder.fed[agent_id] == len(plan)
+        return end >= len(plan) - 1
+
+    def run(self, max_time: float = float("inf")) -> Dict[str, float]:
+        """
+        Runs the simulation until every robot is idle or max_time is reached.
+        Plans extended by the in-process planner never end, so need a max_time.
+
+        Returns:
+        --------
+        Dict[str, float]
+            Makespan and total waiting time in simulated seconds, and the wall
+            clock and policy CPU time of the run.
+        """
+        started = time.perf_counter()
+        self._feed()
+        for agent_id in range(self.num_agents):
+            self._push(0.0, POLL, agent_id)
+        while self.events and self.events[0][0] <= max_time:
+            self.now, _, kind, agent_id = heapq.heappop(self.events)
+            if kind == POLL:
+                if agent_id not in self.windows:
+                    self._poll(agent_id)
+            else:
+                self._arrive(agent_id)
+        wall = time.perf_counter() - started
+        return {
+            "makespan_s": self.makespan,
+            "waiting_time_s": self.waiting_time,
+            "moves": self.moves,
+            "finished_agents": len(self.finished),
+            "policy_calls": self.policy_calls,
+            "policy_time_s": self.policy_time,
+            "wall_time_s": wall,
+            "simulated_robot_s_per_wall_s": self.makespan * self.num_agents / wall if wall else 0.0,
+        }
+
+
+def build_policy(
+    name: str, num_agents: int, plan_file: str | None, map_file: str | None, goal_file: str | None
+) -> Tuple[ExecutionPolicy | OnlineExecutionPolicy, PlanFeeder | PlannerWorker | None]:
+    """
+    Creates a fresh policy by name, with the feeder for its plan extensions if it is online.
+    """
+    Agent.reset()
+    if name in ("FSP", "MCP"):
+        if plan_file is None:
+            raise ValueError(f"{name} needs a plan file")
+        return (FSP if name == "FSP" else MCP)(plan_file, num_agents), None
+
+    policy: OnlineExecutionPolicy
+    match name:
+        case "OnlineFSP":
+            policy = OnlineFSP(num_agents)
+        case "OnlineMCP":
+            policy = OnlineMCP(num_agents)
+        case "UnitExecutionPolicy":
+            policy = UnitExecutionPolicy(num_agents)
+        case _:
+            raise ValueError(f"Unknown execution policy {name}")
+    if map_file is not None and goal_file is not None and isinstance(policy, OnlineMCP):
+        tasks = load_goals(goal_file)
+        planner = PrioritisedPlanner(PlanningGrid.from_map_file(map_file),
+                                     {agent_id: seq[1:] for agent_id, seq in tasks.items()})
+        worker = PlannerWorker(policy, planner, starts={})
+        policy.extend_plans([(agent_id, [Position(*seq[0], 0)]) for agent_id, seq in tasks.items()])
+        return policy, worker
+    if plan_file is None:
+        raise ValueError(f"{name} needs a plan file, or a map and goals for OnlineMCP")
+    plans = load_paths(plan_file)
+    return policy, PlanFeeder({agent_id: plans[agent_id] for agent_id in range(num_agents)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare execution policies in simulated time")
+    parser.add_argument("--policies", nargs="+",
+                        default=["FSP", "MCP", "OnlineFSP", "OnlineMCP", "UnitExecutionPolicy"])
+    parser.add_argument("--plan-file", default="result.path")
+    parser.add_argument("--map", help=".map file for planning OnlineMCP in-process instead of a plan file")
+    parser.add_argument("--goals", help="JSON start and goal locations per agent, with --map")
+    parser.add_argument("--agents", type=int, help="Defaults to every agent in the plan or goal file")
+    parser.add_argument("--step-time", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--delay-probability", type=float, default=0.05)
+    parser.add_argument("--delay-mean", type=float, default=5.0)
+    parser.add_argument("--runs", type=int, default=10, help="Seeds to average over")
+    parser.add_argument("--max-time", type=float, default=float("inf"),
+                        help="Simulated seconds to stop at, needed with --map")
+    parser.add_argument("--trace-level", default="ERROR",
+                        help="DEBUG, INFO, WARNING or ERROR; skipped schedule removals trace at WARNING")
+    args = parser.parse_args()
+
+    Tracing.configure(args.trace_level)
+
+    num_agents: int = args.agents or (len(load_goals(args.goals)) if args.map and args.goals
+                                      else len(load_paths(args.plan_file)))
+    delays = DelayModel(args.step_time, args.jitter, args.delay_probability, args.delay_mean)
+    print(f"{'policy':20} {'makespan':>10} {'waiting':>10} {'policy ms':>10} {'robot-s/s':>12}")
+    for name in args.policies:
+        totals: Dict[str, float] = {}
+        for seed in range(args.runs):
+            policy, feeder = build_policy(name, num_agents, args.plan_file, args.map, args.goals)
+            results = DiscreteEventSimulator(policy, num_agents, delays, feeder, seed).run(args.max_time)
+            for key, value in results.items():
+                totals[key] = totals.get(key, 0.0) + value / args.runs
+        print(f"{name:20} {totals['makespan_s']:10.1f} {totals['waiting_time_s']:10.1f} "
+              f"{1000 * totals['policy_time_s']:10.2f} {totals['simulated_robot_s_per_wall_s']:12.0f}")
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Tuple
+
+from Metrics import Metrics
+
+# Recent dispatches kept per agent for the distributions
+HISTORY: int = 1024
+
+# The kinds of time between a report and the next motion window
+KINDS: Tuple[str, ...] = ("total", "schedule_wait", "controller_wait")
+
+
+def distribution(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarises samples in seconds as a count, mean and percentiles.
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean_s": sum(ordered) / len(ordered),
+        "p50_s": percentile(0.5),
+        "p90_s": percentile(0.9),
+        "p99_s": percentile(0.99),
+        "max_s": ordered[-1],
+    }
+
+
+class DispatchLatencyTracker:
+    """
+    Measures the time each agent spends between reporting SUCCEEDED and
+    receiving its next motion window.
+
+    Every report starts a wait, which ends at the first get_next_position
+    whose window ends past the reported timestep. The wait is split at the
+    last poll that returned no motion: until then the agent was waiting on
+    the schedule, after it on the controller, i.e. its poll interval and the
+    latency of the request that dispatched it.
+
+    Attributes:
+    -----------
+    pending : Dict[int, Tuple[float, int, float | None]]
+        The report time, reported timestep and last empty poll of each waiting agent.
+    samples : Dict[int, Dict[str, Deque[float]]]
+        Recent seconds of each kind of wait, per agent.
+    metrics : Metrics | None
+        Where the fleet-wide dispatch_wait_seconds histograms are recorded, if anywhere.
+    """
+
+    def __init__(
+        self, metrics: Metrics | None = None, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.metrics: Metrics | None = metrics
+        self.clock: Callable[[], float] = clock
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Tuple[float, int, float | None]] = {}
+        self.samples: Dict[int, Dict[str, Deque[float]]] = {}
+
+    def reported(self, agent_id: int, timestep: int) -> None:
+        """
+        Records that an agent reported SUCCEEDED at a timestep and now waits for a window.
+        """
+        with self.lock:
+            self.pending[agent_id] = (self.clock(), timestep, None)
+
+    def polled(self, agent_id: int, start_timestep: int, end_timestep: int) -> None:
+        """
+        Records the window returned to an agent by get_next_position.
+        """
+        now = self.clock()
+        with self.lock:
+            waiting = self.pending.get(agent_id)
+            if waiting is None:
+                return
+            reported_at, timestep, last_empty = waiting
+            if end_timestep <= start_timestep or end_timestep <= timestep:
+                self.pending[agent_id] = (reported_at, timestep, now)
+                return
+
+            del self.pending[agent_id]
+            schedule_wait = 0.0 if last_empty is None else last_empty - reported_at
+            controller_wait = now - (reported_at if last_empty is None else last_empty)
+            samples = self.samples.setdefault(
+                agent_id, {kind: deque(maxlen=HISTORY) for kind in KINDS}
+            )
+            samples["total"].append(schedule_wait + controller_wait)
+            samples["schedule_wait"].append(schedule_wait)
+            samples["controller_wait"].append(controller_wait)
+        if self.metrics is not None:
+            self.metrics.observe("dispatch_wait_seconds", (("cause", "schedule"),), schedule_wait)
+            self.metrics.observe("dispatch_wait_seconds", (("cause", "controller"),), controller_wait)
+
+    def summary(self) -> Dict:
+        """
+        Returns the distributions of each kind of wait, fleet-wide and per agent.
+        """
+        with self.lock:
+            recent = {
+                agent_id: {kind: list(values) for kind, values in samples.items()}
+                for agent_id, samples in self.samples.items()
+            }
+            waiting = {agent_id: self.clock() - reported_at
+                       for agent_id, (reported_at, _, _) in self.pending.items()}
+
+        fleet: Dict[str, List[float]] = {kind: [] for kind in KINDS}
+        agents = []
+        for agent_id in sorted(set(recent) | set(waiting)):
+            samples = recent.get(agent_id, {kind: [] for kind in KINDS})
+            for kind in KINDS:
+                fleet[kind].extend(samples[kind])
+            agents.append({
+                "agent_id": agent_id,
+                "waiting_s": waiting.get(agent_id),
+                **{kind: distribution(samples[kind]) for kind in KINDS},
+            })
+        return {
+            "fleet": {kind: distribution(fleet[kind]) for kind in KINDS},
+            "agents": agents,
+        }
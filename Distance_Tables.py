@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np  # type: ignore
+
+from Planning_Grid import PlanningGrid
+from Tracing import Tracer
+
+trace = Tracer("planner")
+
+Location = Tuple[int, int]
+
+# Distance of cells that cannot reach a location, larger than any path
+UNREACHABLE: int = 1 << 30
+
+
+def wavefront(blocked: np.ndarray, source: Location) -> np.ndarray:
+    """
+    Computes the 4-connected shortest path distance of every cell to a location.
+
+    The search grows the whole frontier by one step per pass, so it makes as
+    many vectorised passes over the grid as the farthest cell is away.
+
+    Returns:
+    --------
+    np.ndarray
+        Height x width int32 distances, UNREACHABLE for blocked and disconnected cells.
+    """
+    distances = np.full(blocked.shape, UNREACHABLE, dtype=np.int32)
+    row, column = -source[1], source[0]
+    if not (0 <= row < blocked.shape[0] and 0 <= column < blocked.shape[1]) or blocked[row, column]:
+        return distances
+    open_cells = ~blocked
+    frontier = np.zeros(blocked.shape, dtype=bool)
+    frontier[row, column] = True
+    distances[row, column] = 0
+    open_cells[row, column] = False
+    step = 0
+    while frontier.any():
+        step += 1
+        grown = np.zeros_like(frontier)
+        grown[1:] |= frontier[:-1]
+        grown[:-1] |= frontier[1:]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & open_cells
+        open_cells &= ~frontier
+        distances[frontier] = step
+    return distances
+
+
+class DistanceTables:
+    """
+    Exact shortest path distances over a static planning grid, for heuristics and ETAs.
+
+    A table holds the distance of every cell to one location; tables are
+    built for the goals of the fleet and, optionally, for a few landmarks far
+    apart, and cached on disk under a hash of the grid so they are only built
+    once per map. A lookup is O(1): exact when either end has a table, else
+    the landmark (ALT) lower bound, else the Manhattan distance.
+
+    Attributes:
+    -----------
+    grid : PlanningGrid
+        The grid the distances are over.
+    key : str
+        The hash of the grid naming its cache directory.
+    cache_dir : str | None
+        Where tables are cached, None to only keep them in memory.
+    tables : Dict[Location, np.ndarray]
+        The distance table of each location.
+    landmarks : List[Location]
+        The locations whose tables bound the distance between any two cells.
+    """
+
+    def __init__(self, grid: PlanningGrid, cache_dir: str | None = None) -> None:
+        """
+        Initializes a new instance of the DistanceTables class.
+
+        Parameters:
+        -----------
+        grid : PlanningGrid
+            The grid the distances are over.
+        cache_dir : str | None
+            Where tables are cached, None to only keep them in memory.
+        """
+        self.grid: PlanningGrid = grid
+        self.blocked: np.ndarray = np.asarray(grid.blocked, dtype=bool).reshape(grid.height, grid.width)
+        digest = hashlib.sha256(f"{grid.height}x{grid.width}".encode())
+        digest.update(np.packbits(self.blocked).tobytes())
+        self.key: str = digest.hexdigest()[:16]
+        self.cache_dir: str | None = None if cache_dir is None else os.path.join(cache_dir, self.key)
+        self.lock = threading.Lock()
+        self.tables: Dict[Location, np.ndarray] = {}
+        self.landmarks: List[Location] = []
+
+    def table(self, location: Location) -> np.ndarray:
+        """
+        Returns the distances of every cell to a location, building and caching them if needed.
+        """
+        table = self.tables.get(location)
+        if table is not None:
+            return table
+        cache_dir = self.cache_dir
+        path = None if cache_dir is None else os.path.join(cache_dir, f"{location[0]}_{location[1]}.npy")
+        if path is not None and os.path.exists(path):
+            table = np.load(path, mmap_mode="r")
+        else:
+            table = wavefront(self.blocked, location)
+            trace.debug("Built the distance table of %s", location)
+            if cache_dir is not None and path is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                # Written aside and renamed, as other processes may be loading the same map
+                temporary = f"{path}.{os.getpid()}.tmp.npy"
+                np.save(temporary, table)
+                os.replace(temporary, path)
+        with self.lock:
+            self.tables[location] = table
+        return table
+
+    def precompute(self, locations: Iterable[Location], landmarks: int = 0) -> None:
+        """
+        Builds the tables of the given locations and picks landmarks far apart.
+
+        Landmarks are chosen greedily, each the cell farthest from those before
+        it, starting from the cell farthest from whichever given location reaches
+        the most cells, as that is the part of the map the agents use.
+        """
+        locations = list(locations)
+        for location in locations:
+            self.table(location)
+        free = np.argwhere(~self.blocked)
+        if landmarks <= 0 or len(free) == 0:
+            return
+        seeds = [*locations, (int(free[0][1]), -int(free[0][0]))]
+        seed = max(seeds, key=lambda location: int((self.table(location) < UNREACHABLE).sum()))
+        nearest = self.table(seed).astype(np.int64)
+        for _ in range(landmarks):
+            reachable = np.where(nearest < UNREACHABLE, nearest, -1)
+            row, column = np.unravel_index(int(np.argmax(reachable)), reachable.shape)
+            candidate: Location = (int(column), -int(row))
+            if reachable[row, column] <= 0 or candidate in self.landmarks:
+                break
+            self.landmarks.append(candidate)
+            nearest = np.minimum(nearest, self.table(candidate))
+
+    def _lookup(self, table: np.ndarray, location: Location) -> int:
+        row, column = -location[1], location[0]
+        if 0 <= row < table.shape[0] and 0 <= column < table.shape[1]:
+            return int(table[row, column])
+        return UNREACHABLE
+
+    def exact(self, start: Location, goal: Location) -> int | None:
+        """
+        Returns the shortest path distance between two locations if either has a table.
+        """
+        table = self.tables.get(goal)
+        if table is not None:
+            return self._lookup(table, start)
+        # The grid is undirected, so the table of the start serves as well
+        table = self.tables.get(start)
+        if table is not None:
+            return self._lookup(table, goal)
+        return None
+
+    def distance(self, start: Location, goal: Location) -> int:
+        """
+        Returns the shortest path distance between two locations, or a lower bound on it
+        if neither has a table; an admissible heuristic for space-time A*.
+        """
+        exact = self.exact(start, goal)
+        # Disconnected cells, e.g. a goal inside an obstacle, fall back to the bound
+        if exact is not None and exact < UNREACHABLE:
+            return exact
+        bound = abs(start[0] - goal[0]) + abs(start[1] - goal[1])
+        for landmark in self.landmarks:
+            table = self.tables[landmark]
+            to_start, to_goal = self._lookup(table, start), self._lookup(table, goal)
+            if to_start < UNREACHABLE and to_goal < UNREACHABLE:
+                bound = max(bound, abs(to_start - to_goal))
+        return bound
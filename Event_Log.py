@@ -0,0 +1,175 @@
+import gzip
+import inspect
+import json
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from Position import Position
+
+class EventLog:
+    """
+    Append-only log of every input to an execution policy, for replaying incidents.
+
+    Each call is one compact JSON line, {"t": seconds since the log was opened,
+    "call": name, "args": {...}}, after a header line recording the policy and
+    the wall clock time it started at. Lines are written to a large buffer that
+    a daemon thread flushes every flush_interval seconds, and that is flushed
+    when the log is closed, so logging costs a json.dumps per call and records
+    reach the file even when calls stop. Paths ending in .gz are gzipped.
+
+    Attributes:
+    -----------
+    path : str
+        The file the log is appended to.
+    flush_interval : float
+        The longest time in seconds records may sit in the buffer.
+    events : int
+        The number of calls logged.
+    """
+
+    def __init__(self, path: str, policy: Any = None, flush_interval: float = 1.0) -> None:
+        """
+        Initializes a new instance of the EventLog class.
+
+        Parameters:
+        -----------
+        path : str
+            The file to append the log to, gzipped if it ends in .gz.
+        policy : Any
+            The execution policy being logged, named in the header.
+        flush_interval : float
+            The longest time in seconds records may sit in the buffer.
+        """
+        self.path: str = path
+        self.flush_interval: float = flush_interval
+        self.lock = threading.Lock()
+        self.file: gzip.GzipFile | BinaryIO = (gzip.open(path, "ab") if path.endswith(".gz")
+                                else open(path, "ab", buffering=1 << 16))
+        self.started: float = time.monotonic()
+        self.events: int = 0
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="EventLogFlusher",
+                                         daemon=True)
+        self._write({
+            "call": "start",
+            "time": time.time(),
+            "policy": type(policy).__name__ if policy is not None else None,
+            "num_agents": len(policy.agents) if hasattr(policy, "agents") else None,
+        })
+        self._flusher.start()
+
+    def _write(self, record: Dict) -> None:
+        self.file.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def record(self, call: str, **args) -> None:
+        """
+        Appends a policy call and its arguments, e.g. record("update", data=data).
+        """
+        now = time.monotonic()
+        line = {"t": round(now - self.started, 6), "call": call, "args": args}
+        with self.lock:
+            self._write(line)
+            self.events += 1
+
+    def update(self, data: Dict) -> None:
+        self.record("update", data=data)
+
+    def extend_plans(
+        self, extensions: List[Tuple[int, List[Position]]], lookahead: int | None = None
+    ) -> None:
+        args: Dict[str, Any] = {
+            "extensions": [[agent_id, [position.to_tuple() for position in extension]]
+                           for agent_id, extension in extensions],
+        }
+        if lookahead is not None:
+            args["lookahead"] = lookahead
+        self.record("extend_plans", **args)
+
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        self.record("abort_agent", agent_id=agent_id, release=release)
+
+    def flush(self) -> None:
+        with self.lock:
+            self.file.flush()
+
+    def _flush_periodically(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._flusher.join()
+        with self.lock:
+            self.file.close()
+
+
+def read_events(path: str) -> Iterator[Dict]:
+    """
+    Reads the records of an event log in order, starting with its header.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as fin:
+        for line in fin:
+            if line.strip():
+                yield json.loads(line)
+
+
+def join_segments(records: Iterable[Dict]) -> Tuple[Dict, List[Dict]]:
+    """
+    Splits the records of an event log into its first header and its events.
+
+    A log appended to across restarts holds a header at the start of each
+    run, with t counting from 0 again after it. Later headers are dropped
+    and the t of their events rebased onto the first run, by the wall clock
+    time each header was written at, so the events keep their pacing.
+
+    Returns:
+    --------
+    Tuple[Dict, List[Dict]]
+        The first header, empty if the log has none, and every other record.
+    """
+    header: Dict = {}
+    events: List[Dict] = []
+    offset = 0.0
+    for record in records:
+        if record["call"] == "start":
+            if not header:
+                header = record
+            else:
+                offset = record["time"] - header["time"]
+            continue
+        if offset:
+            record = {**record, "t": round(record["t"] + offset, 6)}
+        events.append(record)
+    return header, events
+
+
+def apply_event(policy: Any, event: Dict) -> bool:
+    """
+    Makes the policy call an event records.
+
+    Returns:
+    --------
+    bool
+        False if the policy does not support the call, e.g. extend_plans on an offline policy.
+    """
+    args = event["args"]
+    match event["call"]:
+        case "update":
+            policy.update(args["data"])
+        case "extend_plans":
+            if not hasattr(policy, "extend_plans"):
+                return False
+            extensions = [(agent_id, [Position(*position) for position in extension])
+                          for agent_id, extension in args["extensions"]]
+            # Only OnlineMCP takes a lookahead, a log of one may be replayed into any online policy
+            if "lookahead" in args and "lookahead" in inspect.signature(policy.extend_plans).parameters:
+                policy.extend_plans(extensions, lookahead=args["lookahead"])
+            else:
+                policy.extend_plans(extensions)
+        case "abort_agent":
+            policy.abort_agent(args["agent_id"], args["release"])
+        case _:
+            raise ValueError(f"Unknown event {event['call']}")
+    return True
@@ -1,6 +1,7 @@
 import abc
-from typing import Dict, List, Tuple
+from typing import Dict, List, Sequence, Tuple
 
+from Agent import Agent
 from Position import Position
 from Status import Status
 
@@ -8,8 +9,13 @@ from Status import Status
 class ExecutionPolicy(abc.ABC):
     """
     Abstract base class for execution policies.
+
+    Attributes:
+    - agents (Sequence[Agent]): The agents executing the plans, indexed by agent id.
     """
 
+    agents: Sequence[Agent]
+
     @abc.abstractmethod
     def get_next_position(self, agent_id: int) -> Tuple[List[Position], Tuple[int,int]]:
         """
@@ -33,12 +39,29 @@ class ExecutionPolicy(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Abstract method to abort an agent that has stopped reporting.
+
+        Args:
+            agent_id (int): The id of the agent to abort.
+            release (bool): Whether to release the agent's outstanding reservations
+                so other agents can proceed, rather than freezing them in place.
+        """
+        raise NotImplementedError
+
 
 class OnlineExecutionPolicy(abc.ABC):
     """
     Abstract base class for online execution policies that can extend plans.
+
+    Attributes:
+    - agents (Sequence[Agent]): The agents executing the plans, indexed by agent id.
     """
 
+    agents: Sequence[Agent]
+
     @abc.abstractmethod
     def get_next_position(self, agent_id: int) -> Tuple[List[Position], Tuple[int, int]]:
         """
@@ -62,6 +85,18 @@ class OnlineExecutionPolicy(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Abstract method to abort an agent that has stopped reporting.
+
+        Args:
+            agent_id (int): The id of the agent to abort.
+            release (bool): Whether to release the agent's outstanding reservations
+                so other agents can proceed, rather than freezing them in place.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_agent_locations(self) -> Tuple[List[Tuple[Position, int]], bool]:
         """
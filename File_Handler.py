@@ -1,7 +1,30 @@
 import os
-from typing import Dict, List
+import re
+from typing import Dict, List, Tuple
 
 from Position import Position
+from Tracing import Tracer
+
+trace = Tracer("policy")
+
+# The agent id starting a path line, e.g. "3: " or "Agent 3:"
+AGENT_ID = re.compile(r"\s*(?:Agent\s*)?(\d+)\s*:")
+# A pose, e.g. "(4.0,-0.0,90.0)" or "Position(0, -1, 90)"
+TRIPLE = re.compile(r"\(\s*([-+\d.eE]+)\s*,\s*([-+\d.eE]+)\s*,\s*([-+\d.eE]+)\s*\)")
+
+Pose = Tuple[float, float, float]
+
+
+def parse_path_line(line: str) -> Tuple[int, List[Pose]]:
+    """
+    Parses the agent id and poses of a path line, as written to result.path,
+    "Agent 3:(0,0,90)->(0,-1,90)", or as "3: [Position(0,0,90), Position(0,-1,90)]".
+    """
+    match = AGENT_ID.match(line)
+    if match is None:
+        raise ValueError(f"No agent id at the start of {line[:40]!r}")
+    triples = TRIPLE.findall(line, match.end())
+    return int(match.group(1)), [(float(x), float(y), float(theta)) for x, y, theta in triples]
 
 
 def load_paths(path_file: str | None = None) -> Dict[int, List[Position]]:
@@ -16,9 +39,9 @@ def load_paths(path_file: str | None = None) -> Dict[int, List[Position]]:
         agent index and the value is a list of Positions.
     """
 
-    print("Loading paths from " + str(path_file), end="... ")
+    trace.info("Loading paths from %s", path_file)
     if path_file is None or not os.path.exists(path_file):
-        print("\nNo path file is found!")
+        trace.error("No path file is found at %s", path_file)
         exit(1)
 
     paths: Dict[int, List[Position]] = dict()
@@ -0,0 +1,193 @@
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+from Position import Position
+from Schedule_Table import OnlineSchedule, ScheduleTable
+
+Location = Tuple[int, int]
+
+# Number of plan steps examined per agent in each vectorised pass
+BLOCK: int = 16
+
+
+class FleetPlans:
+    """
+    Array-backed copy of the plans of a fleet, kept in sync incrementally.
+
+    Attributes:
+    -----------
+    cells : Dict[Location, int]
+        Maps each location visited by any plan to a dense cell id.
+    locations : List[Location]
+        The location of each cell id.
+    cell_ids : np.ndarray
+        (agents, capacity) cell ids of every plan step.
+    thetas : np.ndarray
+        (agents, capacity) headings of every plan step.
+    lengths : np.ndarray
+        The number of steps stored for each agent.
+    """
+
+    def __init__(self, num_agents: int, capacity: int = 64) -> None:
+        self.cells: Dict[Location, int] = {}
+        self.locations: List[Location] = []
+        self.cell_ids = np.full((num_agents, capacity), -1, dtype=np.int64)
+        self.thetas = np.zeros((num_agents, capacity), dtype=np.float64)
+        self.lengths = np.zeros(num_agents, dtype=np.int64)
+
+    def _cell(self, location: Location) -> int:
+        cell = self.cells.get(location)
+        if cell is None:
+            cell = self.cells[location] = len(self.locations)
+            self.locations.append(location)
+        return cell
+
+    def truncated(self, agent_id: int, timestep: int) -> None:
+        """
+        Marks the steps of an agent from a timestep on as stale, when its plan is cut there.
+
+        The plan may be extended again before the next sync, so its length alone
+        cannot tell which stored steps still match it.
+        """
+        self.lengths[agent_id] = min(int(self.lengths[agent_id]), timestep)
+
+    def sync(self, plans: List[List[Position]]) -> None:
+        """
+        Copies any steps appended to the plans since the last sync, or since they were truncated.
+        """
+        longest = max((len(plan) for plan in plans), default=0)
+        if longest > self.cell_ids.shape[1]:
+            capacity = max(longest, 2 * self.cell_ids.shape[1])
+            grown_ids = np.full((len(plans), capacity), -1, dtype=np.int64)
+            grown_thetas = np.zeros((len(plans), capacity), dtype=np.float64)
+            grown_ids[:, :self.cell_ids.shape[1]] = self.cell_ids
+            grown_thetas[:, :self.thetas.shape[1]] = self.thetas
+            self.cell_ids, self.thetas = grown_ids, grown_thetas
+
+        for agent_id, plan in enumerate(plans):
+            stored = int(self.lengths[agent_id])
+            for timestep in range(stored, len(plan)):
+                self.cell_ids[agent_id, timestep] = self._cell(plan[timestep].location())
+                self.thetas[agent_id, timestep] = plan[timestep].theta
+            self.lengths[agent_id] = len(plan)
+
+
+class FleetDispatcher:
+    """
+    Computes the dispatchable window of every agent of an MCP policy at once.
+
+    The result for each agent is identical to get_next_position: starting at
+    the agent's timestep, the window grows while the agent is at the head of
+    the schedule for its next location, and stops after the first turn.
+    Each pass looks at the next BLOCK steps of every agent still extending,
+    resolving the head of each distinct location once per pass.
+
+    Attributes:
+    -----------
+    policy : MCP | OnlineMCP
+        The policy whose agents and schedule are read.
+    plans : FleetPlans
+        Array-backed plans of the agents.
+    """
+
+    def __init__(self, policy) -> None:
+        """
+        Initializes the FleetDispatcher class.
+
+        Parameters:
+        -----------
+        policy : MCP | OnlineMCP
+            The policy whose agents and schedule are read.
+        """
+        self.policy = policy
+        self.plans: FleetPlans = FleetPlans(len(policy.agents))
+
+    def _heads(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Looks up the agent scheduled next at each cell, -1 if none.
+
+        Returns:
+        --------
+        Tuple[np.ndarray, np.ndarray]
+            Heads indexed by cell id, and flags for cells with an empty online queue.
+        """
+        schedule: ScheduleTable | OnlineSchedule = self.policy.schedule_table
+        heads = np.full(len(self.plans.locations), -1, dtype=np.int64)
+        empty = np.zeros(len(self.plans.locations), dtype=bool)
+        for cell in cells.tolist():
+            location = self.plans.locations[cell]
+            if isinstance(schedule, OnlineSchedule):
+                queue = schedule.path_table.get(location)
+                if queue:
+                    heads[cell] = queue[0].agent_id
+                else:
+                    empty[cell] = True
+            else:
+                # Reservations are sorted by timestep, so the first is the next agent through
+                intervals = schedule.reservations.cells.get(location)
+                if intervals:
+                    heads[cell] = intervals[0][2]
+        return heads, empty
+
+    def windows(self) -> Dict[int, Tuple[List[Position], Tuple[int, int]]]:
+        """
+        Returns the next positions and the start and end timesteps of every agent.
+
+        Returns:
+        --------
+        Dict[int, Tuple[List[Position], Tuple[int, int]]]
+            Maps each agent_id to what get_next_position(agent_id) would return.
+
+        Raises:
+        -------
+        ValueError
+            If an agent reaches a location with no online schedule at all,
+            as OnlineSchedule.scheduled does.
+        """
+        agents = self.policy.agents
+        plans = [agent.get_plan() for agent in agents]
+        self.plans.sync(plans)
+
+        lengths = self.plans.lengths
+        timesteps = np.array([agent.timestep for agent in agents], dtype=np.int64)
+        started = np.array([agent.position is not None for agent in agents], dtype=bool)
+        start_theta = self.plans.thetas[np.arange(len(agents)), np.minimum(timesteps, lengths - 1)]
+
+        ends = timesteps.copy()
+        active = started & (timesteps + 1 < lengths)
+        offset = 1
+        while active.any():
+            rows = np.nonzero(active)[0]
+            steps = timesteps[rows, None] + offset + np.arange(BLOCK)[None, :]
+            valid = steps < lengths[rows, None]
+            steps = np.where(valid, steps, 0)
+            cells = self.plans.cell_ids[rows[:, None], steps]
+
+            heads, empty = self._heads(np.unique(cells[valid]))
+            scheduled = valid & (heads[cells] == rows[:, None])
+            turning = self.plans.thetas[rows[:, None], steps] != start_theta[rows, None]
+            stopped = ~(scheduled & ~turning)
+
+            first_stop = np.where(stopped.any(axis=1), stopped.argmax(axis=1), BLOCK)
+            at_stop = np.minimum(first_stop, BLOCK - 1)
+            stop_valid = (first_stop < BLOCK) & valid[np.arange(len(rows)), at_stop]
+            if (stop_valid & empty[cells[np.arange(len(rows)), at_stop]]).any():
+                raise ValueError("Position has no schedules at all, not planned to be traversed")
+
+            # A scheduled turn is taken before stopping
+            taken = first_stop + (stop_valid & scheduled[np.arange(len(rows)), at_stop])
+            ends[rows] += taken
+            active[rows] = first_stop == BLOCK
+            offset += BLOCK
+
+        results: Dict[int, Tuple[List[Position], Tuple[int, int]]] = {}
+        for agent_id, agent in enumerate(agents):
+            plan = plans[agent_id]
+            if agent.position is None:
+                results[agent_id] = ([plan[0]], (0, 0))
+                continue
+            start, end = int(timesteps[agent_id]), int(ends[agent_id])
+            positions = [agent.view_position(start)] + plan[start + 1:end + 1]
+            results[agent_id] = (positions, (start, end))
+        return results
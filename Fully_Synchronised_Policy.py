@@ -1,9 +1,12 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
 
 from Agent import Agent, OnlineAgent
 from Execution_Policy import ExecutionPolicy, OnlineExecutionPolicy
 from Position import Position
 from Status import Status
+from Tracing import Tracer
+
+trace = Tracer("policy")
 
 
 class FSP(ExecutionPolicy):
@@ -39,6 +42,7 @@ class FSP(ExecutionPolicy):
         """
         self.agents: List[Agent] = [Agent(plan_file) for _ in range(num_agent)]
         self.timestep: int = 0
+        self.released: Set[int] = set()
 
     def get_next_position(self, agent_id: int) -> Tuple[List[Position], Tuple[int, int]]:
         """
@@ -59,7 +63,8 @@ class FSP(ExecutionPolicy):
         agent = self.agents[agent_id]
         start_timestep = self.timestep
 
-        if all(agent.status == Status.SUCCEEDED for agent in self.agents):
+        if all(agent.status == Status.SUCCEEDED or index in self.released
+               for index, agent in enumerate(self.agents)):
             self.timestep += 1
             agent.status = Status.EXECUTING
 
@@ -75,20 +80,21 @@ class FSP(ExecutionPolicy):
             A dictionary containing the data to update the agent with.
         """
         if "agent_id" not in data:
-            print("Error: Agent ID not found in data.")
+            trace.error("Agent ID not found in data")
             exit(1)
 
         agent_id: int = data["agent_id"]
         agent: Agent = self.agents[agent_id]  # Mutate Agent Data
+        self.released.discard(agent_id)
 
         if "position" not in data:
-            print("Error: Position not found in data.")
+            trace.error("Position not found in data")
             exit(1)
 
         agent.position = Position(*data["position"])
 
         if "status" not in data:
-            print("Error: Status not found in data.")
+            trace.error("Status not found in data")
             exit(1)
 
         agent.status = Status.from_string(data["status"])
@@ -96,6 +102,22 @@ class FSP(ExecutionPolicy):
         if agent.status == Status.SUCCEEDED:
             agent.position = agent.view_position(agent.timestep)
 
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Aborts an agent that has stopped reporting.
+
+        Parameters:
+        -----------
+        agent_id : int
+            The index of the agent.
+        release : bool
+            Whether to stop holding the other agents back for this agent
+            until it reports again.
+        """
+        self.agents[agent_id].status = Status.ABORTED
+        if release:
+            self.released.add(agent_id)
+
 
 class OnlineFSP(OnlineExecutionPolicy):
     """
@@ -134,6 +156,7 @@ class OnlineFSP(OnlineExecutionPolicy):
             else:
                 raise ValueError("Plans were not intialised")
         self.timestep: int = 0
+        self.released: Set[int] = set()
 
     def extend_plans(self, extensions: List[Tuple[int, List[Position]]]) -> None:
         """
@@ -147,13 +170,13 @@ class OnlineFSP(OnlineExecutionPolicy):
         """
         for (agent_id, extension) in extensions:
             agent = self.agents[agent_id]
-            # print(agent.plans)
             for next_pos in extension:
                 if agent.plans is not None:
                     agent.plans[agent_id].append(next_pos)
                 else:
                     raise ValueError("Plans were not initialised")
-        print(agent.plans)
+            if trace.enabled(agent_id=agent_id):
+                trace.debug("Agent %d: %s", agent_id, agent.get_plan()[-15:], agent_id=agent_id)
 
     def get_agent_locations(self) -> Tuple[List[Tuple[Position, int]], bool]:
         """
@@ -174,6 +197,9 @@ class OnlineFSP(OnlineExecutionPolicy):
                 all_started = False
         return agent_positions, all_started
 
+    def get_status(self) -> List[Tuple[int, Status]]:
+        return [(agent._id, agent.status) for agent in self.agents]
+
     def get_next_position(self, agent_id: int) -> Tuple[List[Position], Tuple[int, int]]:
         """
         Returns the next position of the agent at the given index and the
@@ -192,7 +218,8 @@ class OnlineFSP(OnlineExecutionPolicy):
         """
         agent = self.agents[agent_id]
         start_timestep = self.timestep
-        if all(agent.status == Status.SUCCEEDED for agent in self.agents):
+        if all(agent.status == Status.SUCCEEDED or index in self.released
+               for index, agent in enumerate(self.agents)):
             self.timestep += 1
             agent.status = Status.EXECUTING
 
@@ -208,23 +235,40 @@ class OnlineFSP(OnlineExecutionPolicy):
             A dictionary containing the data to update the agent with.
         """
         if "agent_id" not in data:
-            print("Error: Agent ID not found in data.")
+            trace.error("Agent ID not found in data")
             exit(1)
 
         agent_id: int = data["agent_id"]
         agent: Agent = self.agents[agent_id]  # Mutate Agent Data
+        self.released.discard(agent_id)
 
         if "position" not in data:
-            print("Error: Position not found in data.")
+            trace.error("Position not found in data")
             exit(1)
 
         agent.position = Position(*data["position"])
 
         if "status" not in data:
-            print("Error: Status not found in data.")
+            trace.error("Status not found in data")
             exit(1)
 
         agent.status = Status.from_string(data["status"])
 
         if agent.status == Status.SUCCEEDED:
             agent.position = agent.view_position(agent.timestep)
+
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Aborts an agent that has stopped reporting.
+
+        Parameters:
+        -----------
+        agent_id : int
+            The index of the agent.
+        release : bool
+            Whether to stop holding the other agents back for this agent
+            until it reports again.
+        """
+        self.agents[agent_id].status = Status.ABORTED
+        if release:
+            self.released.add(agent_id)
@@ -0,0 +1,226 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Set, Tuple
+
+from Tracing import Tracer
+
+trace = Tracer("heartbeat")
+
+# Slot bits per level of the timer wheel: 256 ticks, then 64 slots per level above
+LEVEL_BITS: List[int] = [8, 6, 6, 6]
+
+
+class TimerWheel:
+    """
+    A hierarchical timer wheel with O(1) scheduling and cancellation.
+
+    Timers due within 256 ticks sit in the slot of their deadline on the
+    first level; later timers sit on a coarser level and are cascaded down
+    when the wheel reaches their slot.
+
+    Attributes:
+    -----------
+    tick : float
+        The resolution of the wheel in seconds.
+    current : int
+        The last tick the wheel has advanced to.
+    levels : List[List[Set[Hashable]]]
+        The slots of each level, holding the keys of the timers in them.
+    timers : Dict[Hashable, Tuple[int, int, int]]
+        Maps a key to the deadline tick, level and slot of its timer.
+    """
+
+    def __init__(self, tick: float, now: float) -> None:
+        """
+        Initializes a new instance of the TimerWheel class.
+
+        Parameters:
+        -----------
+        tick : float
+            The resolution of the wheel in seconds.
+        now : float
+            The time the wheel starts at.
+        """
+        self.tick: float = tick
+        self.current: int = self._to_tick(now)
+        self.levels: List[List[Set[Hashable]]] = [[set() for _ in range(1 << bits)] for bits in LEVEL_BITS]
+        self.timers: Dict[Hashable, Tuple[int, int, int]] = {}
+        self._shifts: List[int] = [sum(LEVEL_BITS[:level]) for level in range(len(LEVEL_BITS))]
+
+    def _to_tick(self, seconds: float) -> int:
+        return int(seconds / self.tick)
+
+    def _place(self, key: Hashable, deadline: int) -> None:
+        deadline = min(deadline, self.current + (1 << sum(LEVEL_BITS)) - 1)
+        difference = deadline - self.current
+        level = 0
+        while level < len(LEVEL_BITS) - 1 and difference >= 1 << self._shifts[level + 1]:
+            level += 1
+        slot = (deadline >> self._shifts[level]) & ((1 << LEVEL_BITS[level]) - 1)
+        self.levels[level][slot].add(key)
+        self.timers[key] = (deadline, level, slot)
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """
+        Starts or restarts the timer of a key, due after delay seconds.
+        """
+        self.cancel(key)
+        self._place(key, self.current + max(1, math.ceil(delay / self.tick)))
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Stops the timer of a key, if it is running.
+        """
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            _, level, slot = timer
+            self.levels[level][slot].discard(key)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        Advances the wheel to a time, returning the keys whose timers expired.
+        """
+        target = self._to_tick(now)
+        expired: List[Hashable] = []
+        while self.current < target:
+            if not self.timers:
+                self.current = target
+                break
+            self.current += 1
+            # Cascade coarser levels whose slot boundary was just crossed, highest first
+            for level in range(len(LEVEL_BITS) - 1, 0, -1):
+                if self.current & ((1 << self._shifts[level]) - 1) == 0:
+                    slot = (self.current >> self._shifts[level]) & ((1 << LEVEL_BITS[level]) - 1)
+                    cascading = self.levels[level][slot]
+                    self.levels[level][slot] = set()
+                    for key in cascading:
+                        self._place(key, self.timers[key][0])
+
+            slot = self.current & ((1 << LEVEL_BITS[0]) - 1)
+            for key in self.levels[0][slot]:
+                del self.timers[key]
+                expired.append(key)
+            self.levels[0][slot] = set()
+        return expired
+
+
+class HeartbeatMonitor:
+    """
+    Tracks when each agent last reported and times out silent agents.
+
+    Every request from an agent restarts its timer on a shared TimerWheel,
+    which is advanced on each beat and, once started, every tick by a single
+    ticker thread, so agents time out even while the whole fleet is silent.
+    Beats arrive from request, WebSocket and telemetry threads at once, so
+    the wheel is only touched under a lock, and on_timeout is called outside it.
+
+    Attributes:
+    -----------
+    timeout : float
+        Seconds of silence after which an agent is timed out.
+    last_seen : Dict[int, float]
+        The time of the latest report of each agent.
+    timed_out : Set[int]
+        The agents currently timed out.
+    on_timeout : Callable[[int], None] | None
+        Called with the id of each agent as it times out.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        on_timeout: Callable[[int], None] | None = None,
+        tick: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initializes a new instance of the HeartbeatMonitor class.
+
+        Parameters:
+        -----------
+        timeout : float
+            Seconds of silence after which an agent is timed out.
+        on_timeout : Callable[[int], None] | None
+            Called with the id of each agent as it times out.
+        tick : float
+            The resolution of the timer wheel in seconds.
+        clock : Callable[[], float]
+            The source of the current time in seconds.
+        """
+        self.timeout: float = timeout
+        self.on_timeout: Callable[[int], None] | None = on_timeout
+        self.clock: Callable[[], float] = clock
+        self.wheel: TimerWheel = TimerWheel(tick, clock())
+        self.last_seen: Dict[int, float] = {}
+        self.timed_out: Set[int] = set()
+        self.lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._ticker: threading.Thread | None = None
+
+    def _expire(self, now: float) -> List[int]:
+        # Called with the lock held
+        expired: List[int] = [agent_id for agent_id in self.wheel.advance(now) if isinstance(agent_id, int)]
+        self.timed_out.update(expired)
+        return expired
+
+    def _timed_out(self, expired: List[int]) -> None:
+        for agent_id in expired:
+            trace.warning("Agent %d has not reported for %ss, aborting", agent_id, self.timeout)
+            if self.on_timeout is None:
+                continue
+            # One failed abort must not keep the rest of the slot from being aborted
+            try:
+                self.on_timeout(agent_id)
+            except Exception as error:
+                trace.error("Aborting agent %d failed: %s", agent_id, error)
+
+    def beat(self, agent_id: int) -> None:
+        """
+        Records a report from an agent and restarts its timeout.
+        """
+        now = self.clock()
+        with self.lock:
+            self.last_seen[agent_id] = now
+            self.timed_out.discard(agent_id)
+            # Bring the wheel up to date first so the timeout counts from now
+            self.wheel.cancel(agent_id)
+            expired = self._expire(now)
+            self.wheel.schedule(agent_id, self.timeout)
+        self._timed_out(expired)
+
+    def poll(self, now: float | None = None) -> List[int]:
+        """
+        Times out every agent whose deadline has passed.
+
+        Returns:
+        --------
+        List[int]
+            The agents that timed out during this call.
+        """
+        with self.lock:
+            expired = self._expire(self.clock() if now is None else now)
+        self._timed_out(expired)
+        return expired
+
+    def start(self) -> None:
+        """
+        Starts a daemon thread polling every tick, so silent agents time out without any beats.
+        """
+        def tick() -> None:
+            while not self._stopped.wait(self.wheel.tick):
+                try:
+                    self.poll()
+                except Exception as error:
+                    trace.error("Heartbeat timeout handling failed: %s", error)
+
+        self._ticker = threading.Thread(target=tick, name="HeartbeatTicker", daemon=True)
+        self._ticker.start()
+
+    def stop(self) -> None:
+        """
+        Stops the ticker thread, if it was started.
+        """
+        self._stopped.set()
+        if self._ticker is not None:
+            self._ticker.join()
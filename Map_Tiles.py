@@ -0,0 +1,131 @@
+import hashlib
+import math
+import os
+import struct
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+from Occupancy_Map import read_map_yaml, read_pgm
+
+TILE_SIZE: int = 256
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """
+    Encodes a 2D uint8 array as a greyscale PNG, without an imaging library.
+    """
+    height, width = pixels.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # Every row starts with filter type 0 (None)
+    rows = np.zeros((height, width + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def halve(pixels: np.ndarray) -> np.ndarray:
+    """
+    Downsamples an image by two, keeping the darkest pixel of each 2x2 block so thin walls stay visible.
+    """
+    height, width = pixels.shape
+    padded = np.full((height + height % 2, width + width % 2), 255, dtype=np.uint8)
+    padded[:height, :width] = pixels
+    return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).min(axis=(1, 3))
+
+
+class TilePyramid:
+    """
+    The PNG tiles of a map at every zoom level, encoded once and served from memory.
+
+    Level 0 fits the whole map in a single tile and each level doubles the
+    resolution of the one before, up to the map's own resolution, as in
+    slippy maps. Tile x counts columns from the left and y rows from the top.
+
+    Attributes:
+    -----------
+    name : str
+        The name the map is served under.
+    width, height : int
+        The size of the map in pixels.
+    levels : int
+        The number of zoom levels.
+    tiles : Dict[Tuple[int, int, int], Tuple[bytes, str]]
+        The PNG and ETag of every (level, x, y) tile.
+    metadata : Dict
+        The map size, tile layout and, if the map has a YAML file, its resolution and origin.
+    """
+
+    def __init__(self, name: str, pixels: np.ndarray, metadata: Dict | None = None) -> None:
+        """
+        Initializes a new instance of the TilePyramid class.
+
+        Parameters:
+        -----------
+        name : str
+            The name the map is served under.
+        pixels : np.ndarray
+            The 8-bit greyscale map, row 0 at the top.
+        metadata : Dict | None
+            Anything else viewers need to overlay the map, e.g. resolution and origin.
+        """
+        self.name: str = name
+        self.height, self.width = pixels.shape
+        self.levels: int = 1 + max(0, math.ceil(math.log2(max(self.width, self.height) / TILE_SIZE)))
+        self.tiles: Dict[Tuple[int, int, int], Tuple[bytes, str]] = {}
+
+        image = np.asarray(pixels, dtype=np.uint8)
+        for level in reversed(range(self.levels)):
+            for y in range(0, image.shape[0], TILE_SIZE):
+                for x in range(0, image.shape[1], TILE_SIZE):
+                    png = encode_png(np.ascontiguousarray(image[y:y + TILE_SIZE, x:x + TILE_SIZE]))
+                    etag = '"' + hashlib.sha1(png).hexdigest()[:16] + '"'
+                    self.tiles[(level, x // TILE_SIZE, y // TILE_SIZE)] = (png, etag)
+            image = halve(image)
+
+        self.metadata: Dict = {
+            "name": name,
+            "width": self.width,
+            "height": self.height,
+            "tile_size": TILE_SIZE,
+            "levels": self.levels,
+            **(metadata or {}),
+        }
+
+    @classmethod
+    def from_pgm(cls, pgm_file: str) -> "TilePyramid":
+        """
+        Builds the tiles of a PGM map, named after the file, with the resolution
+        and origin of a YAML file of the same name if there is one.
+        """
+        pixels = read_pgm(pgm_file)
+        if pixels.dtype != np.uint8:
+            pixels = (pixels >> 8).astype(np.uint8)
+        root = os.path.splitext(pgm_file)[0]
+        metadata: Dict = {}
+        if os.path.exists(f"{root}.yaml"):
+            yaml = read_map_yaml(f"{root}.yaml")
+            metadata = {key: yaml[key] for key in ("resolution", "origin") if key in yaml}
+        return cls(os.path.basename(root), pixels, metadata)
+
+    def tile(self, level: int, x: int, y: int) -> Tuple[bytes, str] | None:
+        """
+        Returns the PNG and ETag of a tile, or None if it is off the map.
+        """
+        return self.tiles.get((level, x, y))
+
+
+def load_pyramids(pgm_files: List[str]) -> Dict[str, TilePyramid]:
+    """
+    Builds the tiles of every map, keyed by the name they are served under.
+    """
+    pyramids = [TilePyramid.from_pgm(pgm_file) for pgm_file in pgm_files]
+    return {pyramid.name: pyramid for pyramid in pyramids}
@@ -0,0 +1,234 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from Schedule_Table import OnlineSchedule, ScheduleTable
+
+# Label names and values of a sample, e.g. (("method", "GET"), ("route", "/"))
+Labels = Tuple[Tuple[str, str], ...]
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS: List[float] = [
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+]
+
+
+class MetricShard:
+    """
+    The samples recorded by a single thread, written without any locking.
+
+    Attributes:
+    -----------
+    thread : threading.Thread | None
+        The thread writing to this shard, None for samples of finished threads.
+    counters : Dict[Tuple[str, Labels], float]
+        The value of each counter.
+    histograms : Dict[Tuple[str, Labels], List[float]]
+        The bucket counts of each histogram, followed by its sum and count.
+    """
+
+    def __init__(self, thread: threading.Thread | None) -> None:
+        self.thread: threading.Thread | None = thread
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def merge(self, counters: Dict[Tuple[str, Labels], float],
+              histograms: Dict[Tuple[str, Labels], List[float]]) -> None:
+        """
+        Adds the samples of this shard to the given totals.
+        """
+        # Copying the dicts is atomic, so the owner may keep writing while this runs
+        for key, value in dict(self.counters).items():
+            counters[key] = counters.get(key, 0.0) + value
+        for key, histogram in dict(self.histograms).items():
+            total = histograms.setdefault(key, [0.0] * len(histogram))
+            for index, value in enumerate(list(histogram)):
+                total[index] += value
+
+
+class Timer:
+    """
+    Observes the seconds spent in a with block into a histogram.
+    """
+
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Labels) -> None:
+        self.metrics: Metrics = metrics
+        self.name: str = name
+        self.labels: Labels = labels
+        self.started: float = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.metrics.observe(self.name, self.labels, time.perf_counter() - self.started)
+
+
+class Metrics:
+    """
+    Counters and histograms rendered in the Prometheus text format.
+
+    Every thread records into its own MetricShard, so recording a sample is a
+    couple of dict and list updates with no lock; shards are only summed when
+    the metrics are scraped. Shards of finished threads, such as the threads of
+    closed HTTP connections, are folded into a single retired shard then.
+
+    Attributes:
+    -----------
+    buckets : List[float]
+        The upper bounds of the buckets of every histogram.
+    descriptions : Dict[str, Tuple[str, str]]
+        The type and help text of each metric name.
+    shards : List[MetricShard]
+        The shards of the threads that have recorded samples.
+    retired : MetricShard
+        The samples of threads that have finished.
+    """
+
+    def __init__(
+        self, descriptions: Dict[str, Tuple[str, str]] | None = None, buckets: List[float] = LATENCY_BUCKETS
+    ) -> None:
+        """
+        Initializes a new instance of the Metrics class.
+
+        Parameters:
+        -----------
+        descriptions : Dict[str, Tuple[str, str]] | None
+            The type (counter, gauge or histogram) and help text of each metric name.
+        buckets : List[float]
+            The upper bounds of the buckets of every histogram.
+        """
+        self.buckets: List[float] = sorted(buckets)
+        self.descriptions: Dict[str, Tuple[str, str]] = dict(descriptions or {})
+        self.local = threading.local()
+        # Only taken when a thread records its first sample and on each scrape
+        self.lock = threading.Lock()
+        self.shards: List[MetricShard] = []
+        self.retired: MetricShard = MetricShard(None)
+
+    def _shard(self) -> MetricShard:
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = MetricShard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    def increment(self, name: str, labels: Labels = (), amount: float = 1.0) -> None:
+        """
+        Adds an amount to a counter.
+        """
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """
+        Records a sample in a histogram.
+        """
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0.0] * (len(self.buckets) + 3)
+        # Buckets are upper bounds, the one after the last is +Inf
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def time(self, name: str, labels: Labels = ()) -> Timer:
+        """
+        Returns a context manager observing the duration of its block into a histogram.
+        """
+        return Timer(self, name, labels)
+
+    def collect(self) -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]:
+        """
+        Sums the samples of every thread.
+
+        Returns:
+        --------
+        Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]
+            The counters, and the histograms as bucket counts followed by sum and count.
+        """
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        with self.lock:
+            live: List[MetricShard] = []
+            for shard in self.shards:
+                if shard.thread is not None and not shard.thread.is_alive():
+                    shard.merge(self.retired.counters, self.retired.histograms)
+                else:
+                    live.append(shard)
+            self.shards = live
+            for shard in [self.retired, *live]:
+                shard.merge(counters, histograms)
+        return counters, histograms
+
+    def render(self, gauges: Dict[str, List[Tuple[Labels, float]]] | None = None) -> str:
+        """
+        Renders every metric, and the given gauge samples, in the Prometheus text format.
+        """
+        counters, histograms = self.collect()
+        families: Dict[str, List[str]] = {}
+
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, []).append(f"{name}{format_labels(labels)} {value:.17g}")
+        for name, samples in sorted((gauges or {}).items()):
+            lines = families.setdefault(name, [])
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {value:.17g}")
+        for (name, labels), histogram in sorted(histograms.items()):
+            lines = families.setdefault(name, [])
+            cumulative = 0.0
+            bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, histogram[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative:.17g}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram[-2]:.17g}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram[-1]:.17g}")
+
+        output: List[str] = []
+        for name, lines in families.items():
+            kind, description = self.descriptions.get(name, ("untyped", ""))
+            output.append(f"# HELP {name} {description}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def schedule_gauges(schedule: ScheduleTable | OnlineSchedule) -> Dict[str, List[Tuple[Labels, float]]]:
+    """
+    Measures the size of a schedule table and the depth of its queues.
+
+    Returns:
+    --------
+    Dict[str, List[Tuple[Labels, float]]]
+        Gauge samples by metric name, for Metrics.render.
+    """
+    depths: List[int] = []
+    for constraints in schedule.path_table.values():
+        if isinstance(schedule, OnlineSchedule):
+            depths.append(len(constraints))
+        else:
+            # Offline tables are indexed by timestep, with None once an entry is removed
+            depths.append(sum(constraint is not None for constraint in constraints))
+    return {
+        "schedule_cells": [((), len(depths))],
+        "schedule_constraints": [((), sum(depths))],
+        "schedule_queue_depth_max": [((), max(depths, default=0))],
+        "schedule_queues_waiting": [((), sum(depth > 1 for depth in depths))],
+    }
@@ -2,9 +2,13 @@ from typing import List, Tuple, Dict
 
 from Agent import Agent, OnlineAgent
 from Execution_Policy import ExecutionPolicy, OnlineExecutionPolicy
+from Fleet_Dispatch import FleetDispatcher
 from Position import Position
 from Schedule_Table import ScheduleTable, OnlineSchedule
 from Status import Status
+from Tracing import Tracer
+
+trace = Tracer("policy")
 
 
 class MCP(ExecutionPolicy):
@@ -41,10 +45,11 @@ class MCP(ExecutionPolicy):
         self.agents: List[Agent] = [Agent(plan_file) for _ in range(num_agent)]
 
         if Agent.plans is None:
-            print("Error: Plans have not been loaded.")
+            trace.error("Plans have not been loaded")
             exit(1)
 
         self.schedule_table: ScheduleTable = ScheduleTable(Agent.plans)
+        self.dispatcher: FleetDispatcher = FleetDispatcher(self)
 
     def get_next_position(self, agent_id) -> Tuple[List[Position], Tuple[int, int]]:
         """
@@ -93,6 +98,17 @@ class MCP(ExecutionPolicy):
 
         return target_positions, (start_timestep ,end_timestep)
 
+    def get_next_positions(self) -> Dict[int, Tuple[List[Position], Tuple[int, int]]]:
+        """
+        Returns the next positions and timesteps of every agent in one vectorised pass.
+
+        Returns:
+        --------
+        Dict[int, Tuple[List[Position], Tuple[int, int]]]
+            Maps each agent ID to the result of get_next_position for it.
+        """
+        return self.dispatcher.windows()
+
     def update(self, data) -> None:
         """
         Updates the agent data.
@@ -105,7 +121,7 @@ class MCP(ExecutionPolicy):
         agent_id: int | None = data.get("agent_id")
 
         if agent_id is None:
-            print("Agent id was not provided, cannot update central controller")
+            trace.warning("Agent id was not provided, cannot update central controller")
             return
 
         agent: Agent = self.agents[agent_id]  #
@@ -115,10 +131,10 @@ class MCP(ExecutionPolicy):
 
             pose: Dict[str, int] = data.get("position")
             if pose is None:
-                print(f"Pose was not provided, by agent {agent_id}, cannot update")
+                trace.warning("Pose was not provided by agent %d, cannot update", agent_id)
                 return
             if not all(map(lambda val: val in pose.keys(), ["x", "y", "theta"])):
-                print(f"Pose is missing one of x, y, theta values for agent {agent_id}")
+                trace.warning("Pose is missing one of x, y, theta values for agent %d", agent_id)
                 return
 
             agent.timestep = data.get("timestep")
@@ -127,11 +143,32 @@ class MCP(ExecutionPolicy):
             plan = agent.get_plan()
             self.schedule_table.remove_path(agent_id, plan, agent.timestep)
 
-        print(agent)
+        trace.debug("%s", agent, agent_id=agent_id)
 
     def get_status(self) -> List[Tuple[int, Status]]:
         return [(agent._id, agent.status) for agent in self.agents]
 
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Aborts an agent that has stopped reporting.
+
+        Parameters:
+        -----------
+        agent_id : int
+            The ID of the agent.
+        release : bool
+            Whether to release the rest of the agent's plan from the schedule table,
+            truncating the plan at the position it was last known at.
+        """
+        agent: Agent = self.agents[agent_id]
+        agent.status = Status.ABORTED
+        if release:
+            plan = agent.get_plan()
+            for timestep in range(agent.timestep + 1, len(plan)):
+                self.schedule_table.delete_entry(plan[timestep], agent_id, timestep)
+            del plan[agent.timestep + 1:]
+            self.dispatcher.plans.truncated(agent_id, agent.timestep + 1)
+
 class OnlineMCP(OnlineExecutionPolicy):
     def __init__(self, num_agents: int):
         self.agents: List[OnlineAgent] = [OnlineAgent() for _ in range(num_agents)]
@@ -142,6 +179,7 @@ class OnlineMCP(OnlineExecutionPolicy):
                 raise ValueError("Plans were not intialised")
         self.timestep: int = 0
         self.schedule_table = OnlineSchedule(num_agents)
+        self.dispatcher: FleetDispatcher = FleetDispatcher(self)
 
     def get_next_position(self, agent_id: int) -> Tuple[List[Position], Tuple[int, int]]:
 
@@ -176,6 +214,17 @@ class OnlineMCP(OnlineExecutionPolicy):
 
         return target_positions, (start_timestep ,end_timestep)
 
+    def get_next_positions(self) -> Dict[int, Tuple[List[Position], Tuple[int, int]]]:
+        """
+        Returns the next positions and timesteps of every agent in one vectorised pass.
+
+        Returns:
+        --------
+        Dict[int, Tuple[List[Position], Tuple[int, int]]]
+            Maps each agent ID to the result of get_next_position for it.
+        """
+        return self.dispatcher.windows()
+
     def update(self, data) -> None:
         """
         Updates the agent data.
@@ -188,7 +237,7 @@ class OnlineMCP(OnlineExecutionPolicy):
         agent_id: int | None = data.get("agent_id")
 
         if agent_id is None:
-            print("Agent id was not provided, cannot update central controller")
+            trace.warning("Agent id was not provided, cannot update central controller")
             return
         agent: Agent = self.agents[agent_id]  # Mutate Agent Data
         agent.status = Status.from_string(data.get("status"))
@@ -198,10 +247,10 @@ class OnlineMCP(OnlineExecutionPolicy):
         if agent.status == Status.SUCCEEDED:
             pose: Dict[str, int] = data.get("position")
             if pose is None:
-                print(f"Pose was not provided, by agent {agent_id}, cannot update")
+                trace.warning("Pose was not provided by agent %d, cannot update", agent_id)
                 return
             if not all(map(lambda val: val in pose.keys(), ["x", "y", "theta"])):
-                print(f"Pose is missing one of x, y, theta values for agent {agent_id}")
+                trace.warning("Pose is missing one of x, y, theta values for agent %d", agent_id)
                 return
 
             agent.position = Position(pose["x"], pose["y"], pose["theta"])
@@ -210,15 +259,15 @@ class OnlineMCP(OnlineExecutionPolicy):
             agent.position = agent.view_position(agent.timestep)
             plan = agent.get_plan()
             ## Test whether this has off by one errors
-            print("Checking timesteps for removal:")
-            print(f"Previous: {prev_timestep} Current: {agent.timestep}")
+            trace.debug("Removing timesteps %d to %d of agent %d", prev_timestep, agent.timestep, agent_id,
+                        agent_id=agent_id)
             self.schedule_table.remove_path(
                                             agent_id,
                                             [*enumerate(plan[prev_timestep:agent.timestep],
                                                          prev_timestep + 1)]
                                             )
 
-        print(agent)
+        trace.debug("%s", agent, agent_id=agent_id)
 
     def get_agent_locations(self) -> Tuple[List[Tuple[Position, int]], bool]:
         """
@@ -249,25 +298,45 @@ class OnlineMCP(OnlineExecutionPolicy):
         """
         for (agent_id, extension) in extensions:
             if not (0 <= agent_id < len(self.agents)):
-                print("Not a valid agent id, ignoring")
+                trace.warning("Not a valid agent id %d, ignoring", agent_id)
                 continue
             agent = self.agents[agent_id]
             # Commit up to {lookahead} steps for this agent, ignoring further extensions
-            (len(agent.get_plan()) - agent.timestep)
-            extension = extension[:lookahead - (len(agent.get_plan()) - agent.timestep)]
+            extension = extension[:max(0, lookahead - (len(agent.get_plan()) - agent.timestep))]
+            # Constraints are labelled one ahead of the plan index, as removed in update()
+            first_timestep = len(agent.get_plan()) + 1
             for next_pos in extension:
                 if agent.plans is None:
                     raise ValueError("Plans were not initialised")
 
                 agent.plans[agent_id].append(next_pos)
 
-            self.schedule_table.update_plan([*enumerate(extension, len(agent.get_plan()))], agent_id)
-            print(f"Agent {agent_id}:", agent.plans[agent_id][-15:]) # type: ignore
-        # print(agent.plans)
+            self.schedule_table.update_plan([*enumerate(extension, first_timestep)], agent_id)
+            if trace.enabled(agent_id=agent_id):
+                trace.debug("Agent %d: %s", agent_id, agent.get_plan()[-15:], agent_id=agent_id)
 
     def get_status(self) -> List[Tuple[int, Status]]:
         return [(agent._id, agent.status) for agent in self.agents]
 
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Aborts an agent that has stopped reporting.
+
+        Parameters:
+        -----------
+        agent_id : int
+            The ID of the agent.
+        release : bool
+            Whether to release the rest of the agent's plan from the schedule table,
+            truncating the plan at the position it was last known at so it can be replanned.
+        """
+        agent: Agent = self.agents[agent_id]
+        agent.status = Status.ABORTED
+        if release:
+            self.schedule_table.release_agent(agent_id, agent.timestep + 1)
+            del agent.get_plan()[agent.timestep + 1:]
+            self.dispatcher.plans.truncated(agent_id, agent.timestep + 1)
+
 if __name__ == "__main__":
     mcp = OnlineMCP(2)
     plan = [(0, [Position(0,0,0)]), (1, [Position(0,1,0)]), (0, [Position(0,1,180)]), (1, [Position(1,1,180)])] # noqa: E501
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+from Tracing import Tracer
+
+trace = Tracer("planner")
+
+# Cell values of an occupancy grid, as in ROS nav_msgs/OccupancyGrid
+FREE: int = 0
+OCCUPIED: int = 100
+UNKNOWN: int = -1
+
+
+def read_pgm(pgm_file: str) -> np.ndarray:
+    """
+    Memory-maps the pixels of a binary (P5) PGM file without reading them.
+
+    Returns:
+    --------
+    np.ndarray
+        A read-only height x width array, uint8 or big-endian uint16 as given by the maximum value.
+    """
+    with open(pgm_file, "rb") as fin:
+        header = fin.read(512)
+    # The magic number, width, height and maximum value, separated by whitespace and comments
+    fields: List[bytes] = []
+    offset = 0
+    while len(fields) < 4:
+        while header[offset:offset + 1].isspace():
+            offset += 1
+        if header[offset:offset + 1] == b"#":
+            offset = header.index(b"\n", offset) + 1
+            continue
+        end = offset
+        while end < len(header) and not header[end:end + 1].isspace():
+            end += 1
+        fields.append(header[offset:end])
+        offset = end
+    # A single whitespace character separates the header from the pixels
+    offset += 1
+
+    magic, width, height, maximum = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic != b"P5":
+        raise ValueError(f"{pgm_file} is not a binary PGM file")
+    dtype = np.uint8 if maximum < 256 else np.dtype(">u2")
+    return np.memmap(pgm_file, dtype=dtype, mode="r", offset=offset, shape=(height, width))
+
+
+def read_map_yaml(yaml_file: str) -> Dict:
+    """
+    Parses the flat "key: value" YAML written by the ROS map_saver, without a YAML library.
+    """
+    metadata: Dict = {}
+    with open(yaml_file, mode="r", encoding="utf-8") as fin:
+        for line in fin:
+            line = line.split("#", 1)[0].strip()
+            if not line or ":" not in line:
+                continue
+            key, value = (part.strip() for part in line.split(":", 1))
+            try:
+                # Numbers and [x, y, yaw] lists are valid JSON
+                metadata[key] = json.loads(value)
+            except json.JSONDecodeError:
+                metadata[key] = value.strip("'\"")
+    return metadata
+
+
+def threshold(pixels: np.ndarray, maximum: int, mode: str, negate: bool,
+              occupied_thresh: float, free_thresh: float) -> np.ndarray:
+    """
+    Converts map pixels to occupancy values the way the ROS map_server does.
+
+    Pixels are read as occupancy probabilities, dark being occupied unless
+    negated. In trinary mode cells above occupied_thresh are OCCUPIED, below
+    free_thresh FREE and UNKNOWN otherwise; scale mode keeps the probability
+    in between as 0-100, and raw mode keeps the pixel values.
+    """
+    if mode == "raw":
+        return np.asarray(pixels, dtype=np.int16)
+    occupancy = pixels.astype(np.float32) / maximum
+    if not negate:
+        occupancy = 1.0 - occupancy
+
+    grid = np.full(pixels.shape, UNKNOWN, dtype=np.int8)
+    if mode == "scale":
+        between = (occupancy >= free_thresh) & (occupancy <= occupied_thresh)
+        scaled = 99 * (occupancy - free_thresh) / (occupied_thresh - free_thresh)
+        grid[between] = scaled[between].astype(np.int8)
+    elif mode != "trinary":
+        raise ValueError(f"Unknown map mode {mode}")
+    grid[occupancy > occupied_thresh] = OCCUPIED
+    grid[occupancy < free_thresh] = FREE
+    return grid
+
+
+class OccupancyMap:
+    """
+    An occupancy grid loaded from a ROS map_saver PGM and YAML pair.
+
+    Row 0 of the grid is the top row of the image, as in the .map files the
+    planner reads; the origin is the world pose of the bottom left cell.
+
+    Attributes:
+    -----------
+    grid : np.ndarray
+        Height x width occupancy values, FREE, OCCUPIED or UNKNOWN (0-100 in scale mode).
+    resolution : float
+        The side of a cell in metres.
+    origin : Tuple[float, float, float]
+        The x, y and yaw of the bottom left cell in the world.
+    """
+
+    def __init__(self, grid: np.ndarray, resolution: float, origin: Tuple[float, float, float]) -> None:
+        """
+        Initializes a new instance of the OccupancyMap class.
+
+        Parameters:
+        -----------
+        grid : np.ndarray
+            Height x width occupancy values, with row 0 at the top.
+        resolution : float
+            The side of a cell in metres.
+        origin : Tuple[float, float, float]
+            The x, y and yaw of the bottom left cell in the world.
+        """
+        self.grid: np.ndarray = grid
+        self.resolution: float = resolution
+        self.origin: Tuple[float, float, float] = origin
+
+    @property
+    def height(self) -> int:
+        return self.grid.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.grid.shape[1]
+
+    @classmethod
+    def from_yaml(cls, yaml_file: str) -> "OccupancyMap":
+        """
+        Loads the map described by a map_saver YAML file, with the image path relative to it.
+        """
+        metadata = read_map_yaml(yaml_file)
+        image = os.path.join(os.path.dirname(os.path.abspath(yaml_file)), metadata["image"])
+        pixels = read_pgm(image)
+        grid = threshold(
+            pixels,
+            255 if pixels.dtype == np.uint8 else 65535,
+            metadata.get("mode", "trinary"),
+            bool(metadata.get("negate", 0)),
+            float(metadata.get("occupied_thresh", 0.65)),
+            float(metadata.get("free_thresh", 0.196)),
+        )
+        origin = tuple(float(value) for value in metadata.get("origin", [0.0, 0.0, 0.0]))
+        return cls(grid, float(metadata["resolution"]), (origin[0], origin[1], origin[2]))
+
+
+_cache: Dict[str, Tuple[Tuple[int, ...], OccupancyMap]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_map(yaml_file: str) -> OccupancyMap:
+    """
+    Loads a map, reusing the grid of an earlier load until its YAML or image changes.
+
+    The grid is shared between callers, so it is made read-only.
+    """
+    path = os.path.abspath(yaml_file)
+    image = os.path.join(os.path.dirname(path), read_map_yaml(path)["image"])
+    stamp = tuple(int(value) for name in (path, image)
+                  for value in (os.stat(name).st_mtime_ns, os.stat(name).st_size))
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    occupancy_map = OccupancyMap.from_yaml(path)
+    occupancy_map.grid.setflags(write=False)
+    with _cache_lock:
+        _cache[path] = (stamp, occupancy_map)
+    trace.info("Loaded %dx%d map %s", occupancy_map.width, occupancy_map.height, yaml_file)
+    return occupancy_map
@@ -1,8 +1,127 @@
-import matplotlib.pyplot as plt # type: ignore
-f = "full_office.pgm"
-with open(f, 'rb') as pgmf:
-    im = plt.imread(pgmf)
-    plt.imshow(im)
-    plt.show()
-
-    # Do something, rasterise for .map file
+import argparse
+import json
+import math
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+from Occupancy_Map import FREE, UNKNOWN, OccupancyMap, load_map
+from Planning_Grid import PlanningGrid
+from Transforms import GridFrame
+
+
+def inflate(blocked: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Grows obstacles by a radius in pixels, so a free pixel is at least that far from any obstacle.
+
+    The disc is applied as one shifted OR per offset within it, each a single
+    vectorised pass over the image.
+    """
+    if radius <= 0:
+        return blocked
+    height, width = blocked.shape
+    padded = np.pad(blocked, radius, mode="constant", constant_values=False)
+    inflated = np.zeros_like(blocked)
+    for dy in range(-radius, radius + 1):
+        span = math.isqrt(radius * radius - dy * dy)
+        for dx in range(-span, span + 1):
+            inflated |= padded[radius + dy:radius + dy + height, radius + dx:radius + dx + width]
+    return inflated
+
+
+def block_reduce(blocked: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Downsamples an obstacle image by an integer factor, blocking a cell if any of its pixels is blocked.
+
+    The image is padded with blocked pixels at the bottom and right to a multiple of the factor.
+    """
+    height, width = blocked.shape
+    rows, columns = -(-height // factor), -(-width // factor)
+    padded = np.ones((rows * factor, columns * factor), dtype=bool)
+    padded[:height, :width] = blocked
+    return np.asarray(padded.reshape(rows, factor, columns, factor).any(axis=(1, 3)))
+
+
+def rasterise(
+    occupancy_map: OccupancyMap, cell_size: float, robot_radius: float = 0.0, unknown_blocked: bool = True
+) -> Tuple[PlanningGrid, int]:
+    """
+    Rasterises an occupancy map into a planning grid of robot-sized cells.
+
+    Obstacles are inflated by the robot radius at the resolution of the map,
+    then a cell is blocked if any of its pixels is, so a free cell can be
+    crossed by the robot anywhere within it.
+
+    Parameters:
+    -----------
+    occupancy_map : OccupancyMap
+        The map to rasterise.
+    cell_size : float
+        The side of a planning cell in metres, rounded to a whole number of map pixels.
+    robot_radius : float
+        The distance in metres to keep from obstacles.
+    unknown_blocked : bool
+        Whether unexplored pixels count as obstacles.
+
+    Returns:
+    --------
+    Tuple[PlanningGrid, int]
+        The planning grid, and the number of map pixels along the side of each cell.
+    """
+    factor = max(1, round(cell_size / occupancy_map.resolution))
+    grid = occupancy_map.grid
+    blocked = grid != FREE if unknown_blocked else (grid != FREE) & (grid != UNKNOWN)
+    blocked = inflate(blocked, math.ceil(robot_radius / occupancy_map.resolution))
+    return PlanningGrid(block_reduce(blocked, factor).tolist()), factor
+
+
+def lookup_table(occupancy_map: OccupancyMap, grid: PlanningGrid, factor: int) -> Dict:
+    """
+    Maps every free planning location, in the (x, -row) form of Position.location(),
+    to the world coordinates of its centre.
+    """
+    rows, columns = np.nonzero(~np.asarray(grid.blocked, dtype=bool))
+    centres = GridFrame.from_map(occupancy_map, factor * occupancy_map.resolution).to_world(
+        np.column_stack([columns, -rows, np.zeros_like(rows)])
+    )
+    cells: List[List[float]] = [
+        [x, y, centre_x, centre_y]
+        for x, y, centre_x, centre_y in zip(
+            columns.tolist(), (-rows).tolist(),
+            np.round(centres[:, 0], 4).tolist(), np.round(centres[:, 1], 4).tolist(),
+        )
+    ]
+    return {
+        "cell_size": factor * occupancy_map.resolution,
+        "width": grid.width,
+        "height": grid.height,
+        "origin": list(occupancy_map.origin),
+        "map_height_m": occupancy_map.height * occupancy_map.resolution,
+        "cells": cells,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rasterise a ROS map into a .map file for the planner")
+    parser.add_argument("map", help="map_saver YAML file, naming its PGM image")
+    parser.add_argument("--cell-size", type=float, default=0.5, help="Side of a planning cell in metres")
+    parser.add_argument("--robot-radius", type=float, default=0.2, help="Clearance from obstacles, metres")
+    parser.add_argument("--unknown-free", action="store_true", help="Plan through unexplored space")
+    parser.add_argument("--out", required=True, help="The .map file to write")
+    parser.add_argument("--lookup", help="JSON file to write the world coordinates of every free cell to")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    occupancy_map = load_map(args.map)
+    grid, factor = rasterise(occupancy_map, args.cell_size, args.robot_radius, not args.unknown_free)
+    grid.to_map_file(args.out)
+    if args.lookup:
+        with open(args.lookup, mode="w", encoding="utf-8") as fout:
+            json.dump(lookup_table(occupancy_map, grid, factor), fout)
+    free = sum(not cell for row in grid.blocked for cell in row)
+    elapsed = time.perf_counter() - started
+    print(f"{occupancy_map.width}x{occupancy_map.height} map to {grid.width}x{grid.height} cells of "
+          f"{factor * occupancy_map.resolution:g} m, {free} free, in {1000 * elapsed:.1f} ms")
+    if not math.isclose(factor * occupancy_map.resolution, args.cell_size):
+        print(f"Cell size rounded to {factor} pixels of {occupancy_map.resolution:g} m")
@@ -0,0 +1,172 @@
+import json
+from io import BufferedIOBase
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+import numpy as np  # type: ignore
+
+from File_Handler import Pose, parse_path_line
+from Position import Position
+from Tracing import Tracer
+from Transforms import GridFrame
+
+trace = Tracer("controller")
+
+# Bytes read from a request body at a time
+READ_SIZE: int = 1 << 16
+
+# Lines parsed before their extensions are applied to the policy
+BATCH_LINES: int = 256
+
+
+class MalformedBody(ValueError):
+    """
+    Raised when a request body cannot be read to its end, e.g. a chunk size is not hex.
+    """
+
+
+def body_chunks(rfile: BufferedIOBase, chunked: bool, content_length: int = 0) -> Iterator[bytes]:
+    """
+    Reads a request body a piece at a time, decoding chunked transfer encoding.
+    """
+    if not chunked:
+        remaining = content_length
+        while remaining > 0:
+            data = rfile.read(min(remaining, READ_SIZE))
+            if not data:
+                raise MalformedBody(f"Body ended {remaining} bytes short")
+            remaining -= len(data)
+            yield data
+        return
+    while True:
+        # The size in hex, optionally followed by extensions
+        size_line = rfile.readline(1024)
+        if not size_line:
+            raise MalformedBody("Chunked body ended without a last chunk")
+        try:
+            remaining = int(size_line.split(b";")[0].strip(), 16)
+        except ValueError:
+            raise MalformedBody(f"Chunk size {size_line[:20]!r} is not hex") from None
+        if remaining == 0:
+            # Skip any trailers up to the blank line ending the body
+            while rfile.readline(1024).strip():
+                pass
+            return
+        while remaining > 0:
+            data = rfile.read(min(remaining, READ_SIZE))
+            if not data:
+                raise MalformedBody("Chunk ended early")
+            remaining -= len(data)
+            yield data
+        rfile.readline(1024)
+
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Splits a stream of chunks into lines, however the lines straddle the chunks.
+    """
+    partial = b""
+    for chunk in chunks:
+        lines = chunk.split(b"\n")
+        lines[0] = partial + lines[0]
+        partial = lines.pop()
+        yield from lines
+    if partial:
+        yield partial
+
+
+def parse_line(line: str) -> Tuple[int, List[Pose]] | None:
+    """
+    Parses the agent id and poses of a line, None for a blank line.
+
+    A line is either an NDJSON object, {"agent_id": 3, "positions": [[x, y, theta], ...]}
+    or an /extend_path state {"agent_id": 3, "x": x, "y": y, "theta": theta}, or a
+    result.path line, "Agent 3:(x,y,theta)->(x,y,theta)".
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        entry = json.loads(line)
+        if "positions" in entry:
+            poses = [(float(x), float(y), float(theta)) for x, y, theta in entry["positions"]]
+        else:
+            poses = [(float(entry["x"]), float(entry["y"]), float(entry["theta"]))]
+        return int(entry["agent_id"]), poses
+    return parse_path_line(line)
+
+
+class PlanReader:
+    """
+    Parses a plan body line by line into batches of plan extensions.
+
+    Attributes:
+    -----------
+    frame : GridFrame | None
+        Converts poses in metres to planning locations, None if poses are locations already.
+    batch_lines : int
+        The number of lines parsed before their extensions are yielded.
+    lines, positions : int
+        The number of lines and positions parsed so far.
+    agents : Set[int]
+        The ids of the agents with positions so far.
+    rejected : List[int]
+        The numbers of the lines that could not be parsed.
+    """
+
+    def __init__(self, frame: GridFrame | None = None, batch_lines: int = BATCH_LINES) -> None:
+        self.frame: GridFrame | None = frame
+        self.batch_lines: int = batch_lines
+        self.lines: int = 0
+        self.positions: int = 0
+        self.agents: Set[int] = set()
+        self.rejected: List[int] = []
+
+    def _positions(self, poses: List[Pose]) -> List[Position]:
+        if self.frame is not None:
+            return [Position(x, y, theta) for x, y, theta in self.frame.to_grid(np.asarray(poses)).tolist()]
+        return [Position(round(x), round(y), round(theta)) for x, y, theta in poses]
+
+    def batches(self, lines: Iterable[bytes]) -> Iterator[List[Tuple[int, List[Position]]]]:
+        """
+        Yields the extensions of every batch_lines lines, in the order they were sent.
+
+        If the body turns out malformed, the lines parsed before it are yielded
+        before MalformedBody is raised, so the counts match what was applied.
+        """
+        batch: List[Tuple[int, List[Position]]] = []
+        try:
+            for raw in lines:
+                self.lines += 1
+                try:
+                    parsed = parse_line(raw.decode("utf-8"))
+                except (ValueError, KeyError, TypeError) as error:
+                    trace.warning("Rejected plan line %d: %s", self.lines, error)
+                    self.rejected.append(self.lines)
+                    continue
+                if parsed is None or not parsed[1]:
+                    continue
+                agent_id, poses = parsed
+                positions = self._positions(poses)
+                self.positions += len(positions)
+                self.agents.add(agent_id)
+                batch.append((agent_id, positions))
+                if len(batch) >= self.batch_lines:
+                    yield batch
+                    batch = []
+        except MalformedBody:
+            if batch:
+                yield batch
+            raise
+        if batch:
+            yield batch
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the counts of what was parsed, as /ingest_plans replies with.
+        """
+        return {
+            "lines": self.lines,
+            "agents": len(self.agents),
+            "positions": self.positions,
+            "rejected_lines": self.rejected[:100],
+        }
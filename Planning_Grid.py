@@ -0,0 +1,111 @@
+from typing import Iterator, List, Tuple
+
+# Heading (degrees) of a unit move along each grid direction, matching the
+# pos-x, neg-y convention used by the plans sent to the controller.
+MOVES: List[Tuple[int, int, int]] = [
+    (1, 0, 0),
+    (0, 1, 90),
+    (-1, 0, 180),
+    (0, -1, 270),
+]
+
+
+class PlanningGrid:
+    """
+    A 4-connected grid of robot-sized cells used for planning.
+
+    Cells are addressed as integer (x, y) locations, where x is the column
+    and y is the negated row of the underlying map; Position.location()
+    rounds a position to the same locations, so plans, schedules and the
+    planner agree on cells either side of zero.
+
+    Attributes:
+    -----------
+    blocked : List[List[bool]]
+        Row-major obstacle flags, True where a cell cannot be entered.
+    height : int
+        The number of rows in the grid.
+    width : int
+        The number of columns in the grid.
+    """
+
+    def __init__(self, blocked: List[List[bool]]) -> None:
+        """
+        Initializes a new instance of the PlanningGrid class.
+
+        Parameters:
+        -----------
+        blocked : List[List[bool]]
+            Row-major obstacle flags, True where a cell cannot be entered.
+        """
+        self.blocked: List[List[bool]] = blocked
+        self.height: int = len(blocked)
+        self.width: int = len(blocked[0]) if blocked else 0
+
+    @classmethod
+    def from_map_file(cls, map_file: str) -> "PlanningGrid":
+        """
+        Loads a grid from a MAPF benchmark .map file.
+
+        Parameters:
+        -----------
+        map_file : str
+            Path to the .map file ('.' and 'G' are free, anything else is blocked).
+
+        Returns:
+        --------
+        PlanningGrid
+            The grid described by the file.
+        """
+        with open(map_file, mode="r", encoding="utf-8") as fin:
+            lines = fin.read().splitlines()
+
+        start = lines.index("map") + 1
+        height = 0
+        for line in lines[:start]:
+            if line.startswith("height"):
+                height = int(line.split()[1])
+        rows = lines[start:start + height] if height else lines[start:]
+        return cls([[char not in ".G" for char in row] for row in rows])
+
+    def to_map_file(self, map_file: str) -> None:
+        """
+        Writes the grid as a MAPF benchmark .map file, '.' for free cells and '@' for blocked ones.
+        """
+        with open(map_file, mode="w", encoding="utf-8") as fout:
+            fout.write(f"type octile\nheight {self.height}\nwidth {self.width}\nmap\n")
+            for row in self.blocked:
+                fout.write("".join("@" if cell else "." for cell in row) + "\n")
+
+    def in_bounds(self, location: Tuple[int, int]) -> bool:
+        """
+        Checks if a location lies on the grid.
+        """
+        x, y = location
+        return 0 <= x < self.width and 0 <= -y < self.height
+
+    def passable(self, location: Tuple[int, int]) -> bool:
+        """
+        Checks if a location lies on the grid and is free of obstacles.
+        """
+        return self.in_bounds(location) and not self.blocked[-location[1]][location[0]]
+
+    def neighbours(self, location: Tuple[int, int]) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """
+        Yields the passable 4-connected neighbours of a location.
+
+        Parameters:
+        -----------
+        location : Tuple[int, int]
+            The location to expand.
+
+        Returns:
+        --------
+        Iterator[Tuple[Tuple[int, int], int]]
+            Pairs of neighbouring location and the heading (degrees) to reach it.
+        """
+        x, y = location
+        for dx, dy, theta in MOVES:
+            neighbour = (x + dx, y + dy)
+            if self.passable(neighbour):
+                yield neighbour, theta
@@ -1,3 +1,4 @@
+import math
 from dataclasses import dataclass
 
 # Position Struct
@@ -56,16 +57,19 @@ class Position:
         return hash((self.x, self.y))
 
     def __eq__(self, other) -> bool:
-        return int(0.5 + self.x) == int(0.5 + other.x) and int(0.5 + self.y) == int(0.5 + other.y)
+        return self.location() == other.location()
 
     def location(self) -> Tuple[int, int]:
         """
         Returns a tuple representation of the location of the Position object.
 
+        Coordinates are rounded to the nearest cell, halves upwards, on either
+        side of zero, as plans use negative y for the rows of a map.
+
         Returns:
         Tuple: A tuple containing the x and y values of the Position
         object.
         """
         assert isinstance(self.x, float)  or isinstance(self.x, int), f"{self} is weird"
         assert isinstance(self.y, float) or isinstance(self.y, int), f"{self} is weird"
-        return (int(self.x + 0.5), int(self.y + 0.5))
+        return (math.floor(self.x + 0.5), math.floor(self.y + 0.5))
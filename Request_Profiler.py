@@ -0,0 +1,126 @@
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List
+
+
+def frame_name(frame) -> str:
+    """
+    Names a Python frame as module:function for folded stacks.
+    """
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    # co_qualname is only there from Python 3.11
+    return f"{module}:{getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)}"
+
+
+class StackProfiler:
+    """
+    Records the time spent in every call stack of the current thread.
+
+    Uses sys.setprofile, which only hooks the thread that starts it, so other
+    requests served meanwhile run at full speed. Time is charged to the
+    stack that was running, giving self time per stack as flamegraphs expect.
+
+    Attributes:
+    -----------
+    stack : List[str]
+        The names of the frames entered since the profiler started.
+    stacks : Dict[str, float]
+        Seconds spent in each stack, as ';' joined frame names.
+    """
+
+    def __init__(self) -> None:
+        self.stack: List[str] = []
+        self.stacks: Dict[str, float] = {}
+        self.last: float = 0.0
+
+    def _profile(self, frame, event: str, arg) -> None:
+        now = time.perf_counter()
+        if self.stack:
+            key = ";".join(self.stack)
+            self.stacks[key] = self.stacks.get(key, 0.0) + now - self.last
+        if event == "call":
+            self.stack.append(frame_name(frame))
+        elif event == "c_call":
+            self.stack.append(f"{getattr(arg, '__module__', None) or 'builtins'}:{arg.__qualname__}")
+        elif self.stack:
+            # Returns from frames entered before the profiler started are ignored
+            self.stack.pop()
+        self.last = time.perf_counter()
+
+    def start(self) -> None:
+        self.last = time.perf_counter()
+        sys.setprofile(self._profile)
+
+    def stop(self) -> None:
+        sys.setprofile(None)
+
+
+class RequestProfiler:
+    """
+    Profiles a random fraction of controller requests and aggregates their stacks per route.
+
+    Attributes:
+    -----------
+    fraction : float
+        The fraction of requests to profile, 0 to disable profiling.
+    stacks : Dict[str, float]
+        Seconds spent in each stack of the sampled requests, rooted at their route.
+    requests : Dict[str, int]
+        The number of sampled requests per route.
+    """
+
+    def __init__(self, fraction: float = 0.0) -> None:
+        """
+        Initializes a new instance of the RequestProfiler class.
+
+        Parameters:
+        -----------
+        fraction : float
+            The fraction of requests to profile, 0 to disable profiling.
+        """
+        self.fraction: float = fraction
+        self.lock = threading.Lock()
+        self.stacks: Dict[str, float] = {}
+        self.requests: Dict[str, int] = {}
+
+    def sample(self) -> StackProfiler | None:
+        """
+        Starts profiling the current request if it is sampled.
+        """
+        if self.fraction <= 0 or random.random() >= self.fraction:
+            return None
+        profiler = StackProfiler()
+        profiler.start()
+        return profiler
+
+    def finish(self, profiler: StackProfiler, route: str) -> None:
+        """
+        Stops profiling a request and adds its stacks to those of its route.
+        """
+        profiler.stop()
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            for stack, seconds in profiler.stacks.items():
+                key = f"{route};{stack}"
+                self.stacks[key] = self.stacks.get(key, 0.0) + seconds
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stacks.clear()
+            self.requests.clear()
+
+    def folded(self) -> str:
+        """
+        Returns the stacks in the folded format read by flamegraph.pl and speedscope,
+        one "route;frame;frame microseconds" line per stack.
+        """
+        with self.lock:
+            lines = [
+                f"{stack.replace(' ', '_')} {round(1e6 * seconds)}"
+                for stack, seconds in sorted(self.stacks.items())
+                if round(1e6 * seconds) > 0
+            ]
+        return "\n".join(lines) + "\n"
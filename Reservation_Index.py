@@ -0,0 +1,205 @@
+from bisect import bisect_right, insort
+from typing import Dict, Iterable, List, Tuple
+
+from Position import Position
+
+Location = Tuple[int, int]
+
+# Open end of the last safe interval of a cell
+INFINITY: int = 2**62
+
+
+class ReservationIndex:
+    """
+    A space-time index of reservations for answering planner queries.
+
+    Each cell holds a list of [start, end, agent_id] intervals (inclusive),
+    sorted by start, where consecutive timesteps an agent spends in the same
+    cell are merged into a single interval. Moves between cells are recorded
+    as edge reservations keyed by the cell and timestep they arrive at.
+
+    Attributes:
+    -----------
+    cells : Dict[Location, List[List[int]]]
+        Maps a location to its sorted reservation intervals.
+    spans : Dict[Location, int]
+        The longest interval ever stored per location, bounding how far back
+        a query must look for intervals that overlap it.
+    arrivals : Dict[Tuple[Location, int], Tuple[Location, int]]
+        Maps a (location, timestep) an agent moves into to the location it
+        came from and the id of the agent.
+    tails : Dict[int, Tuple[int, Location]]
+        The latest timestep and location reserved for each agent.
+    """
+
+    def __init__(self) -> None:
+        self.cells: Dict[Location, List[List[int]]] = {}
+        self.spans: Dict[Location, int] = {}
+        self.arrivals: Dict[Tuple[Location, int], Tuple[Location, int]] = {}
+        self.tails: Dict[int, Tuple[int, Location]] = {}
+
+    @staticmethod
+    def _location(key: Position | Location) -> Location:
+        return key.location() if isinstance(key, Position) else key
+
+    def reserve(self, agent_id: int, position: Position | Location, timestep: int) -> None:
+        """
+        Reserves a location for an agent at a timestep.
+
+        Parameters:
+        -----------
+        agent_id : int
+            The ID of the agent.
+        position : Position | Location
+            The location to reserve.
+        timestep : int
+            The timestep to reserve it at.
+        """
+        location = self._location(position)
+        intervals = self.cells.setdefault(location, [])
+        tail = self.tails.get(agent_id)
+
+        extended = False
+        if tail == (timestep - 1, location):
+            # The agent waits in place, grow its latest interval here
+            for interval in reversed(intervals):
+                if interval[2] == agent_id and interval[1] == timestep - 1:
+                    interval[1] = timestep
+                    self.spans[location] = max(self.spans.get(location, 0), interval[1] - interval[0])
+                    extended = True
+                    break
+        if not extended:
+            insort(intervals, [timestep, timestep, agent_id])
+            self.spans.setdefault(location, 0)
+
+        if tail is not None and tail[0] == timestep - 1 and tail[1] != location:
+            self.arrivals[(location, timestep)] = (tail[1], agent_id)
+        if tail is None or tail[0] < timestep:
+            self.tails[agent_id] = (timestep, location)
+
+    def reserve_path(self, agent_id: int, entries: Iterable[Tuple[int, Position | Location]]) -> None:
+        """
+        Reserves a sequence of (timestep, location) entries for an agent in one call.
+        """
+        for timestep, position in entries:
+            self.reserve(agent_id, position, timestep)
+
+    def release(self, agent_id: int, position: Position | Location, timestep: int) -> None:
+        """
+        Releases the reservation of an agent at a location and timestep, if any.
+        """
+        location = self._location(position)
+        intervals = self.cells.get(location)
+        if not intervals:
+            return
+
+        for index in range(bisect_right(intervals, [timestep, INFINITY, INFINITY]) - 1, -1, -1):
+            start, end, owner = intervals[index]
+            if start < timestep - self.spans[location]:
+                break
+            if owner != agent_id or not start <= timestep <= end:
+                continue
+            if start == end:
+                del intervals[index]
+            elif timestep == start:
+                # Re-insert to keep the list sorted by start
+                del intervals[index]
+                insort(intervals, [start + 1, end, agent_id])
+            elif timestep == end:
+                intervals[index][1] = end - 1
+            else:
+                intervals[index][1] = timestep - 1
+                insort(intervals, [timestep + 1, end, agent_id])
+            break
+
+        if not intervals:
+            del self.cells[location]
+            del self.spans[location]
+        arrival = self.arrivals.get((location, timestep))
+        if arrival is not None and arrival[1] == agent_id:
+            del self.arrivals[(location, timestep)]
+
+    def expire(self, timestep: int) -> None:
+        """
+        Drops every reservation that ends before a timestep.
+        """
+        for location in list(self.cells):
+            intervals = [interval for interval in self.cells[location] if interval[1] >= timestep]
+            if intervals:
+                self.cells[location] = intervals
+            else:
+                del self.cells[location]
+                del self.spans[location]
+        self.arrivals = {key: value for key, value in self.arrivals.items() if key[1] >= timestep}
+
+    def occupants(self, position: Position | Location, t1: int, t2: int) -> List[Tuple[int, int, int]]:
+        """
+        Returns the intervals at a location that overlap [t1, t2].
+
+        Returns:
+        --------
+        List[Tuple[int, int, int]]
+            The overlapping (start, end, agent_id) intervals, sorted by start.
+        """
+        location = self._location(position)
+        intervals = self.cells.get(location)
+        if not intervals:
+            return []
+
+        found: List[Tuple[int, int, int]] = []
+        earliest = t1 - self.spans[location]
+        for index in range(bisect_right(intervals, [t2, INFINITY, INFINITY]) - 1, -1, -1):
+            start, end, owner = intervals[index]
+            if start < earliest:
+                break
+            if end >= t1:
+                found.append((start, end, owner))
+        found.reverse()
+        return found
+
+    def is_free(self, position: Position | Location, t1: int, t2: int, agent_id: int | None = None) -> bool:
+        """
+        Checks if no agent other than agent_id holds a location during [t1, t2].
+        """
+        return all(owner == agent_id for _, _, owner in self.occupants(position, t1, t2))
+
+    def safe_intervals(
+        self, position: Position | Location, agent_id: int | None = None, since: int = 0
+    ) -> List[Tuple[int, int]]:
+        """
+        Returns the maximal intervals from `since` onwards during which a location is free.
+
+        Parameters:
+        -----------
+        position : Position | Location
+            The location to query.
+        agent_id : int | None
+            An agent whose own reservations do not count as occupied.
+        since : int
+            The earliest timestep of interest.
+
+        Returns:
+        --------
+        List[Tuple[int, int]]
+            Sorted, inclusive (start, end) free intervals, the last ending at INFINITY.
+        """
+        safe: List[Tuple[int, int]] = []
+        free_from = since
+        for start, end, owner in self.occupants(position, since, INFINITY):
+            if owner == agent_id:
+                continue
+            if start > free_from:
+                safe.append((free_from, start - 1))
+            free_from = max(free_from, end + 1)
+        safe.append((free_from, INFINITY))
+        return safe
+
+    def crossing(
+        self, source: Position | Location, target: Position | Location, timestep: int,
+        agent_id: int | None = None
+    ) -> bool:
+        """
+        Checks if moving source -> target, arriving at timestep, swaps places with another agent.
+        """
+        arrival = self.arrivals.get((self._location(source), timestep))
+        return arrival is not None and arrival[0] == self._location(target) and arrival[1] != agent_id
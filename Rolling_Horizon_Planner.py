@@ -0,0 +1,437 @@
+import heapq
+import json
+import threading
+from collections import deque
+from typing import Callable, ContextManager, Deque, Dict, List, Tuple
+
+from Distance_Tables import DistanceTables
+from Event_Log import EventLog
+from Minimum_Communication_Policy import OnlineMCP
+from Planning_Grid import PlanningGrid
+from Position import Position
+from Reservation_Index import ReservationIndex
+from Schedule_Table import OnlineSchedule
+from Status_Stream import StatusStream
+from Tracing import Tracer
+
+trace = Tracer("planner")
+
+Location = Tuple[int, int]
+
+
+def manhattan(a: Location, b: Location) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def load_goals(goal_file: str) -> Dict[int, List[Location]]:
+    """
+    Load task sequences for agents from a JSON file.
+
+    The file maps agent ids to a list of [x, y] locations; the first is where
+    the agent starts and the rest are goals, visited in order:
+    {"0": [[0, 0], [1, -2], [4, -2]], "1": [[2, 0], [0, 0]]}
+
+    Args:
+        goal_file (str): The path to the JSON file.
+
+    Returns:
+        A dictionary of location sequences for each agent.
+    """
+    with open(goal_file, mode="r", encoding="utf-8") as fin:
+        raw = json.load(fin)
+    return {int(agent_id): [(int(x), int(y)) for x, y in goals] for agent_id, goals in raw.items()}
+
+
+class Reservations:
+    """
+    Space-time reservations of all agents for a single planning cycle.
+
+    Paths planned during the cycle are kept in small overlays on top of the
+    live ReservationIndex of the schedule, which is queried in place.
+
+    Attributes:
+    -----------
+    index : ReservationIndex | None
+        The live reservations of the schedule.
+    offset : int
+        The difference between index timesteps and plan indices.
+    vertices : Dict[Tuple[Location, int], int]
+        Maps a (location, timestep) pair to the agent occupying it.
+    edges : Dict[Tuple[Location, Location, int], int]
+        Maps a move (from, to, timestep of departure) to the agent making it.
+    parked : Dict[Location, Tuple[int, int]]
+        Maps a location to the timestep from which an agent rests there
+        indefinitely and the id of that agent.
+    """
+
+    def __init__(self, index: ReservationIndex | None = None, offset: int = 0) -> None:
+        self.index: ReservationIndex | None = index
+        self.offset: int = offset
+        self.vertices: Dict[Tuple[Location, int], int] = {}
+        self.edges: Dict[Tuple[Location, Location, int], int] = {}
+        self.parked: Dict[Location, Tuple[int, int]] = {}
+
+    @classmethod
+    def from_schedule(cls, schedule: OnlineSchedule) -> "Reservations":
+        """
+        Builds reservations over the outstanding constraints of an OnlineSchedule.
+
+        Constraint timesteps are one ahead of the plan index they guard,
+        matching the labels OnlineMCP uses to insert and remove them.
+        """
+        return cls(schedule.reservations, offset=1)
+
+    def add_path(self, agent_id: int, start: Location, t0: int, path: List[Location]) -> None:
+        """
+        Reserves a newly planned path and parks the agent at its final location.
+        """
+        previous = start
+        for offset, location in enumerate(path, 1):
+            self.vertices[(location, t0 + offset)] = agent_id
+            if location != previous:
+                self.edges[(previous, location, t0 + offset - 1)] = agent_id
+            previous = location
+        if self.parked.get(start, (0, agent_id))[1] == agent_id:
+            self.parked.pop(start, None)
+        self.parked[previous] = (t0 + len(path), agent_id)
+
+    def free(self, agent_id: int, location: Location, timestep: int) -> bool:
+        """
+        Checks if an agent may occupy a location at a timestep.
+        """
+        owner = self.vertices.get((location, timestep), agent_id)
+        if owner != agent_id:
+            return False
+        parked_from, parked_by = self.parked.get(location, (timestep + 1, agent_id))
+        if parked_by != agent_id and timestep >= parked_from:
+            return False
+        return self.index is None or self.index.is_free(
+            location, timestep + self.offset, timestep + self.offset, agent_id
+        )
+
+    def crossing(self, agent_id: int, source: Location, target: Location, timestep: int) -> bool:
+        """
+        Checks if moving source -> target at timestep swaps with another agent.
+        """
+        if self.edges.get((target, source, timestep), agent_id) != agent_id:
+            return True
+        return self.index is not None and self.index.crossing(
+            source, target, timestep + 1 + self.offset, agent_id
+        )
+
+
+def space_time_astar(
+    grid: PlanningGrid,
+    agent_id: int,
+    start: Location,
+    t0: int,
+    goal: Location,
+    steps: int,
+    reservations: Reservations,
+    heuristic: Callable[[Location, Location], int] = manhattan,
+) -> List[Tuple[Location, int | None]] | None:
+    """
+    Finds a conflict-free path of exactly `steps` moves (or waits) from start.
+
+    Every step away from the goal costs 1 and waiting on the goal is free,
+    with the remaining distance to the goal charged at the end of the window.
+    The search therefore heads for the goal and rests there, or gets as close
+    as it can within the window.
+
+    Args:
+        grid (PlanningGrid): The grid to plan on.
+        agent_id (int): The agent being planned, whose own reservations are ignored.
+        start (Location): Location of the agent at t0.
+        t0 (int): The plan index of the start location.
+        goal (Location): The location to head for.
+        steps (int): The number of timesteps to plan.
+        reservations (Reservations): Reservations of the other agents.
+        heuristic (Callable[[Location, Location], int]): A lower bound on the
+            distance between two locations, Manhattan by default.
+
+    Returns:
+        The (location, heading) of the agent for timesteps t0 + 1 ... t0 + steps,
+        with heading None for waits, or None if the agent is trapped.
+    """
+    if steps <= 0:
+        return []
+
+    horizon = t0 + steps
+    counter = 0
+    open_list: List[Tuple[int, int, int, Location]] = [(heuristic(start, goal), -t0, counter, start)]
+    g_scores: Dict[Tuple[Location, int], int] = {(start, t0): 0}
+    parents: Dict[Tuple[Location, int], Tuple[Location, int | None]] = {}
+    closed = set()
+
+    while open_list:
+        _, negative_t, _, location = heapq.heappop(open_list)
+        timestep = -negative_t
+        if (location, timestep) in closed:
+            continue
+        closed.add((location, timestep))
+
+        if timestep == horizon:
+            path: List[Tuple[Location, int | None]] = []
+            state = (location, timestep)
+            while state[1] > t0:
+                previous, theta = parents[state]
+                path.append((state[0], theta))
+                state = (previous, state[1] - 1)
+            path.reverse()
+            return path
+
+        g = g_scores[(location, timestep)]
+        successors: List[Tuple[Location, int | None]] = [(location, None), *grid.neighbours(location)]
+        for successor, theta in successors:
+            state = (successor, timestep + 1)
+            if state in closed:
+                continue
+            if not reservations.free(agent_id, successor, timestep + 1):
+                continue
+            if reservations.crossing(agent_id, location, successor, timestep):
+                continue
+            cost = g + (0 if successor == goal and location == goal else 1)
+            if cost >= g_scores.get(state, cost + 1):
+                continue
+            g_scores[state] = cost
+            parents[state] = (location, theta)
+            counter += 1
+            heapq.heappush(
+                open_list, (cost + heuristic(successor, goal), -(timestep + 1), counter, successor)
+            )
+    return None
+
+
+class PrioritisedPlanner:
+    """
+    Prioritised space-time A* over a planning grid.
+
+    Agents are planned one at a time in id order, each avoiding the outstanding
+    reservations in the schedule and the paths of the agents planned before it.
+    Agents rest at their goal once reached and then move on to their next goal.
+
+    Attributes:
+    -----------
+    grid : PlanningGrid
+        The grid to plan on.
+    goals : Dict[int, Deque[Location]]
+        The outstanding goals of each agent, the current goal first.
+    distances : DistanceTables | None
+        Precomputed distances to the goals, used as the search heuristic.
+    """
+
+    def __init__(
+        self, grid: PlanningGrid, goals: Dict[int, List[Location]], distances: DistanceTables | None = None
+    ) -> None:
+        """
+        Initializes the PrioritisedPlanner class.
+
+        Parameters:
+        -----------
+        grid : PlanningGrid
+            The grid to plan on.
+        goals : Dict[int, List[Location]]
+            The sequence of goals to visit for each agent.
+        distances : DistanceTables | None
+            Distances over the grid to use as the search heuristic, with tables
+            built here for every goal; Manhattan distances if None.
+        """
+        self.grid: PlanningGrid = grid
+        self.goals: Dict[int, Deque[Location]] = {agent_id: deque(seq) for agent_id, seq in goals.items()}
+        self.distances: DistanceTables | None = distances
+        if distances is not None:
+            distances.precompute({goal for seq in goals.values() for goal in seq})
+
+    def current_goal(self, agent_id: int, location: Location) -> Location:
+        """
+        Returns the goal an agent is heading for, dropping goals already reached.
+        """
+        goals = self.goals.get(agent_id)
+        while goals and goals[0] == location and len(goals) > 1:
+            goals.popleft()
+        return goals[0] if goals else location
+
+    def plan(
+        self, starts: Dict[int, Tuple[Position, int, int]], schedule: OnlineSchedule
+    ) -> List[Tuple[int, List[Position]]]:
+        """
+        Plans extensions for agents against the reservations in a schedule.
+
+        Parameters:
+        -----------
+        starts : Dict[int, Tuple[Position, int, int]]
+            Maps each agent to the last position of its plan, the plan index of
+            that position and the number of steps to extend the plan by.
+        schedule : OnlineSchedule
+            The schedule holding the outstanding reservations of all agents.
+
+        Returns:
+        --------
+        List[Tuple[int, List[Position]]]
+            Pairs of agent_id and plan extension, in the form taken by extend_plans.
+        """
+        reservations = Reservations.from_schedule(schedule)
+        for agent_id, (position, t0, _) in starts.items():
+            reservations.parked[position.location()] = (t0, agent_id)
+
+        extensions: List[Tuple[int, List[Position]]] = []
+        for agent_id in sorted(starts):
+            position, t0, steps = starts[agent_id]
+            if steps <= 0:
+                continue
+            start = position.location()
+            goal = self.current_goal(agent_id, start)
+            path = space_time_astar(self.grid, agent_id, start, t0, goal, steps, reservations,
+                                    manhattan if self.distances is None else self.distances.distance)
+            if path is None:
+                trace.info("No path found for agent %d, repairing with WAIT", agent_id)
+                path = [(start, None)] * steps
+
+            theta = position.theta
+            extension: List[Position] = []
+            for (x, y), heading in path:
+                theta = theta if heading is None else heading
+                extension.append(Position(x, y, theta))
+            reservations.add_path(agent_id, start, t0, [location for location, _ in path])
+            self.current_goal(agent_id, path[-1][0])
+            extensions.append((agent_id, extension))
+        return extensions
+
+
+class PlannerWorker(threading.Thread):
+    """
+    Background worker that extends the plans of an OnlineMCP in-process.
+
+    Whenever get_agent_locations reports all agents ready, the worker plans
+    extensions that top each agent's committed plan back up to the lookahead
+    window and passes them straight to extend_plans.
+
+    Attributes:
+    -----------
+    policy : OnlineMCP
+        The execution policy whose plans are extended.
+    planner : PrioritisedPlanner
+        The planner producing the extensions.
+    window : int
+        The number of committed steps to keep ahead of each agent.
+    period : float
+        The longest time in seconds to wait between checks when not notified.
+    event_log : EventLog | None
+        Where the extensions passed to the policy are logged, if anywhere.
+    status_stream : StatusStream | None
+        Where the extensions are published to viewers, if anywhere.
+    lock : ContextManager
+        Held for each planning cycle, shared with whatever else changes the policy.
+    """
+
+    def __init__(
+        self,
+        policy: OnlineMCP,
+        planner: PrioritisedPlanner,
+        window: int = 10,
+        period: float = 0.1,
+        starts: Dict[int, Position] | None = None,
+        event_log: EventLog | None = None,
+        status_stream: StatusStream | None = None,
+        lock: ContextManager | None = None,
+    ) -> None:
+        """
+        Initializes the PlannerWorker class.
+
+        Parameters:
+        -----------
+        policy : OnlineMCP
+            The execution policy whose plans are extended.
+        planner : PrioritisedPlanner
+            The planner producing the extensions.
+        window : int
+            The number of committed steps to keep ahead of each agent,
+            passed to extend_plans as its lookahead.
+        period : float
+            The longest time in seconds to wait between checks when not notified.
+        starts : Dict[int, Position] | None
+            Initial positions to seed empty plans with before planning.
+        event_log : EventLog | None
+            Where the extensions passed to the policy are logged, if anywhere.
+        status_stream : StatusStream | None
+            Where the extensions are published to viewers, if anywhere.
+        lock : ContextManager | None
+            Held for each planning cycle, shared with whatever else changes the
+            policy, e.g. the request handlers. A private lock if not given.
+        """
+        super().__init__(name="PlannerWorker", daemon=True)
+        self.policy: OnlineMCP = policy
+        self.planner: PrioritisedPlanner = planner
+        self.window: int = window
+        self.period: float = period
+        self.starts: Dict[int, Position] = starts or {}
+        self.event_log: EventLog | None = event_log
+        self.status_stream: StatusStream | None = status_stream
+        self.lock: ContextManager = lock if lock is not None else threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def notify(self) -> None:
+        """
+        Wakes the worker to check for plans to extend, e.g. after a status update.
+        """
+        self._wake.set()
+
+    def stop(self) -> None:
+        """
+        Stops the worker after its current planning cycle.
+        """
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self) -> None:
+        seeds = [
+            (agent_id, [position])
+            for agent_id, position in self.starts.items()
+            if not self.policy.agents[agent_id].get_plan()
+        ]
+        if seeds:
+            with self.lock:
+                self._extend(seeds)
+
+        while not self._stopped.is_set():
+            self._wake.wait(self.period)
+            self._wake.clear()
+            if not self._stopped.is_set():
+                # The goals and plans change together, so a checkpoint never sees one without the other
+                with self.lock:
+                    self.step()
+
+    def _extend(self, extensions: List[Tuple[int, List[Position]]]) -> None:
+        if self.event_log is not None:
+            self.event_log.extend_plans(extensions, lookahead=self.window)
+        self.policy.extend_plans(extensions, lookahead=self.window)
+        if self.status_stream is not None:
+            self.status_stream.plans_extended(self.policy, [agent_id for agent_id, _ in extensions])
+
+    def step(self) -> bool:
+        """
+        Runs a single planning cycle if all agents are ready.
+
+        Returns:
+        --------
+        bool
+            True if any plans were extended.
+        """
+        locations, all_ready = self.policy.get_agent_locations()
+        if not all_ready:
+            return False
+
+        starts: Dict[int, Tuple[Position, int, int]] = {}
+        for position, agent_id in locations:
+            agent = self.policy.agents[agent_id]
+            plan_length = len(agent.get_plan())
+            # Mirror the truncation in OnlineMCP.extend_plans so nothing planned is dropped
+            starts[agent_id] = (position, plan_length - 1, self.window - (plan_length - agent.timestep))
+
+        if all(steps <= 0 for _, _, steps in starts.values()):
+            return False
+
+        extensions = self.planner.plan(starts, self.policy.schedule_table)
+        self._extend(extensions)
+        return bool(extensions)
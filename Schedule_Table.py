@@ -1,8 +1,14 @@
-from typing import Dict, List, Tuple
+from typing import Deque, Dict, List, Tuple
 from collections import deque, UserDict
 
+from Congestion_Map import CongestionMap
+from Deadlock_Detector import WaitForGraph
 from Grid_Constraints import GridConstraint
 from Position import Position
+from Reservation_Index import ReservationIndex
+from Tracing import Tracer
+
+trace = Tracer("schedule")
 
 class PathReservation(UserDict):
     """A custom dict override to insert Position(x,y,theta) with keys being equal if x and y are equal"""
@@ -47,6 +53,10 @@ class ScheduleTable:
     path_table : Dict[Tuple[int, int], List[GridConstraint]]
         A dictionary that maps a tuple of (x, y) coordinates to a
         list of GridConstraint objects.
+    reservations : ReservationIndex
+        Interval index over the same reservations for space-time queries.
+    congestion : CongestionMap
+        Queue lengths, contention and wait times of every location.
     """
 
     def __init__(self, agent_plans: Dict[int, List[Position]]) -> None:
@@ -60,6 +70,8 @@ class ScheduleTable:
             that the agent will visit.
         """
         self.path_table: PathReservation = PathReservation()
+        self.reservations: ReservationIndex = ReservationIndex()
+        self.congestion: CongestionMap = CongestionMap()
 
         for agent_id, agent_plan in agent_plans.items():
             self.add_path(agent_id, agent_plan)
@@ -92,6 +104,8 @@ class ScheduleTable:
             constraint.timestep_ = timestep
 
             self.path_table[position][timestep] = constraint
+            self.reservations.reserve(agent_id, position, timestep)
+            self.congestion.queued(position.location())
 
     def scheduled(self, position: Position, agent_id: int) -> bool:
         """
@@ -113,7 +127,11 @@ class ScheduleTable:
         for constraint in self.path_table[position]:
             if constraint is None:
                 continue
-            return constraint.agent_id == agent_id
+            if constraint.agent_id != agent_id:
+                self.congestion.blocked(position.location(), agent_id)
+                return False
+            self.congestion.admitted(position.location(), agent_id)
+            return True
         return False
 
     def remove_path(
@@ -159,6 +177,8 @@ class ScheduleTable:
         if constraint is not None:
             assert constraint.agent_id == agent_id
             self.path_table[position][timestep] = None
+            self.reservations.release(agent_id, position, timestep)
+            self.congestion.dequeued(position.location(), agent_id)
 
 class OnlineSchedule:
     """
@@ -170,6 +190,13 @@ class OnlineSchedule:
     path_table : Dict[Tuple[int, int], Queue[GridConstraint]]
         A dictionary that maps a tuple of (x, y) coordinates to a
         queue of GridConstraint objects describing the order agents pass through the location.
+    reservations : ReservationIndex
+        Interval index over the queued constraints, keyed by their timesteps,
+        for planners asking whether a cell is free during a time window.
+    wait_for : WaitForGraph
+        Tracks which agent each blocked agent waits on, detecting cyclic waits.
+    congestion : CongestionMap
+        Queue lengths, contention and wait times of every location.
     """
     def __init__(self, num_agents: int) -> None:
         """
@@ -180,6 +207,9 @@ class OnlineSchedule:
         num_agents: The maximum number of active agents
         """
         self.path_table: PathReservation = PathReservation()
+        self.reservations: ReservationIndex = ReservationIndex()
+        self.wait_for: WaitForGraph = WaitForGraph(self.path_table)
+        self.congestion: CongestionMap = CongestionMap()
         self.num_agents = num_agents
 
     def update_plan(self, extension: List[Tuple[int, Position]], agent_id: int):
@@ -203,6 +233,9 @@ class OnlineSchedule:
             constraint.timestep_ = timestep
 
             self.path_table[position].append(constraint)
+            self.reservations.reserve(agent_id, position, timestep)
+            self.congestion.queued(position.location())
+        self.wait_for.extended(agent_id, [position for _, position in extension])
 
 
     def scheduled(self, position: Position, agent_id: int) -> bool:
@@ -233,7 +266,9 @@ class OnlineSchedule:
         # Cannot remove the scheduled action until the action is completed,
         # otherwise we do not properly prevent collisions
         if schedule[0].agent_id == agent_id:
+            self.congestion.admitted(position.location(), agent_id)
             return True
+        self.congestion.blocked(position.location(), agent_id)
         return False
 
     def delete_entry(self, position: Position, agent_id: int, timestep: int):
@@ -264,9 +299,12 @@ class OnlineSchedule:
                 assert constraint.timestep_ == timestep, f"Trying delete at time: {timestep} \
     for constraint at {constraint.timestep_}"
                 constraints.popleft()
+                self.reservations.release(agent_id, position, timestep)
+                self.congestion.dequeued(position.location(), agent_id)
+                self.wait_for.deleted(agent_id, position)
             except AssertionError:
-                print(f"Skipping this removal for agent {agent_id} at time \
-{timestep} with constraint time {constraint.timestep_}")
+                trace.warning("Skipping this removal for agent %d at time %d with constraint time %d",
+                              agent_id, timestep, constraint.timestep_)
 
 
     def remove_path(
@@ -282,15 +320,51 @@ class OnlineSchedule:
             The list of positions the agent has visited since the last update of its location,
             with the planned timesteps it has completed
         """
-        print("------------------------\nCurrent schedule:\n")
-        for loc, q in self.path_table.items():
-            print(loc, end=": ")
-            for constraint in q:
-                print(f"[{constraint}, {constraint.timestep_}], ", end="")
-            print()
+        if trace.enabled(agent_id=agent_id):
+            trace.debug("Current schedule:\n%s", self.format_schedule())
         for timestep, position in path:
-            print( f"Deleting {position} at time {timestep}, ")
+            trace.debug("Deleting %s at time %d for agent %d", position, timestep, agent_id,
+                        agent_id=agent_id, location=position.location())
             self.delete_entry(position, agent_id, timestep)
-        print("------------------------\nAfter schedule:\n")
-        for pair in self.path_table.items():
-            print(pair)
+        if trace.enabled(agent_id=agent_id):
+            trace.debug("After schedule:\n%s", self.format_schedule())
+
+    def format_schedule(self) -> str:
+        """
+        Formats the queue of every location, or only the traced locations if tracing is focused.
+        """
+        lines = []
+        for location, constraints in self.path_table.items():
+            if not trace.enabled(location=location):
+                continue
+            queued = ", ".join(f"[{constraint}, {constraint.timestep_}]" for constraint in constraints)
+            lines.append(f"{location}: {queued}")
+        return "\n".join(lines)
+
+    def release_agent(self, agent_id: int, max_timestep: int) -> None:
+        """
+        Releases every constraint of an agent after a timestep, e.g. when it stops reporting.
+
+        Parameters:
+        -----------
+        agent_id : int
+            The ID of the agent.
+        max_timestep : int
+            The last timestep to keep constraints for; the agent keeps holding
+            the location it was last known at.
+        """
+        released = set()
+        kept = 0
+        for location in set(self.wait_for.locations(agent_id)):
+            queue = self.path_table[location]
+            remaining: Deque[GridConstraint] = deque()
+            for constraint in queue:
+                if constraint.agent_id == agent_id and constraint.timestep_ > max_timestep:
+                    self.reservations.release(agent_id, location, constraint.timestep_)
+                    self.congestion.dequeued(location, agent_id)
+                    released.add(location)
+                else:
+                    kept += constraint.agent_id == agent_id
+                    remaining.append(constraint)
+            self.path_table[location] = remaining
+        self.wait_for.released(agent_id, kept, released)
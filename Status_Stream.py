@@ -0,0 +1,158 @@
+import json
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from Tracing import Tracer
+
+trace = Tracer("controller")
+
+# Events a subscriber may fall behind by before it is dropped
+BACKLOG: int = 1024
+
+
+class Subscriber:
+    """
+    A viewer of the status stream, with the encoded events not yet sent to it.
+
+    Attributes:
+    -----------
+    events : queue.Queue
+        Encoded events waiting to be written to the viewer.
+    dropped : threading.Event
+        Set when the viewer fell too far behind and will be disconnected.
+    """
+
+    def __init__(self) -> None:
+        self.events: queue.Queue = queue.Queue(maxsize=BACKLOG)
+        self.dropped = threading.Event()
+
+
+class StatusStream:
+    """
+    Fans out per-agent change events to Server-Sent Events subscribers.
+
+    Each event is encoded once, as an SSE message, and the same bytes are
+    queued for every subscriber, so viewers cost a queue put per event. An
+    agent event is only published when its status, position or timestep
+    changed, and a plan event when its plan was extended. Every change also
+    advances the generation of each agent it may let move, and robot channels
+    wait on the generation of their own agent to push windows, so a change
+    wakes only the robots it concerns rather than the whole fleet.
+
+    Attributes:
+    -----------
+    subscribers : List[Subscriber]
+        The connected viewers.
+    last : Dict[int, Tuple]
+        The last published state of each agent.
+    sequence : int
+        The id of the last event, sent as the SSE id.
+    generations : Dict[int, int]
+        The number of changes so far that concerned each agent.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.subscribers: List[Subscriber] = []
+        self.last: Dict[int, Tuple] = {}
+        self.sequence: int = 0
+        self.wake_lock = threading.Lock()
+        # One condition per agent waited on, all over wake_lock
+        self.changed: Dict[int, threading.Condition] = {}
+        self.generations: Dict[int, int] = {}
+
+    def _encode(self, kind: str, data: Dict) -> bytes:
+        self.sequence += 1
+        payload = json.dumps(data, separators=(",", ":"))
+        return f"id: {self.sequence}\nevent: {kind}\ndata: {payload}\n\n".encode("utf-8")
+
+    def _publish(self, kind: str, data: Dict) -> None:
+        with self.lock:
+            if not self.subscribers:
+                return
+            message = self._encode(kind, data)
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.events.put_nowait(message)
+                except queue.Full:
+                    trace.warning("Dropping a status stream subscriber %d events behind", BACKLOG)
+                    subscriber.dropped.set()
+                    self.subscribers.remove(subscriber)
+
+    def notify(self, agent_ids: Iterable[int] | None = None) -> None:
+        """
+        Advances the generation of some agents, every agent waited on if None,
+        waking whatever waits for them.
+        """
+        with self.wake_lock:
+            for agent_id in list(self.changed) if agent_ids is None else agent_ids:
+                self.generations[agent_id] = self.generations.get(agent_id, 0) + 1
+                if agent_id in self.changed:
+                    self.changed[agent_id].notify_all()
+
+    def wait(self, agent_id: int, generation: int, timeout: float) -> int:
+        """
+        Waits up to timeout seconds for a change to an agent after the given generation,
+        returning the current one.
+        """
+        with self.wake_lock:
+            changed = self.changed.get(agent_id)
+            if changed is None:
+                changed = self.changed[agent_id] = threading.Condition(self.wake_lock)
+            changed.wait_for(lambda: self.generations.get(agent_id, 0) != generation, timeout)
+            return self.generations.get(agent_id, 0)
+
+    def agent_event(self, agent: Any) -> Dict:
+        position = agent.position.to_tuple() if agent.position is not None else None
+        return {
+            "agent_id": agent._id,
+            "status": agent.status.name,
+            "position": position,
+            "timestep": agent.timestep,
+        }
+
+    def agents_changed(self, agents: Iterable[Any]) -> None:
+        """
+        Publishes an event for each agent whose status, position or timestep changed.
+        """
+        changed = []
+        for agent in agents:
+            state = (agent.status, agent.position, agent.timestep)
+            if self.last.get(agent._id) != state:
+                self.last[agent._id] = state
+                self._publish("agent", self.agent_event(agent))
+                changed.append(agent._id)
+        self.notify(changed)
+
+    def plans_extended(self, policy: Any, agent_ids: Iterable[int]) -> None:
+        """
+        Publishes the new end and length of the plan of each extended agent.
+        """
+        extended = []
+        for agent_id in agent_ids:
+            if not (0 <= agent_id < len(policy.agents)):
+                continue
+            plan = policy.agents[agent_id].get_plan()
+            self._publish("plan", {
+                "agent_id": agent_id,
+                "plan_end": plan[-1].to_tuple() if plan else None,
+                "plan_length": len(plan),
+            })
+            extended.append(agent_id)
+        self.notify(extended)
+
+    def subscribe(self, agents: Iterable[Any]) -> Tuple[Subscriber, bytes]:
+        """
+        Adds a viewer, returning it with a snapshot of every agent to send first.
+        """
+        subscriber = Subscriber()
+        with self.lock:
+            snapshot = b"".join(self._encode("agent", self.agent_event(agent)) for agent in agents)
+            self.subscribers.append(subscriber)
+        return subscriber, snapshot
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
@@ -0,0 +1,192 @@
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, List
+
+import numpy as np  # type: ignore
+
+from Heartbeat_Monitor import HeartbeatMonitor
+from Metrics import Metrics
+from Status import Status
+from Tracing import Tracer
+
+trace = Tracer("controller")
+
+# Little-endian datagram: agent id, Status value, boot epoch, sequence, timestep, x, y, theta
+DATAGRAM = struct.Struct("<HBBIIfff")
+
+# Seconds a receive waits before checking whether the listener was stopped
+POLL_INTERVAL: float = 0.5
+
+# Receive buffer asked of the kernel, so bursts from the whole fleet are queued rather than dropped
+RECEIVE_BUFFER: int = 1 << 20
+
+# Seconds of silence after which an agent's sequence may restart, for robots not sending a boot epoch
+RESET_AFTER: float = 2.0
+
+# The latest report of each agent, one row per agent id
+SLOT = np.dtype([
+    ("sequence", np.uint32),
+    ("epoch", np.uint8),
+    ("status", np.uint8),
+    ("timestep", np.uint32),
+    ("pose", np.float32, 3),
+    ("received", np.float64),
+])
+
+STATUSES = {status.value: status for status in Status}
+
+
+def encode_datagram(agent_id: int, status: Status, sequence: int, timestep: int,
+                    x: float, y: float, theta: float, epoch: int = 0) -> bytes:
+    """
+    Encodes a pose report as a robot sends it, epoch being the number of times it booted.
+    """
+    return DATAGRAM.pack(agent_id, status.value, epoch & 0xFF, sequence & 0xFFFFFFFF, timestep, x, y, theta)
+
+
+class TelemetryListener(threading.Thread):
+    """
+    Absorbs high-rate pose reports sent over UDP, keeping the latest of each agent.
+
+    Each datagram overwrites the slot of its agent, in a preallocated array
+    only this thread writes, so readers copy a slot without taking a lock.
+    Datagrams older than the slot, by boot epoch then sequence number, are
+    dropped as UDP may reorder them. A robot restarting its sequence is
+    accepted once it bumps its epoch, or once its slot is RESET_AFTER
+    seconds old if it keeps no epoch. Only reports changing the status or timestep of an
+    agent are passed to on_transition, in the JSON form of POST /, so the
+    execution policy still sees every transition but not every pose.
+
+    Attributes:
+    -----------
+    slots : np.ndarray
+        The latest sequence, epoch, status, timestep, pose and receive time of each agent.
+    on_transition : Callable[[Dict], None]
+        Called with the report of an agent whose status or timestep changed.
+    heartbeats : HeartbeatMonitor | None
+        Beaten by every accepted datagram, if agents are monitored.
+    metrics : Metrics | None
+        Counts datagrams by result, if given.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        num_agents: int,
+        on_transition: Callable[[Dict], None],
+        heartbeats: HeartbeatMonitor | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        """
+        Initializes a new instance of the TelemetryListener class.
+
+        Parameters:
+        -----------
+        host, port : str, int
+            The address to listen on, port 0 for any free port.
+        num_agents : int
+            The number of agents, datagrams of other ids are rejected.
+        on_transition : Callable[[Dict], None]
+            Called with the report of an agent whose status or timestep changed.
+        heartbeats : HeartbeatMonitor | None
+            Beaten by every accepted datagram, if agents are monitored.
+        metrics : Metrics | None
+            Counts datagrams by result, if given.
+        """
+        super().__init__(name="TelemetryListener", daemon=True)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        self.socket.bind((host, port))
+        self.socket.settimeout(POLL_INTERVAL)
+        self.address = self.socket.getsockname()
+        self.slots: np.ndarray = np.zeros(num_agents, dtype=SLOT)
+        self.on_transition: Callable[[Dict], None] = on_transition
+        self.heartbeats: HeartbeatMonitor | None = heartbeats
+        self.metrics: Metrics | None = metrics
+        self._stopped = threading.Event()
+
+    def _count(self, result: str) -> None:
+        if self.metrics is not None:
+            self.metrics.increment("telemetry_datagrams_total", (("result", result),))
+
+    def receive(self, datagram: bytes | memoryview) -> None:
+        """
+        Stores a datagram in the slot of its agent, reporting it if it is a transition.
+        """
+        if len(datagram) != DATAGRAM.size:
+            self._count("malformed")
+            return
+        agent_id, value, epoch, sequence, timestep, x, y, theta = DATAGRAM.unpack(datagram)
+        if agent_id >= len(self.slots) or value not in STATUSES:
+            self._count("malformed")
+            return
+        last = self.slots[agent_id]
+        first = last["received"] == 0
+        now = time.time()
+        if not first and now - last["received"] < RESET_AFTER:
+            # Epochs and sequence numbers wrap, either is newer if it is less than half its range ahead
+            rebooted = (epoch - int(last["epoch"])) % (1 << 8)
+            if rebooted:
+                newer = rebooted < 1 << 7
+            else:
+                newer = 0 < (sequence - int(last["sequence"])) % (1 << 32) < 1 << 31
+            if not newer:
+                self._count("stale")
+                return
+        transition = first or value != last["status"] or timestep != last["timestep"]
+        self.slots[agent_id] = (sequence, epoch, value, timestep, (x, y, theta), now)
+        self._count("accepted")
+        if self.heartbeats is not None:
+            self.heartbeats.beat(agent_id)
+        if transition:
+            self.on_transition({
+                "agent_id": agent_id,
+                "status": STATUSES[value].name,
+                "timestep": timestep,
+                "position": {"x": x, "y": y, "theta": theta},
+            })
+
+    def latest(self) -> List[Dict]:
+        """
+        Returns the latest report of every agent heard from, with its age in seconds.
+        """
+        slots = self.slots.copy()
+        now = time.time()
+        return [
+            {
+                "agent_id": agent_id,
+                "status": STATUSES[int(slot["status"])].name,
+                "timestep": int(slot["timestep"]),
+                "pose": [float(value) for value in slot["pose"]],
+                "age": now - float(slot["received"]),
+            }
+            for agent_id, slot in enumerate(slots)
+            if slot["received"] > 0
+        ]
+
+    def stop(self) -> None:
+        """
+        Stops listening and closes the socket.
+        """
+        self._stopped.set()
+        self.join()
+        self.socket.close()
+
+    def run(self) -> None:
+        buffer = bytearray(DATAGRAM.size + 1)
+        view = memoryview(buffer)
+        while not self._stopped.is_set():
+            try:
+                size, _ = self.socket.recvfrom_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError as error:
+                trace.error("Telemetry socket on %s:%d failed: %s", *self.address, error)
+                return
+            try:
+                self.receive(view[:size])
+            except Exception as error:
+                trace.error("Telemetry datagram rejected: %s", error)
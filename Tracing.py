@@ -0,0 +1,162 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Dict, Iterable, Set, Tuple
+
+# Every subsystem logs under this logger, e.g. turtlebot.schedule
+ROOT: str = "turtlebot"
+
+SUBSYSTEMS: Tuple[str, ...] = ("controller", "policy", "schedule", "deadlock", "heartbeat", "planner")
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+# Level names accepted by set_level, in either case
+LEVELS: Tuple[str, ...] = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+
+class Focus:
+    """
+    Restricts debug tracing to some agents and cells, e.g. to follow one robot.
+
+    Records at INFO and above are never filtered.
+
+    Attributes:
+    -----------
+    agents : Set[int] | None
+        The agents to trace, or None for every agent.
+    cells : Set[Tuple[int, int]] | None
+        The locations to trace, or None for every location.
+    """
+
+    def __init__(self) -> None:
+        self.agents: Set[int] | None = None
+        self.cells: Set[Tuple[int, int]] | None = None
+
+    def matches(self, agent_id: int | None, location: Tuple[int, int] | None) -> bool:
+        if self.agents is not None and agent_id is not None and agent_id not in self.agents:
+            return False
+        if self.cells is not None and location is not None and location not in self.cells:
+            return False
+        return True
+
+
+FOCUS: Focus = Focus()
+
+
+class Tracer:
+    """
+    Leveled tracing for one subsystem, on top of the logging module.
+
+    Messages use %-style arguments, which are only formatted if the record is
+    emitted. Debug dumps that are expensive to build should be guarded with
+    enabled(), which is a level check when tracing is off.
+
+    Attributes:
+    -----------
+    logger : logging.Logger
+        The logger of the subsystem.
+    """
+
+    def __init__(self, subsystem: str) -> None:
+        self.logger: logging.Logger = logging.getLogger(f"{ROOT}.{subsystem}")
+
+    def enabled(
+        self, level: int = DEBUG, agent_id: int | None = None, location: Tuple[int, int] | None = None
+    ) -> bool:
+        """
+        Checks if a record at a level, about an agent or location, would be emitted.
+        """
+        if not self.logger.isEnabledFor(level):
+            return False
+        return level > DEBUG or FOCUS.matches(agent_id, location)
+
+    def debug(
+        self, message: str, *args, agent_id: int | None = None, location: Tuple[int, int] | None = None
+    ) -> None:
+        if self.enabled(DEBUG, agent_id, location):
+            self.logger.debug(message, *args)
+
+    def info(self, message: str, *args) -> None:
+        self.logger.info(message, *args)
+
+    def warning(self, message: str, *args) -> None:
+        self.logger.warning(message, *args)
+
+    def error(self, message: str, *args) -> None:
+        self.logger.error(message, *args)
+
+
+class TraceSink:
+    """
+    Writes trace records from a background thread, so request threads only enqueue them.
+
+    Attributes:
+    -----------
+    queue_handler : logging.handlers.QueueHandler
+        Enqueues the records of every subsystem.
+    listener : logging.handlers.QueueListener
+        The thread formatting and writing queued records.
+    """
+
+    def __init__(self, stream=sys.stdout) -> None:
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        self.queue_handler = logging.handlers.QueueHandler(records)
+        self.listener = logging.handlers.QueueListener(records, handler)
+        self.running: bool = False
+
+    def start(self) -> None:
+        logging.getLogger(ROOT).addHandler(self.queue_handler)
+        self.listener.start()
+        self.running = True
+
+    def stop(self) -> None:
+        """
+        Writes out every queued record and detaches the sink.
+        """
+        logging.getLogger(ROOT).removeHandler(self.queue_handler)
+        if self.running:
+            self.listener.stop()
+            self.running = False
+
+
+_sink: TraceSink | None = None
+
+
+def configure(level: int | str = INFO, subsystems: Dict[str, int | str] | None = None) -> None:
+    """
+    Sets the trace level, overridden per subsystem, and starts the buffered sink once.
+    """
+    global _sink
+    set_level(level)
+    for subsystem, subsystem_level in (subsystems or {}).items():
+        set_level(subsystem_level, subsystem)
+    if _sink is None:
+        logging.getLogger(ROOT).propagate = False
+        _sink = TraceSink()
+        _sink.start()
+        atexit.register(_sink.stop)
+
+
+def set_level(level: int | str, subsystem: str | None = None) -> None:
+    """
+    Sets the trace level of a subsystem, or of every subsystem without its own level.
+    """
+    name = ROOT if subsystem is None else f"{ROOT}.{subsystem}"
+    logging.getLogger(name).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def set_focus(
+    agents: Iterable[int] | None = None, cells: Iterable[Tuple[int, int]] | None = None
+) -> None:
+    """
+    Restricts debug tracing to some agents and cells, None to trace all of them.
+    """
+    FOCUS.agents = None if agents is None else set(agents)
+    FOCUS.cells = None if cells is None else {(int(x), int(y)) for x, y in cells}
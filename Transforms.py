@@ -1,8 +1,112 @@
-import numpy as np # type: ignore
+import math
+from typing import Dict, Tuple
+
+import numpy as np  # type: ignore
+
 
 def rotate(x, y, radians):
     return (x*np.cos(radians) - y*np.sin(radians), x*np.sin(radians) + y*np.cos(radians))
 
+
+def _rotation(radians: float) -> np.ndarray:
+    cos, sin = math.cos(radians), math.sin(radians)
+    return np.array([[cos, -sin], [sin, cos]])
+
+
+# Exact rotation matrices of the cardinal headings in degrees, the only headings in plans
+CARDINAL_ROTATIONS: Dict[int, np.ndarray] = {
+    degrees: np.round(_rotation(math.radians(degrees))) for degrees in (0, 90, 180, 270)
+}
+
+
+def rotation(degrees: float) -> np.ndarray:
+    """
+    Returns the 2x2 matrix rotating points counterclockwise by an angle in degrees.
+    """
+    cardinal = CARDINAL_ROTATIONS.get(int(degrees) % 360) if float(degrees).is_integer() else None
+    return cardinal if cardinal is not None else _rotation(math.radians(degrees))
+
+
+def rotate_points(points: np.ndarray, degrees: float) -> np.ndarray:
+    """
+    Rotates an N x 2 array of points counterclockwise about the origin in one call.
+    """
+    return np.asarray(points, dtype=float) @ rotation(degrees).T
+
+
+class GridFrame:
+    """
+    Converts whole arrays of poses between planning locations and the world frame of a map.
+
+    Planning locations are (x, y, theta) with x the column, y the negated row
+    and theta the heading in degrees, as in Position; world poses are metres
+    and radians in the frame of the map's YAML origin, which is the bottom
+    left corner of the image.
+
+    Attributes:
+    -----------
+    cell_size : float
+        The side of a planning cell in metres.
+    origin : Tuple[float, float, float]
+        The x, y and yaw of the bottom left corner of the map in the world.
+    map_height : float
+        The height of the map in metres, from its bottom edge to row 0.
+    """
+
+    def __init__(self, cell_size: float, origin: Tuple[float, float, float], map_height: float) -> None:
+        """
+        Initializes a new instance of the GridFrame class.
+
+        Parameters:
+        -----------
+        cell_size : float
+            The side of a planning cell in metres.
+        origin : Tuple[float, float, float]
+            The x, y and yaw of the bottom left corner of the map in the world.
+        map_height : float
+            The height of the map in metres, from its bottom edge to row 0.
+        """
+        self.cell_size: float = cell_size
+        self.origin: Tuple[float, float, float] = origin
+        self.map_height: float = map_height
+        yaw = math.degrees(origin[2])
+        self.to_world_rotation: np.ndarray = rotation(yaw)
+        self.to_map_rotation: np.ndarray = rotation(-yaw)
+
+    @classmethod
+    def from_map(cls, occupancy_map, cell_size: float) -> "GridFrame":
+        """
+        Creates the frame of a planning grid rasterised from an OccupancyMap.
+        """
+        return cls(cell_size, occupancy_map.origin, occupancy_map.height * occupancy_map.resolution)
+
+    def to_world(self, locations: np.ndarray) -> np.ndarray:
+        """
+        Converts an N x 3 array of planning locations to the world poses of the cell centres.
+        """
+        locations = np.asarray(locations, dtype=float).reshape(-1, 3)
+        # Offsets of the cell centres from the bottom left corner, along and up the map
+        offsets = np.column_stack([
+            (locations[:, 0] + 0.5) * self.cell_size,
+            self.map_height + (locations[:, 1] - 0.5) * self.cell_size,
+        ])
+        points = offsets @ self.to_world_rotation.T + self.origin[:2]
+        headings = np.radians(locations[:, 2]) + self.origin[2]
+        return np.column_stack([points, headings])
+
+    def to_grid(self, poses: np.ndarray) -> np.ndarray:
+        """
+        Converts an N x 3 array of world poses to the planning locations containing them,
+        with headings snapped to the nearest cardinal heading.
+        """
+        poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+        offsets = (poses[:, :2] - self.origin[:2]) @ self.to_map_rotation.T
+        columns = np.floor(offsets[:, 0] / self.cell_size)
+        rows = np.floor((self.map_height - offsets[:, 1]) / self.cell_size)
+        headings = (np.rint(np.degrees(poses[:, 2] - self.origin[2]) / 90) * 90) % 360
+        return np.column_stack([columns, -rows, headings]).astype(int)
+
+
 if __name__ == "__main__":
     print(rotate(0.5, 0.5, 3.0815))
     # (-15.4613, 1.29542)
@@ -3,6 +3,9 @@ from typing import Tuple, List, Dict
 from Position import Position
 from Agent import OnlineAgent
 from Status import Status
+from Tracing import Tracer
+
+trace = Tracer("policy")
 
 class UnitExecutionPolicy(OnlineExecutionPolicy):
     """
@@ -32,7 +35,7 @@ class UnitExecutionPolicy(OnlineExecutionPolicy):
         """
         if self.next_states[agent_id] is None:
             if self.curr_states[agent_id] is None:
-                print(f"Current state for agent {agent_id} is None, aborting")
+                trace.error("Current state for agent %d is None, aborting", agent_id)
                 exit(1)
             return [self.curr_states[agent_id]], (self.timestep, self.timestep)
         # It does not matter what is going on, the planner guarantees you can move safely from
@@ -59,13 +62,13 @@ class UnitExecutionPolicy(OnlineExecutionPolicy):
         agent_id: int | None = data.get("agent_id")
 
         if agent_id is None:
-            print("Agent id was not provided, cannot update central controller")
+            trace.warning("Agent id was not provided, cannot update central controller")
             return
         agent: OnlineAgent = self.agents[agent_id]  # Mutate Agent Data
 
         status: str | None = data.get("status")
         if status is None:
-            print("Agent status was not provided")
+            trace.warning("Agent status was not provided")
             status = "FAILED"
         else:
             agent.status = Status.from_string(status)
@@ -76,10 +79,10 @@ class UnitExecutionPolicy(OnlineExecutionPolicy):
         # See pose JSON
         pose = data.get("position") # type: ignore
         if pose is None:
-            print(f"Pose was not provided, by agent {agent_id}, cannot update")
+            trace.warning("Pose was not provided by agent %d, cannot update", agent_id)
             return
         if not all(map(lambda val: val in pose.keys(), ["x", "y", "theta"])):
-            print(f"Pose is missing one of x, y, theta values for agent {agent_id}")
+            trace.warning("Pose is missing one of x, y, theta values for agent %d", agent_id)
             return
 
         agent.position = Position(pose["x"], pose["y"], pose["theta"])
@@ -118,7 +121,7 @@ class UnitExecutionPolicy(OnlineExecutionPolicy):
         next_states: List[Position | None] = [None]*len(self.agents)
         for (agent_id, extension) in extensions:
             if not (0 <= agent_id < len(self.agents)):
-                print(f"Not a valid agent id {agent_id}, ignoring")
+                trace.warning("Not a valid agent id %d, ignoring", agent_id)
                 continue
             agent = self.agents[agent_id]
             assert(len(extension) == 1), f"Extension is wrong length for UnitExecutionPolicy, \
@@ -133,7 +136,7 @@ class UnitExecutionPolicy(OnlineExecutionPolicy):
 
         for agent_id, state in enumerate(next_states):
             if state is None:
-                print(f"Agent {agent_id} was not given a plan, repairing with WAIT")
+                trace.info("Agent %d was not given a plan, repairing with WAIT", agent_id)
                 next_states[agent_id] = self.curr_states[agent_id]
         # Advance self.curr_states to self.next_states and insert new next_states
         self.status = [Status.EXECUTING]*len(self.agents)
@@ -142,3 +145,15 @@ class UnitExecutionPolicy(OnlineExecutionPolicy):
 
     def get_status(self) -> List[Tuple[int, Status]]:
         return [*enumerate(self.status)]
+
+    def abort_agent(self, agent_id: int, release: bool = False) -> None:
+        """
+        Method to abort an agent that has stopped reporting.
+        Nothing is reserved beyond the next step, so there is nothing to release.
+
+        Args:
+            agent_id (int): The id of the agent to abort.
+            release (bool): Unused by this policy.
+        """
+        self.agents[agent_id].status = Status.ABORTED
+        self.status[agent_id] = Status.ABORTED
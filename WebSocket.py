@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import struct
+from io import BufferedIOBase
+from typing import List, Tuple
+
+# The GUID every server appends to the client's key, from RFC 6455
+GUID: str = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+CONTINUATION = 0x0
+TEXT = 0x1
+BINARY = 0x2
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+# Close codes, from RFC 6455
+PROTOCOL_ERROR = 1002
+UNSUPPORTED_DATA = 1003
+MESSAGE_TOO_BIG = 1009
+
+# Largest message accepted from a robot, status updates are a few hundred bytes
+MAX_PAYLOAD: int = 1 << 20
+
+
+class ConnectionClosed(Exception):
+    """
+    Raised when the peer closes the connection or sends a frame that cannot be read.
+    """
+
+
+class ProtocolError(ConnectionClosed):
+    """
+    Raised when the peer breaks the protocol, with the close code to answer it with.
+    """
+
+    def __init__(self, message: str, code: int = PROTOCOL_ERROR) -> None:
+        super().__init__(message)
+        self.code: int = code
+
+
+def accept_key(key: str) -> str:
+    """
+    Returns the Sec-WebSocket-Accept header answering a client's Sec-WebSocket-Key.
+    """
+    return base64.b64encode(hashlib.sha1((key + GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def _read_exactly(rfile: BufferedIOBase, length: int) -> bytes:
+    data = rfile.read(length)
+    if data is None or len(data) < length:
+        raise ConnectionClosed("Connection closed mid frame")
+    return data
+
+
+def read_frame(rfile: BufferedIOBase) -> Tuple[int, bytes, bool]:
+    """
+    Reads one frame sent by a client, unmasking its payload.
+
+    Returns:
+    --------
+    Tuple[int, bytes, bool]
+        The opcode, payload and whether the frame is the last of its message;
+        fragmented messages are returned frame by frame.
+    """
+    first, second = _read_exactly(rfile, 2)
+    final = bool(first & 0x80)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack(">H", _read_exactly(rfile, 2))
+    elif length == 127:
+        (length,) = struct.unpack(">Q", _read_exactly(rfile, 8))
+    if length > MAX_PAYLOAD:
+        raise ConnectionClosed(f"Frame of {length} bytes is too large")
+    # Clients must mask every frame
+    if not second & 0x80:
+        raise ConnectionClosed("Unmasked frame from client")
+    mask = _read_exactly(rfile, 4)
+    payload = _read_exactly(rfile, length)
+    # XOR the whole payload with the repeated mask as one big integer
+    key = (mask * (length // 4 + 1))[:length]
+    unmasked = int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")
+    return opcode, unmasked.to_bytes(length, "big"), final
+
+
+class MessageReader:
+    """
+    Reads whole messages from a client, joining the frames of fragmented ones.
+
+    Control frames may arrive between the fragments of a message, and are
+    returned as they arrive while the message is still being joined.
+    """
+
+    def __init__(self, rfile: BufferedIOBase) -> None:
+        self.rfile: BufferedIOBase = rfile
+        self.opcode: int | None = None
+        self.fragments: List[bytes] = []
+        self.size: int = 0
+
+    def read(self) -> Tuple[int, bytes]:
+        """
+        Reads up to the next whole message or control frame, returning its opcode and payload.
+        """
+        while True:
+            opcode, payload, final = read_frame(self.rfile)
+            if opcode >= CLOSE:
+                if not final:
+                    raise ProtocolError("Fragmented control frame")
+                return opcode, payload
+            if opcode == CONTINUATION:
+                if self.opcode is None:
+                    raise ProtocolError("Continuation frame outside a message")
+            elif self.opcode is not None:
+                raise ProtocolError("New message before the last one was finished")
+            else:
+                self.opcode = opcode
+            self.fragments.append(payload)
+            self.size += len(payload)
+            if self.size > MAX_PAYLOAD:
+                raise ProtocolError(f"Message of over {MAX_PAYLOAD} bytes is too large", MESSAGE_TOO_BIG)
+            if final:
+                message = (self.opcode, b"".join(self.fragments))
+                self.opcode, self.fragments, self.size = None, [], 0
+                return message
+
+
+def close_payload(code: int, reason: str = "") -> bytes:
+    """
+    Encodes the payload of a close frame with a status code.
+    """
+    return struct.pack(">H", code) + reason.encode("utf-8")[:123]
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    """
+    Encodes a single unmasked, final frame as sent by a server.
+    """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack(">BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+    return header + payload
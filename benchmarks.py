@@ -0,0 +1,288 @@
+import argparse
+import contextlib
+import http.client
+import json
+import math
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+from Agent import Agent
+from Central_Controller import CentralController
+from File_Handler import load_paths
+from Minimum_Communication_Policy import MCP
+from Position import Position
+from Schedule_Table import OnlineSchedule, ScheduleTable
+
+# Heading of a move along each side of the ring, counterclockwise from the bottom
+HEADINGS: List[Tuple[int, int, int]] = [(1, 0, 0), (0, 1, 90), (-1, 0, 180), (0, -1, 270)]
+
+
+def synthetic_plans(num_agents: int, plan_length: int) -> Dict[int, List[Position]]:
+    """
+    Generates conflict free plans of agents following each other around a square ring.
+
+    Agents start evenly spaced on the ring and all move one cell per timestep,
+    so no two agents meet, but every cell is visited by many agents in turn
+    and each corner is a turn, as in a warehouse loop.
+    """
+    side = math.ceil(num_agents / 2) + 2
+    ring: List[Position] = []
+    x, y = 0, 0
+    for dx, dy, theta in HEADINGS:
+        for _ in range(side - 1):
+            ring.append(Position(x, y, theta))
+            x, y = x + dx, y + dy
+
+    plans: Dict[int, List[Position]] = {}
+    for agent_id in range(num_agents):
+        start = agent_id * len(ring) // num_agents
+        plans[agent_id] = [ring[(start + timestep) % len(ring)] for timestep in range(plan_length)]
+    return plans
+
+
+def write_plan_file(plans: Dict[int, List[Position]], plan_file: str) -> None:
+    """
+    Writes plans in the format read by load_paths, with y before x.
+    """
+    with open(plan_file, mode="w", encoding="utf-8") as fout:
+        for agent_id, plan in plans.items():
+            steps = "->".join(f"({int(p.y)},{int(p.x)},{int(p.theta)})" for p in plan)
+            fout.write(f"Agent {agent_id}:{steps}->\n")
+
+
+def measure(run: Callable[[], Any], setup: Callable[[], None] | None, repeat: int) -> List[float]:
+    """
+    Times run() repeat times, calling setup() untimed before each run.
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+class Benchmarks:
+    """
+    The hot paths of the controller, timed on synthetic plans of one fleet size and plan length.
+
+    Each benchmark returns the number of operations one run performs and the
+    timings of each run; mutating benchmarks rebuild their state untimed first.
+
+    Attributes:
+    -----------
+    plans : Dict[int, List[Position]]
+        The synthetic plan of each agent.
+    plan_file : str
+        The plans written out in the result.path format.
+    repeat : int
+        The number of timed runs of each benchmark.
+    """
+
+    def __init__(self, num_agents: int, plan_length: int, directory: str, repeat: int) -> None:
+        self.num_agents: int = num_agents
+        self.plan_length: int = plan_length
+        self.plans: Dict[int, List[Position]] = synthetic_plans(num_agents, plan_length)
+        self.plan_file: str = os.path.join(directory, f"plans_{num_agents}_{plan_length}.path")
+        self.repeat: int = repeat
+        write_plan_file(self.plans, self.plan_file)
+
+    def load_paths(self) -> Tuple[int, List[float]]:
+        return 1, measure(lambda: load_paths(self.plan_file), None, self.repeat)
+
+    def schedule_init(self) -> Tuple[int, List[float]]:
+        return 1, measure(lambda: ScheduleTable(self.plans), None, self.repeat)
+
+    def schedule_add_path(self) -> Tuple[int, List[float]]:
+        state: Dict[str, ScheduleTable] = {}
+
+        def setup() -> None:
+            state["table"] = ScheduleTable({})
+
+        def run() -> None:
+            for agent_id, plan in self.plans.items():
+                state["table"].add_path(agent_id, plan)
+
+        return self.num_agents, measure(run, setup, self.repeat)
+
+    def schedule_scheduled(self) -> Tuple[int, List[float]]:
+        table = ScheduleTable(self.plans)
+        queries = [(position, agent_id) for agent_id, plan in self.plans.items() for position in plan]
+
+        def run() -> None:
+            for position, agent_id in queries:
+                table.scheduled(position, agent_id)
+
+        return len(queries), measure(run, None, self.repeat)
+
+    def schedule_remove_path(self) -> Tuple[int, List[float]]:
+        state: Dict[str, ScheduleTable] = {}
+
+        def setup() -> None:
+            state["table"] = ScheduleTable(self.plans)
+
+        def run() -> None:
+            for agent_id, plan in self.plans.items():
+                state["table"].remove_path(agent_id, plan, len(plan))
+
+        return self.num_agents, measure(run, setup, self.repeat)
+
+    def online_update_plan(self) -> Tuple[int, List[float]]:
+        state: Dict[str, OnlineSchedule] = {}
+
+        def setup() -> None:
+            state["schedule"] = OnlineSchedule(self.num_agents)
+
+        def run() -> None:
+            # Extend one timestep of every agent at a time, as a planner does
+            for timestep in range(self.plan_length):
+                for agent_id, plan in self.plans.items():
+                    state["schedule"].update_plan([(timestep + 1, plan[timestep])], agent_id)
+
+        return self.num_agents * self.plan_length, measure(run, setup, self.repeat)
+
+    def online_remove_path(self) -> Tuple[int, List[float]]:
+        state: Dict[str, OnlineSchedule] = {}
+
+        def setup() -> None:
+            schedule = state["schedule"] = OnlineSchedule(self.num_agents)
+            for timestep in range(self.plan_length):
+                for agent_id, plan in self.plans.items():
+                    schedule.update_plan([(timestep + 1, plan[timestep])], agent_id)
+
+        def run() -> None:
+            for timestep in range(self.plan_length):
+                for agent_id, plan in self.plans.items():
+                    state["schedule"].remove_path(agent_id, [(timestep + 1, plan[timestep])])
+
+        return self.num_agents * self.plan_length, measure(run, setup, self.repeat)
+
+    def _mcp(self) -> MCP:
+        Agent.reset()
+        policy = MCP(self.plan_file, self.num_agents)
+        for agent_id, plan in self.plans.items():
+            start = plan[0]
+            policy.update({
+                "agent_id": agent_id,
+                "timestep": 0,
+                "status": "SUCCEEDED",
+                "position": {"x": start.x, "y": start.y, "theta": start.theta},
+            })
+        return policy
+
+    def mcp_get_next_position(self) -> Tuple[int, List[float]]:
+        policy = self._mcp()
+
+        def run() -> None:
+            for agent_id in range(self.num_agents):
+                policy.get_next_position(agent_id)
+
+        return self.num_agents, measure(run, None, self.repeat)
+
+    def controller_requests(self) -> Tuple[int, List[float]]:
+        CentralController.execution_policy = self._mcp()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), CentralController)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+        reports = [
+            json.dumps({
+                "agent_id": agent_id,
+                "timestep": 0,
+                "status": "SUCCEEDED",
+                "position": {"x": plan[0].x, "y": plan[0].y, "theta": plan[0].theta},
+            })
+            for agent_id, plan in self.plans.items()
+        ]
+
+        def run() -> None:
+            # Every robot asks for its window and reports back, without moving
+            for agent_id in range(self.num_agents):
+                connection.request("GET", f"/?agent_id={agent_id}")
+                connection.getresponse().read()
+                connection.request("POST", "/", reports[agent_id], {"Content-Type": "application/json"})
+                connection.getresponse().read()
+
+        try:
+            return 2 * self.num_agents, measure(run, None, self.repeat)
+        finally:
+            connection.close()
+            server.shutdown()
+            server.server_close()
+
+
+BENCHMARKS: List[str] = [
+    "load_paths",
+    "schedule_init",
+    "schedule_add_path",
+    "schedule_scheduled",
+    "schedule_remove_path",
+    "online_update_plan",
+    "online_remove_path",
+    "mcp_get_next_position",
+    "controller_requests",
+]
+
+
+def run_benchmarks(
+    agents: List[int], lengths: List[int], names: List[str], repeat: int
+) -> List[Dict[str, Any]]:
+    """
+    Runs each named benchmark for every fleet size and plan length.
+
+    Returns:
+    --------
+    List[Dict[str, Any]]
+        One record per benchmark and size, with timings in seconds.
+    """
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as directory:
+        for num_agents in agents:
+            for plan_length in lengths:
+                suite = Benchmarks(num_agents, plan_length, directory, repeat)
+                for name in names:
+                    # The policies print every update and the server logs every request
+                    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+                            contextlib.redirect_stderr(devnull):
+                        operations, timings = getattr(suite, name)()
+                    results.append({
+                        "benchmark": name,
+                        "agents": num_agents,
+                        "plan_length": plan_length,
+                        "operations": operations,
+                        "repeat": repeat,
+                        "best_s": min(timings),
+                        "median_s": statistics.median(timings),
+                        "per_operation_us": 1e6 * min(timings) / operations,
+                    })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the schedule, policy and loader hot paths")
+    parser.add_argument("--agents", type=int, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.agents, args.lengths, args.benchmarks, args.repeat)
+    print(f"{'benchmark':24} {'agents':>6} {'length':>6} {'best ms':>10} {'median ms':>10} {'us/op':>10}")
+    for result in results:
+        print(f"{result['benchmark']:24} {result['agents']:6} {result['plan_length']:6} "
+              f"{1000 * result['best_s']:10.3f} {1000 * result['median_s']:10.3f} "
+              f"{result['per_operation_us']:10.2f}")
+    if args.json:
+        with open(args.json, mode="w", encoding="utf-8") as fout:
+            json.dump(results, fout, indent=4)
+
+
+if __name__ == "__main__":
+    main()
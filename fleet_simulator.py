@@ -0,0 +1,218 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+from Agent import Agent
+from Central_Controller import CentralController
+from Minimum_Communication_Policy import MCP
+
+
+class LatencyRecorder:
+    """
+    Collects request latencies per route from many simulated robots.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, route: str, seconds: float) -> None:
+        with self.lock:
+            self.samples.setdefault(route, []).append(seconds)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """
+        Returns request counts, rates and p50/p99 latencies (ms) per route.
+        """
+        routes: Dict[str, Any] = {}
+        total = 0
+        with self.lock:
+            for route, samples in sorted(self.samples.items()):
+                ordered = sorted(samples)
+                total += len(ordered)
+                routes[route] = {
+                    "requests": len(ordered),
+                    "requests_per_second": len(ordered) / elapsed if elapsed else 0.0,
+                    "p50_ms": 1000 * ordered[len(ordered) // 2],
+                    "p99_ms": 1000 * ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))],
+                }
+        rate = total / elapsed if elapsed else 0.0
+        return {"requests": total, "requests_per_second": rate, "routes": routes}
+
+
+class SimulatedRobot(threading.Thread):
+    """
+    A robot speaking the Get.json/Post.json protocol to a central controller.
+
+    The robot polls for its next motion window, spends (end - start) / speed
+    seconds (with jitter) driving it, then reports SUCCEEDED at the end of the
+    window, or FAILED with probability failure_rate and tries again.
+
+    Attributes:
+    -----------
+    agent_id : int
+        The id of the agent this robot plays.
+    last_advance : float
+        When the robot last completed a motion window.
+    finished : bool
+        True once the controller has left the robot idle for `idle` seconds.
+    """
+
+    def __init__(
+        self,
+        agent_id: int,
+        host: str,
+        port: int,
+        recorder: LatencyRecorder,
+        speed: float,
+        jitter: float,
+        failure_rate: float,
+        poll_interval: float,
+        idle: float,
+        deadline: float,
+        list_positions: bool,
+    ) -> None:
+        super().__init__(name=f"robot-{agent_id}", daemon=True)
+        self.agent_id: int = agent_id
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.recorder: LatencyRecorder = recorder
+        self.speed: float = speed
+        self.jitter: float = jitter
+        self.failure_rate: float = failure_rate
+        self.poll_interval: float = poll_interval
+        self.idle: float = idle
+        self.deadline: float = deadline
+        self.list_positions: bool = list_positions
+        self.random = random.Random(agent_id)
+        self.last_advance: float = time.monotonic()
+        self.finished: bool = False
+        self.errors: int = 0
+
+    def _request(self, method: str, route: str, path: str, body: Dict | None = None) -> Tuple[int, bytes]:
+        payload = None if body is None else json.dumps(body)
+        headers = {} if payload is None else {"Content-Type": "application/json"}
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            self.connection.close()
+            return 0, b""
+        self.recorder.record(f"{method} {route}", time.perf_counter() - start)
+        return response.status, data
+
+    def _report(self, status: str, timestep: int, position: List[float]) -> None:
+        pose: Any = position
+        if not self.list_positions:
+            pose = {"x": position[0], "y": position[1], "theta": position[2]}
+        message = {"agent_id": self.agent_id, "timestep": timestep, "position": pose, "status": status}
+        self._request("POST", "/", "/", message)
+
+    def run(self) -> None:
+        reported_start = False
+        while time.monotonic() < self.deadline:
+            status, data = self._request("GET", "/", f"/?agent_id={self.agent_id}")
+            if status != 200:
+                time.sleep(self.poll_interval)
+                continue
+            window = json.loads(data)
+            positions = window.get("positions") or [window.get("position")]
+            start, end = window["start_timestep"], window["end_timestep"]
+
+            if not reported_start:
+                # Announce the robot at its initial position before asking to move
+                self._report("SUCCEEDED", end, positions[-1])
+                reported_start = True
+                continue
+
+            if end <= start:
+                if time.monotonic() - self.last_advance > self.idle:
+                    self.finished = True
+                    return
+                time.sleep(self.poll_interval)
+                continue
+
+            duration = (end - start) / self.speed
+            time.sleep(max(0.0, duration * (1 + self.jitter * self.random.uniform(-1, 1))))
+            if self.random.random() < self.failure_rate:
+                self._report("FAILED", start, positions[0])
+                continue
+            self._report("SUCCEEDED", end, positions[-1])
+            self.last_advance = time.monotonic()
+
+
+def serve_plan(plan_file: str, num_agents: int) -> Tuple[ThreadingHTTPServer, int]:
+    """
+    Starts an in-process controller running MCP on a plan file, on a free port.
+    """
+    Agent.reset()
+    CentralController.execution_policy = MCP(plan_file, num_agents)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CentralController)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test a central controller with simulated robots")
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--plan-file", help="Serve this plan with MCP in-process instead of using --host")
+    parser.add_argument("--speed", type=float, default=5.0, help="Plan steps driven per second")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative spread of motion durations")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability a motion fails")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--idle", type=float, default=2.0,
+                        help="Seconds without progress before a robot stops")
+    parser.add_argument("--duration", type=float, default=60.0, help="Longest time to run for")
+    parser.add_argument("--list-positions", action="store_true", help="Report position as [x, y, theta]")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    host, port, server = args.host, args.port, None
+    if args.plan_file:
+        server, port = serve_plan(args.plan_file, args.agents)
+        host = "127.0.0.1"
+
+    recorder = LatencyRecorder()
+    started = time.monotonic()
+    robots = [
+        SimulatedRobot(agent_id, host, port, recorder, args.speed, args.jitter, args.failure_rate,
+                       args.poll_interval, args.idle, started + args.duration, args.list_positions)
+        for agent_id in range(args.agents)
+    ]
+    for robot in robots:
+        robot.start()
+    for robot in robots:
+        robot.join()
+    elapsed = time.monotonic() - started
+
+    results = recorder.summary(elapsed)
+    results["agents"] = args.agents
+    results["elapsed_s"] = elapsed
+    results["makespan_s"] = max(robot.last_advance for robot in robots) - started
+    results["finished_agents"] = sum(robot.finished for robot in robots)
+    results["errors"] = sum(robot.errors for robot in robots)
+
+    print(f"{args.agents} agents, {results['requests']} requests in {elapsed:.2f}s "
+          f"({results['requests_per_second']:.1f} req/s), makespan {results['makespan_s']:.2f}s, "
+          f"{results['errors']} errors")
+    for route, stats in results["routes"].items():
+        print(f"  {route:8} {stats['requests']:8} req {stats['requests_per_second']:9.1f} req/s "
+              f"p50 {stats['p50_ms']:7.2f} ms  p99 {stats['p99_ms']:7.2f} ms")
+    if args.json:
+        with open(args.json, mode="w", encoding="utf-8") as fout:
+            json.dump(results, fout, indent=4)
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
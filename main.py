@@ -1,12 +1,196 @@
+import argparse
+import os
+import threading
+import time
 from http.server import ThreadingHTTPServer
+from typing import Tuple
 
+from Agent import Agent
 from Central_Controller import CentralController
+from Checkpoint import CheckpointWorker, load_checkpoint
+from Distance_Tables import DistanceTables
+from Event_Log import EventLog
+from Heartbeat_Monitor import HeartbeatMonitor
+from Map_Tiles import load_pyramids
+from Minimum_Communication_Policy import OnlineMCP
+from Occupancy_Map import load_map
+from Planning_Grid import PlanningGrid
+from Position import Position
+from Rolling_Horizon_Planner import PlannerWorker, PrioritisedPlanner, load_goals
+from Status import Status
+from Telemetry import TelemetryListener
+from Transforms import GridFrame
+import Tracing
 
 # from Minimum_Communication_Policy import MCP
 
 if __name__ == "__main__":
-    host_name: str = "0.0.0.0"
-    server_port: int = 8080
+    parser = argparse.ArgumentParser(description="Central controller for Turtlebot4 fleets")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--planner-map", help=".map file to run the in-process planner on")
+    parser.add_argument("--planner-goals", help="JSON file of start and goal locations per agent")
+    parser.add_argument("--planner-window", type=int, default=10)
+    parser.add_argument("--distance-cache", default=".distance_tables",
+                        help="Directory caching the distance tables of each planning map")
+    parser.add_argument("--landmarks", type=int, default=4,
+                        help="Landmarks bounding distances between cells without a table")
+    parser.add_argument("--map-yaml", help="ROS map the plans are on, to accept and report poses in metres")
+    parser.add_argument("--cell-size", type=float, default=0.5, help="Side of a planning cell in metres")
+    parser.add_argument("--tile-maps", nargs="*", default=[], metavar="PGM",
+                        help="Maps to serve as PNG tiles on /tiles, for viewers")
+    parser.add_argument("--heartbeat-timeout", type=float,
+                        help="Seconds of silence after which an agent is aborted")
+    parser.add_argument("--heartbeat-release", action="store_true",
+                        help="Release the reservations of aborted agents instead of freezing them")
+    parser.add_argument("--trace-level", default="INFO", help="DEBUG, INFO, WARNING or ERROR")
+    parser.add_argument("--trace", nargs="*", default=[], metavar="SUBSYSTEM=LEVEL",
+                        help=f"Per subsystem trace levels, of {', '.join(Tracing.SUBSYSTEMS)}")
+    parser.add_argument("--trace-agents", type=int, nargs="*", help="Only trace these agents at DEBUG")
+    parser.add_argument("--profile-fraction", type=float,
+                        default=float(os.environ.get("TURTLEBOT_PROFILE_FRACTION", 0)),
+                        help="Fraction of requests to profile, served as folded stacks on /profile")
+    parser.add_argument("--telemetry-port", type=int,
+                        help="Also accept binary pose reports over UDP on this port, served on /telemetry")
+    parser.add_argument("--checkpoint",
+                        help="Periodically snapshot the policy to this file, restoring from it on startup")
+    parser.add_argument("--checkpoint-interval", type=float, default=5.0)
+    parser.add_argument("--event-log",
+                        help="Append every status update and plan extension to this file (.gz to compress)"
+                        " for replay.py")
+    parser.add_argument("--deadlock-recovery", action="store_true",
+                        help="Abort and release the highest agent id of each deadlock cycle, then replan")
+    args = parser.parse_args()
+
+    Tracing.configure(args.trace_level, dict(option.split("=", 1) for option in args.trace))
+    if args.trace_agents is not None:
+        Tracing.set_focus(agents=args.trace_agents)
+
+    CentralController.profiler.fraction = args.profile_fraction
+
+    host_name: str = args.host
+    server_port: int = args.port
+
+    restored: bool = bool(args.checkpoint) and os.path.exists(args.checkpoint)
+    goals = None
+    if restored:
+        started = time.perf_counter()
+        CentralController.execution_policy, goals, taken = load_checkpoint(args.checkpoint)
+        print(f"Restored {type(CentralController.execution_policy).__name__} from the checkpoint taken at "
+              f"{time.ctime(taken)} in {1000 * (time.perf_counter() - started):.1f} ms")
+
+    planning: bool = bool(args.planner_map and args.planner_goals)
+    if planning:
+        tasks = load_goals(args.planner_goals)
+        if not restored:
+            # Agent ids are allocated globally, discard the agents of the default policy
+            Agent.reset()
+            CentralController.execution_policy = OnlineMCP(len(tasks))
+
+    if args.map_yaml:
+        CentralController.frame = GridFrame.from_map(load_map(args.map_yaml), args.cell_size)
+
+    if args.tile_maps:
+        started = time.perf_counter()
+        CentralController.tiles = load_pyramids(args.tile_maps)
+        tiles = sum(len(pyramid.tiles) for pyramid in CentralController.tiles.values())
+        print(f"Built {tiles} map tiles in {1000 * (time.perf_counter() - started):.0f} ms")
+
+    # Opened once the policy is chosen, as the log header names it
+    if args.event_log:
+        CentralController.event_log = EventLog(args.event_log, CentralController.execution_policy)
+
+    if planning:
+        policy = CentralController.execution_policy
+        if not isinstance(policy, OnlineMCP):
+            raise ValueError(f"The in-process planner needs OnlineMCP, not {type(policy).__name__}")
+        grid = PlanningGrid.from_map_file(args.planner_map)
+        CentralController.distances = DistanceTables(grid, args.distance_cache)
+        CentralController.distances.precompute([], args.landmarks)
+        CentralController.planner = PlannerWorker(
+            policy,
+            PrioritisedPlanner(grid, {agent_id: seq[1:] for agent_id, seq in tasks.items()},
+                               CentralController.distances),
+            window=args.planner_window,
+            starts={agent_id: Position(*seq[0], 0) for agent_id, seq in tasks.items()},
+            event_log=CentralController.event_log,
+            status_stream=CentralController.status_stream,
+            lock=CentralController.policy_lock,
+        )
+        if goals is not None:
+            CentralController.planner.planner.goals = goals
+        CentralController.planner.start()
+        print(f"In-process planner started for {len(tasks)} agents")
+
+    if args.heartbeat_timeout:
+        release: bool = args.heartbeat_release
+
+        def abort_agent(agent_id: int) -> None:
+            with CentralController.policy_lock:
+                waiters = CentralController.waiters(agent_id)
+                if CentralController.event_log is not None:
+                    CentralController.event_log.abort_agent(agent_id, release)
+                CentralController.execution_policy.abort_agent(agent_id, release)
+            CentralController.status_stream.agents_changed([CentralController.execution_policy.agents[agent_id]])
+            CentralController.status_stream.notify(waiters)
+
+        CentralController.heartbeats = HeartbeatMonitor(args.heartbeat_timeout, on_timeout=abort_agent)
+        CentralController.heartbeats.start()
+
+    if args.deadlock_recovery:
+        policy = CentralController.execution_policy
+        if not isinstance(policy, OnlineMCP):
+            raise ValueError(f"Deadlock recovery needs OnlineMCP, not {type(policy).__name__}")
+
+        trace = Tracing.Tracer("deadlock")
+
+        def recover(cycle: Tuple[int, ...]) -> None:
+            with CentralController.policy_lock:
+                # An agent keeps its next location when released, so a cycle may outlive its first release
+                candidates = [member for member in cycle if policy.agents[member].status != Status.ABORTED]
+                if not candidates:
+                    trace.error("Deadlock between agents %s persists with all of them aborted", cycle)
+                    return
+                # Releasing one member frees the locations the rest of the cycle waits on
+                agent_id = max(candidates)
+                trace.warning("Releasing agent %d to break the deadlock between agents %s", agent_id, cycle)
+                waiters = CentralController.waiters(agent_id)
+                if CentralController.event_log is not None:
+                    CentralController.event_log.abort_agent(agent_id, True)
+                policy.abort_agent(agent_id, True)
+            CentralController.status_stream.agents_changed([policy.agents[agent_id]])
+            CentralController.status_stream.notify(waiters)
+            if CentralController.planner is not None:
+                CentralController.planner.notify()
+
+        # Cycles are found part way through schedule updates, so recover once the update is done.
+        # Checkpoints drop the callback, so it is attached after any restore above
+        policy.schedule_table.wait_for.on_deadlock = lambda cycle: threading.Thread(
+            target=recover, args=(cycle,), name="DeadlockRecovery", daemon=True
+        ).start()
+
+    if args.telemetry_port is not None:
+        CentralController.telemetry = TelemetryListener(
+            host_name,
+            args.telemetry_port,
+            len(CentralController.execution_policy.agents),
+            CentralController.report_status,
+            CentralController.heartbeats,
+            CentralController.metrics,
+        )
+        CentralController.telemetry.start()
+        print(f"Telemetry listening on udp://{host_name}:{args.telemetry_port}")
+
+    checkpoints: CheckpointWorker | None = None
+    if args.checkpoint:
+
+        def checkpoint_state():
+            planner = CentralController.planner
+            return CentralController.execution_policy, None if planner is None else planner.planner.goals
+
+        checkpoints = CheckpointWorker(args.checkpoint, checkpoint_state, args.checkpoint_interval,
+                                       CentralController.policy_lock)
+        checkpoints.start()
 
     server = ThreadingHTTPServer((host_name, server_port), CentralController)
 
@@ -15,5 +199,15 @@ if __name__ == "__main__":
         server.serve_forever()
     except KeyboardInterrupt:
         print("Stopping server")
+    if CentralController.telemetry is not None:
+        CentralController.telemetry.stop()
+    if CentralController.heartbeats is not None:
+        CentralController.heartbeats.stop()
+    if CentralController.planner is not None:
+        CentralController.planner.stop()
+    if checkpoints is not None:
+        checkpoints.stop()
+    if CentralController.event_log is not None:
+        CentralController.event_log.close()
     server.server_close()
     print("Server stopped")
@@ -1,36 +1,142 @@
-import requests
+import argparse
 import json
-from typing import Any
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from File_Handler import Pose, parse_path_line
 
+# States sent per /extend_path request, the server reads each body whole
+BATCH_SIZE: int = 5000
 
-def main(path_to_path_file: str, hostname: str, port: str):
-    """File formatted as
-    \"{agent_id}: [Position(0,0,90), Position(0,-1,90)]\"
-    Meaning the robot with agent_id is at (0,0) at t=0, then moves to (0,-1) at t=1
+
+def parse_paths(path_to_path_file: str) -> Iterator[Tuple[int, List[Pose]]]:
     """
+    Reads a plan file line by line, yielding the agent id and poses of each line.
 
+    Lines are formatted as "{agent_id}: [Position(0,0,90), Position(0,-1,90)]",
+    "{agent_id}: [(0.0,0.0,90.0), (0.0,-1.0,90.0)]" or, as in result.path,
+    "Agent {agent_id}:(0,0,90)->(0,-1,90)", meaning the robot with agent_id is
+    at (0,0) at t=0, then moves to (0,-1) at t=1. Parsing stops at a blank line.
+    """
     with open(path_to_path_file) as f:
-        for line in f.readlines():
-            if not line.strip(): # Stop at blank line
+        for line in f:
+            if not line.strip():  # Stop at blank line
                 break
-            _agent_id, path = line.split(": ")
-            agent_id = int(_agent_id)
-            message: Any = {}
-            message["plans"] = []
-            #  [(4.0,0.0,90.0), (4.0,-0.0,0.0), (4.0,-0.0,90.0)] parse for tuples in list
-            for timestep, triple in enumerate(path[1:-2].split(", ")):
-                print(triple)
-                x, y, theta = map(float, triple[1:-2].split(","))
-                message["plans"].append(
-                        {
-                            "x": x,
-                            "y": y,
-                            "theta": theta,
-                            "agent_id": agent_id,
-                            "timestep": timestep,
-                        }
-                )
-            requests.post(f"http://{hostname}:{port}/extend_path", json.dumps(message))
+            yield parse_path_line(line)
+
+
+class Uploader(threading.Thread):
+    """
+    Sends the batches of a disjoint set of agents in order, over one pooled session.
+
+    As the plan of an agent is extended in the order its states arrive, all
+    the states of an agent go through the same uploader.
+
+    Attributes:
+    -----------
+    batches : queue.Queue
+        The request bodies to send, None once there are no more.
+    requests, failures, sent_bytes : int
+        Counts of the requests sent, those not answered with 200, and their bytes.
+    """
+
+    def __init__(self, url: str) -> None:
+        super().__init__(daemon=True)
+        self.url: str = url
+        self.batches: queue.Queue = queue.Queue(maxsize=4)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.requests: int = 0
+        self.failures: int = 0
+        self.sent_bytes: int = 0
+
+    def run(self) -> None:
+        while (body := self.batches.get()) is not None:
+            try:
+                response = self.session.post(self.url, data=body,
+                                             headers={"Content-Type": "application/json"})
+                ok = response.status_code == 200
+            except requests.RequestException as error:
+                print(f"Upload to {self.url} failed: {error}")
+                ok = False
+            self.requests += 1
+            self.failures += not ok
+            self.sent_bytes += len(body)
+        self.session.close()
+
+
+def main(path_to_path_file: str, hostname: str, port: str, batch_size: int = BATCH_SIZE,
+         workers: int = 1) -> Dict[str, Any]:
+    """
+    Uploads every plan in a file with as few /extend_path requests as batch_size allows.
+
+    The file is parsed as it is sent, and the agents are split over workers
+    uploading concurrently, each over its own kept-alive connection.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        The number of agents, states, requests, failed requests and bytes sent, and the throughput.
+    """
+    url = f"http://{hostname}:{port}/extend_path"
+    uploaders = [Uploader(url) for _ in range(max(1, workers))]
+    for uploader in uploaders:
+        uploader.start()
+    pending: List[List[Dict[str, Any]]] = [[] for _ in uploaders]
+
+    def flush(lane: int) -> None:
+        body = json.dumps({"plans": pending[lane]}, separators=(",", ":")).encode("utf-8")
+        uploaders[lane].batches.put(body)
+        pending[lane] = []
+
+    started = time.perf_counter()
+    agents = states = 0
+    for agent_id, poses in parse_paths(path_to_path_file):
+        agents += 1
+        states += len(poses)
+        lane = agent_id % len(uploaders)
+        for timestep, (x, y, theta) in enumerate(poses):
+            pending[lane].append(
+                {"x": x, "y": y, "theta": theta, "agent_id": agent_id, "timestep": timestep}
+            )
+            if len(pending[lane]) >= batch_size:
+                flush(lane)
+    for lane, uploader in enumerate(uploaders):
+        if pending[lane]:
+            flush(lane)
+        uploader.batches.put(None)
+    for uploader in uploaders:
+        uploader.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "agents": agents,
+        "states": states,
+        "requests": sum(uploader.requests for uploader in uploaders),
+        "failures": sum(uploader.failures for uploader in uploaders),
+        "bytes": sum(uploader.sent_bytes for uploader in uploaders),
+        "seconds": elapsed,
+        "states_per_second": states / elapsed if elapsed > 0 else 0.0,
+    }
+
 
 if __name__ == "__main__":
-    main("path.txt", "127.0.0.1", "8080")
+    parser = argparse.ArgumentParser(description="Upload plans to a running central controller")
+    parser.add_argument("path_file", nargs="?", default="path.txt")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default="8080")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="States per /extend_path request")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Concurrent uploads, each sending the plans of a disjoint set of agents")
+    args = parser.parse_args()
+
+    stats = main(args.path_file, args.host, args.port, args.batch_size, args.workers)
+    print(f"Uploaded {stats['states']} states of {stats['agents']} agents in {stats['requests']} requests "
+          f"({stats['failures']} failed, {stats['bytes'] / 1024:.0f} KiB) in {stats['seconds']:.2f} s, "
+          f"{stats['states_per_second']:.0f} states/s")
@@ -0,0 +1,126 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from Agent import Agent
+from Event_Log import apply_event, join_segments, read_events
+from Fully_Synchronised_Policy import FSP, OnlineFSP
+from Metrics import schedule_gauges
+from Minimum_Communication_Policy import MCP, OnlineMCP
+from Unit_Execution_Policy import UnitExecutionPolicy
+
+POLICIES: List[str] = ["FSP", "MCP", "OnlineFSP", "OnlineMCP", "UnitExecutionPolicy"]
+
+
+def build_policy(name: str, num_agents: int, plan_file: str | None) -> Any:
+    """
+    Creates a fresh policy by name to replay a log into.
+    """
+    Agent.reset()
+    match name:
+        case "FSP" | "MCP":
+            if plan_file is None:
+                raise ValueError(f"{name} needs the plan file it was served with")
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                return (FSP if name == "FSP" else MCP)(plan_file, num_agents)
+        case "OnlineFSP":
+            return OnlineFSP(num_agents)
+        case "OnlineMCP":
+            return OnlineMCP(num_agents)
+        case "UnitExecutionPolicy":
+            return UnitExecutionPolicy(num_agents)
+        case _:
+            raise ValueError(f"Unknown execution policy {name}")
+
+
+def replay(events: List[Dict], policy: Any, poll: bool = False) -> Dict[str, Any]:
+    """
+    Feeds logged events into a policy as fast as it takes them.
+
+    Parameters:
+    -----------
+    events : List[Dict]
+        The records of an event log, without its headers.
+    policy : Any
+        The execution policy to replay into.
+    poll : bool
+        Also call get_next_position for the agent of every update, as its robot would.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Counts and seconds per call, and the final state of the policy for comparing replays.
+    """
+    calls: Dict[str, Dict[str, float]] = {}
+    skipped = 0
+    started = time.perf_counter()
+    for event in events:
+        call_started = time.perf_counter()
+        if not apply_event(policy, event):
+            skipped += 1
+            continue
+        if poll and event["call"] == "update" and "agent_id" in event["args"]["data"]:
+            policy.get_next_position(event["args"]["data"]["agent_id"])
+        totals = calls.setdefault(event["call"], {"count": 0, "seconds": 0.0})
+        totals["count"] += 1
+        totals["seconds"] += time.perf_counter() - call_started
+    elapsed = time.perf_counter() - started
+
+    state: Dict[str, Any] = {}
+    if hasattr(policy, "get_status"):
+        state["status"] = {str(agent_id): status.name for agent_id, status in policy.get_status()}
+    if isinstance(policy, (MCP, OnlineMCP)):
+        gauges = schedule_gauges(policy.schedule_table)
+        state.update({name: samples[0][1] for name, samples in gauges.items()})
+    return {
+        "events": len(events) - skipped,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "events_per_second": (len(events) - skipped) / elapsed if elapsed else 0.0,
+        "calls": calls,
+        "state": state,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a controller event log into an execution policy")
+    parser.add_argument("log", help="Event log written by main.py --event-log")
+    parser.add_argument("--policy", choices=POLICIES, help="Defaults to the policy that wrote the log")
+    parser.add_argument("--plan-file", default="result.path", help="Plan file of FSP and MCP")
+    parser.add_argument("--agents", type=int, help="Defaults to the number of agents in the log")
+    parser.add_argument("--poll", action="store_true",
+                        help="Call get_next_position after every update, as the robots do")
+    parser.add_argument("--repeat", type=int, default=1, help="Replays to time, each into a fresh policy")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    # A log spanning restarts has a header per run, only the first names the policy
+    header, events = join_segments(read_events(args.log))
+    name: str = args.policy or header.get("policy") or "OnlineMCP"
+    num_agents: int | None = args.agents or header.get("num_agents")
+    if num_agents is None:
+        raise ValueError("The log does not record the number of agents, pass --agents")
+
+    results = []
+    for _ in range(args.repeat):
+        policy = build_policy(name, num_agents, args.plan_file)
+        results.append(replay(events, policy, args.poll))
+
+    best = min(results, key=lambda result: result["seconds"])
+    print(f"{name}: {best['events']} events in {1000 * best['seconds']:.3f} ms "
+          f"({best['events_per_second']:.0f} events/s), {best['skipped']} skipped")
+    for call, totals in best["calls"].items():
+        per_call = 1e6 * totals["seconds"] / totals["count"]
+        print(f"  {call:14} {int(totals['count']):8} {per_call:10.2f} us/call")
+    if any(result["state"] != best["state"] for result in results):
+        print("Replays ended in different states")
+    if args.json:
+        with open(args.json, mode="w", encoding="utf-8") as fout:
+            json.dump({"policy": name, "agents": num_agents, "replays": results}, fout, indent=4)
+
+
+if __name__ == "__main__":
+    main()
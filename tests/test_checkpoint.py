@@ -0,0 +1,23 @@
+import threading
+
+from Agent import Agent
+from Checkpoint import load_checkpoint, save_checkpoint
+from Minimum_Communication_Policy import OnlineMCP
+from Position import Position
+
+
+def test_checkpoint_with_deadlock_recovery_wired(tmp_path) -> None:
+    Agent.reset()
+    policy = OnlineMCP(2)
+    policy.extend_plans([(0, [Position(0, 0, 0), Position(1, 0, 0)]), (1, [Position(1, -1, 90)])])
+    # As main.py wires --deadlock-recovery, with a lambda that cannot be pickled
+    policy.schedule_table.wait_for.on_deadlock = lambda cycle: threading.Thread(target=print).start()
+    path = str(tmp_path / "checkpoint.pkl")
+
+    save_checkpoint(path, policy, None, threading.RLock())
+
+    restored, goals, _ = load_checkpoint(path)
+    assert restored.schedule_table.wait_for.on_deadlock is None
+    assert policy.schedule_table.wait_for.on_deadlock is not None
+    assert [agent.get_plan() for agent in restored.agents] == [agent.get_plan() for agent in policy.agents]
+    assert goals is None
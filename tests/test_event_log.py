@@ -0,0 +1,27 @@
+import time
+
+from Agent import Agent
+from Event_Log import EventLog, apply_event, join_segments, read_events
+from Minimum_Communication_Policy import OnlineMCP
+from Position import Position
+
+
+def test_log_spanning_a_restart_replays(tmp_path) -> None:
+    path = str(tmp_path / "events.log")
+    Agent.reset()
+    policy = OnlineMCP(1)
+    for _ in range(2):
+        # Each run appends its own header, as main.py does when restarted from a checkpoint
+        log = EventLog(path, policy)
+        log.extend_plans([(0, [Position(0, -1, 0)])], lookahead=5)
+        time.sleep(0.01)
+        log.close()
+
+    header, events = join_segments(read_events(path))
+    assert header["policy"] == "OnlineMCP"
+    assert [event["call"] for event in events] == ["extend_plans", "extend_plans"]
+    assert events[1]["t"] > events[0]["t"]
+    Agent.reset()
+    replayed = OnlineMCP(1)
+    assert all(apply_event(replayed, event) for event in events)
+    assert len(replayed.agents[0].get_plan()) == 2
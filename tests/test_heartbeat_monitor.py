@@ -0,0 +1,20 @@
+from typing import List
+
+from Heartbeat_Monitor import HeartbeatMonitor
+
+
+def test_failed_abort_does_not_skip_the_rest_of_the_slot() -> None:
+    now = [0.0]
+    aborted: List[int] = []
+
+    def abort(agent_id: int) -> None:
+        if agent_id == 0:
+            raise IndexError("list index out of range")
+        aborted.append(agent_id)
+
+    monitor = HeartbeatMonitor(1.0, on_timeout=abort, clock=lambda: now[0])
+    monitor.beat(0)
+    monitor.beat(1)
+    now[0] = 5.0
+    assert sorted(monitor.poll()) == [0, 1]
+    assert aborted == [1]
@@ -0,0 +1,29 @@
+from Agent import Agent
+from Minimum_Communication_Policy import OnlineMCP
+from Planning_Grid import PlanningGrid
+from Position import Position
+from Rolling_Horizon_Planner import PrioritisedPlanner, Reservations
+
+
+def test_negative_rows_are_distinct_cells() -> None:
+    assert [Position(0, y, 0).location() for y in (0, -1, -2, -3)] == [(0, 0), (0, -1), (0, -2), (0, -3)]
+    assert Position(0, -0.6, 0).location() == (0, -1)
+    assert Position(0, 0, 0) != Position(0, -1, 0)
+
+
+def test_parked_agent_reserves_its_negative_row() -> None:
+    Agent.reset()
+    policy = OnlineMCP(2)
+    policy.extend_plans([(0, [Position(0, -2, 0)] * 5)])
+    reservations = Reservations.from_schedule(policy.schedule_table)
+    assert not any(reservations.free(1, (0, -2), t) for t in range(4))
+
+
+def test_plan_starts_from_its_own_negative_row() -> None:
+    Agent.reset()
+    policy = OnlineMCP(1)
+    policy.extend_plans([(0, [Position(0, -2, 270)])])
+    planner = PrioritisedPlanner(PlanningGrid([[False]] * 6), {0: [(0, -4)]})
+    [(agent_id, extension)] = planner.plan({0: (Position(0, -2, 270), 0, 2)}, policy.schedule_table)
+    assert agent_id == 0
+    assert [position.location() for position in extension] == [(0, -3), (0, -4)]